@@ -0,0 +1,757 @@
+"""
+Замеры производительности транспортной компании
+"""
+
+import argparse
+import gc
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+from csv_import import import_csv
+from datetime import date, datetime, timedelta, time as day_time
+import journal
+from booking import BookingEngine
+from exceptions import TransportException, InvalidDataException
+from fleet_scheduler import FleetScheduler
+from journey_planner import JourneyPlanner
+from ledger import TicketLedger
+from manager import TransportManager
+from models import Bus, Tram, Employee, Passenger, Route, Trip
+from report_views import ReportViews
+from sharded_company import ShardedCompany
+from timetable import TravelTimeProfile, ServiceCalendar, Timetable
+from transport_company import TransportCompany
+
+CATEGORIES = ["взрослый", "студент", "пенсионер", "ребенок"]
+
+
+def _fresh_string(value):
+    """Новый объект строки (как при чтении из файла)"""
+    return value.encode('utf-8').decode('utf-8')
+
+
+def build_company(passengers, trips, routes=200, transports=500, seed=1, tickets_per_trip=10):
+    """
+    Синтетическая компания для замеров
+
+    Args:
+        passengers: количество пассажиров
+        trips: количество рейсов
+        routes: количество маршрутов
+        transports: количество транспортных средств
+        seed: зерно генератора случайных чисел
+        tickets_per_trip: среднее количество проданных билетов на рейс
+    """
+    rnd = random.Random(seed)
+    company = TransportCompany("Синтетический автопарк")
+
+    for i in range(transports):
+        if i % 3 == 2:
+            company.add_transport(Tram(0, "71-931", "Витязь", 2015 + i % 8, 200, str(i % routes)))
+        else:
+            company.add_transport(Bus(0, "ЛиАЗ", "5292", 2010 + i % 14, 100, str(i % routes)))
+    for i in range(transports):
+        company.add_employee(Employee(0, f"Водитель {i}", f"+7{i:010d}", "Водитель", 60000))
+    for i in range(passengers):
+        company.add_passenger(Passenger(0, f"Пассажир {i}", f"+7{i:010d}", "", (i % 4) * 25, CATEGORIES[i % 4]))
+    for i in range(routes):
+        company.add_route(Route(0, str(i + 1), f"Остановка {i}", f"Остановка {i + 1}", 5 + i % 20))
+
+    # Рейсы добавляются в порядке отправления: индексы времени дописываются в конец
+    start = datetime(2030, 1, 1, 5, 0)
+    departures = sorted(start + timedelta(minutes=rnd.randrange(365 * 24 * 60)) for _ in range(trips))
+    for i, departure in enumerate(departures):
+        route = company.routes[i % routes]
+        trip = Trip(0, route, company.transports[i % transports], company.employees[i % transports],
+                    departure, departure + timedelta(minutes=30 + route.distance * 2), 50)
+        company.add_trip(trip)
+
+    # Пассажиры на рейсах: в среднем по tickets_per_trip билетов на рейс
+    for _ in range(min(passengers, trips) * tickets_per_trip):
+        trip = company.trips[rnd.randrange(trips)]
+        passenger_id = rnd.randrange(passengers) + 1
+        if not trip.has_passenger(passenger_id) and trip.get_free_seats() > 0:
+            company.book_ticket(trip.id, passenger_id)
+    return company
+
+
+def _timed(action):
+    started = time.perf_counter()
+    action()
+    return time.perf_counter() - started
+
+
+def bench_persistence(passengers, trips):
+    """
+    Скорость сохранения и загрузки
+
+    Args:
+        passengers: количество пассажиров
+        trips: количество рейсов
+    """
+    company = build_company(passengers, trips)
+    print(f"Пассажиров: {passengers}, рейсов: {trips}, билетов: {len(company.ledger)}")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for fmt in ('json', 'ndjson', 'xml', 'snapshot'):
+            save = getattr(company, f'save_to_{fmt}', None)
+            filename = os.path.join(tmp, f'company.{fmt}')
+            loaded = TransportCompany("")
+            load = getattr(loaded, f'load_from_{fmt}', None)
+            if save is None or load is None:
+                continue
+            save_time = _timed(lambda: save(filename))
+            # Компании прошлых форматов связаны циклами ссылок: собираем их заранее,
+            # чтобы полный проход сборщика не пришелся на замер загрузки
+            gc.collect()
+            load_time = _timed(lambda: load(filename))
+            size = os.path.getsize(filename) / 1024 / 1024
+            print(f"  {fmt}: сохранение {save_time:.2f} с, загрузка {load_time:.2f} с, файл {size:.1f} МБ")
+
+
+def bench_journal(count):
+    """
+    Продажа билетов с журналом изменений при разном размере группы fsync
+
+    Args:
+        count: количество билетов
+    """
+    with tempfile.TemporaryDirectory() as tmp:
+        for group_size in (1, 16, 256):
+            company = build_company(count, max(count // 10, 1))
+            bookings = [(trip.id, p_id) for trip in company.trips for p_id in trip.get_passenger_ids()]
+            for trip_id, passenger_id in bookings:
+                company.cancel_ticket(trip_id, passenger_id)
+
+            filename = os.path.join(tmp, f'journal-{group_size}')
+            with journal.Journal(filename, group_size=group_size, flush_interval=1.0) as company.journal:
+                elapsed = _timed(lambda: [company.book_ticket(*booking) for booking in bookings])
+            print(f"  группа {group_size}: {len(bookings)} билетов, {len(bookings) / elapsed:,.0f} билетов/с")
+
+
+def bench_booking(threads, attempts, trips):
+    """
+    Продажа билетов из многих потоков через BookingEngine
+
+    Попыток больше, чем мест, поэтому часть рейсов заполняется и проверяется,
+    что ни один рейс не продан сверх вместимости.
+
+    Args:
+        threads: количество потоков
+        attempts: количество попыток покупки
+        trips: количество рейсов
+    """
+    company = build_company(attempts, trips, tickets_per_trip=0)
+    engine = BookingEngine(company)
+    rnd = random.Random(2)
+    # Половина попыток приходится на десятую часть рейсов, чтобы они заполнялись
+    hot_trips = max(trips // 10, 1)
+    requests = [(rnd.randrange(hot_trips if i % 2 else trips) + 1, rnd.randrange(attempts) + 1)
+                for i in range(attempts)]
+
+    def worker(part):
+        booked = 0
+        for trip_id, passenger_id in part:
+            try:
+                engine.book(trip_id, passenger_id)
+                booked += 1
+            except TransportException:
+                pass
+        return booked
+
+    # Частое переключение потоков, чтобы гонки проявились, если они возможны
+    switch_interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-5)
+    try:
+        started = time.perf_counter()
+        with ThreadPoolExecutor(threads) as pool:
+            booked = sum(pool.map(worker, [requests[i::threads] for i in range(threads)]))
+        elapsed = time.perf_counter() - started
+    finally:
+        sys.setswitchinterval(switch_interval)
+
+    overbooked = sum(1 for trip in company.trips if trip.get_passenger_count() > trip.transport.capacity)
+    full = sum(1 for trip in company.trips if trip.get_free_seats() == 0)
+    seated = sum(trip.get_passenger_count() for trip in company.trips)
+    print(f"Потоков: {threads}, попыток: {attempts}, продано: {booked}, {attempts / elapsed:,.0f} попыток/с")
+    print(f"  заполненных рейсов: {full}, рейсов сверх вместимости: {overbooked}")
+    print(f"  мест занято: {seated}, билетов в журнале: {len(company.ledger)}")
+
+
+def bench_book_many(count):
+    """
+    Покупка группы билетов через book_many и по одному через book_ticket
+
+    Args:
+        count: количество билетов
+    """
+    trips = max(count // 20, 1)
+    rnd = random.Random(3)
+    bookings = list({(rnd.randrange(trips) + 1, rnd.randrange(count) + 1) for _ in range(count)})
+    print(f"Билетов: {len(bookings)}, рейсов: {trips}")
+
+    company = build_company(count, trips, tickets_per_trip=0)
+    single = _timed(lambda: [company.book_ticket(trip_id, passenger_id) for trip_id, passenger_id in bookings])
+    print(f"  book_ticket: {single:.2f} с")
+
+    for atomic in (True, False):
+        company = build_company(count, trips, tickets_per_trip=0)
+        elapsed = _timed(lambda: company.book_many(bookings, atomic=atomic))
+        print(f"  book_many(atomic={atomic}): {elapsed:.2f} с ({single / elapsed:.1f}x)")
+
+
+def bench_search(trips, queries):
+    """
+    Поиск рейсов по направлению, интервалу отправления и свободным местам
+
+    Args:
+        trips: количество рейсов
+        queries: количество запросов
+    """
+    company = build_company(trips // 10, trips, routes=2000, transports=5000, tickets_per_trip=1)
+    rnd = random.Random(4)
+    start = datetime(2030, 1, 1)
+    requests = []
+    for _ in range(queries):
+        route = company.routes[rnd.randrange(len(company.routes))]
+        departure = start + timedelta(hours=rnd.randrange(365 * 24))
+        requests.append((route.start_point, route.end_point, departure, departure + timedelta(days=1)))
+
+    found = 0
+    started = time.perf_counter()
+    for start_point, end_point, departure_from, departure_to in requests:
+        found += len(company.search_trips(start_point, end_point, departure_from, departure_to, min_free_seats=2))
+    elapsed = time.perf_counter() - started
+    print(f"Рейсов: {trips}, запросов: {queries}, найдено в среднем: {found / queries:.1f}")
+    print(f"  {elapsed / queries * 1e6:.1f} мкс на запрос")
+
+
+def bench_conflicts(trips, queries):
+    """
+    Поиск накладок в расписании транспорта и водителей
+
+    Args:
+        trips: количество рейсов
+        queries: количество проверок нового рейса
+    """
+    company = build_company(1000, trips, routes=2000, transports=5000, tickets_per_trip=0)
+    rnd = random.Random(6)
+    probes = []
+    for _ in range(queries):
+        trip = company.trips[rnd.randrange(trips)]
+        shift = timedelta(minutes=rnd.randrange(-60, 60))
+        probes.append(Trip(0, trip.route, trip.transport, company.employees[rnd.randrange(len(company.employees))],
+                           trip.departure_time + shift, trip.arrival_time + shift, 50))
+
+    def scan(probe):
+        # Проверка перебором всех рейсов - для сравнения
+        return [t for t in company.trips
+                if (t.transport is probe.transport or t.driver is probe.driver)
+                and t.departure_time < probe.arrival_time and probe.departure_time < t.arrival_time]
+
+    found = 0
+    started = time.perf_counter()
+    for probe in probes:
+        found += len(company.find_trip_conflicts(probe))
+    indexed = time.perf_counter() - started
+    scanned = _timed(lambda: [scan(probe) for probe in probes[:10]]) / min(queries, 10)
+
+    print(f"Рейсов: {trips}, проверок: {queries}, накладок на проверку: {found / queries:.2f}")
+    print(f"  по индексу: {indexed / queries * 1e6:.1f} мкс, перебором: {scanned * 1000:.1f} мс на проверку")
+    conflicts = []
+    elapsed = _timed(lambda: conflicts.extend(company.schedule_conflicts()))
+    print(f"  аудит расписания: {elapsed:.2f} с, накладок: {len(conflicts)}")
+
+
+def bench_timetable(routes, days):
+    """
+    Генерация расписания с интервалом 7 минут с 5:30 до 23:00 по будним дням
+
+    Args:
+        routes: количество маршрутов
+        days: длина периода в днях
+    """
+    def fresh_company():
+        company = TransportCompany("Синтетический автопарк")
+        for i in range(routes):
+            company.add_route(Route(0, str(i + 1), f"Остановка {i}", f"Остановка {i + 1}", 5 + i % 20))
+        for i in range(routes * 10):
+            company.add_transport(Bus(0, "ЛиАЗ", "5292", 2020, 100, str(i // 10 + 1)))
+            company.add_employee(Employee(0, f"Водитель {i}", f"+7{i:010d}", "Водитель", 60000))
+        return company
+
+    def generate(company):
+        first_day = date(2030, 1, 1)
+        calendar = ServiceCalendar(first_day, first_day + timedelta(days=days - 1), ServiceCalendar.WEEKDAYS)
+        trips = []
+        for i, route in enumerate(company.routes):
+            profile = TravelTimeProfile.from_speed(route.distance, 25, periods=[(day_time(7), day_time(10), 15),
+                                                                                (day_time(17), day_time(20), 15)])
+            timetable = Timetable(route, calendar, day_time(5, 30), day_time(23), timedelta(minutes=7), 50, profile)
+            pool = slice(i * 10, i * 10 + 10)
+            trips.extend(timetable.generate(company.transports[pool], company.employees[pool]))
+        return trips
+
+    company = fresh_company()
+    trips = []
+    generated = _timed(lambda: trips.extend(generate(company)))
+    inserted = _timed(lambda: company.add_trips(trips))
+    print(f"Маршрутов: {routes}, дней: {days}, рейсов: {len(trips)}")
+    print(f"  генерация: {generated:.2f} с, add_trips: {inserted:.2f} с")
+
+    company = fresh_company()
+    trips = generate(company)
+    # Рейсы по одному, в порядке генерации (по маршрутам), как из меню
+    elapsed = _timed(lambda: [company.add_trip(trip) for trip in trips])
+    print(f"  add_trip по одному: {elapsed:.2f} с")
+
+
+def bench_fleet(routes, transports):
+    """
+    Назначение транспорта и водителей на рейсы одного дня
+
+    Args:
+        routes: количество маршрутов (около 150 рейсов в день на маршрут)
+        transports: количество активных машин и водителей
+    """
+    company = TransportCompany("Синтетический автопарк")
+    rnd = random.Random(7)
+    for i in range(transports):
+        company.add_transport(Bus(0, "ЛиАЗ", "5292", 2020, rnd.choice((40, 100, 150)), str(i % routes + 1)))
+        company.add_employee(Employee(0, f"Водитель {i}", f"+7{i:010d}", "Водитель", 60000))
+    day = date(2030, 1, 15)
+    calendar = ServiceCalendar(day, day)
+    for i in range(routes):
+        route = Route(0, str(i + 1), f"Остановка {i}", f"Остановка {i + 1}", 5 + i % 30)
+        company.add_route(route)
+        timetable = Timetable(route, calendar, day_time(5, 30 + i % 7), day_time(23), timedelta(minutes=7), 50)
+        company.add_trips(timetable.generate(company.transports[:1], company.employees[:1]))
+    trips = company.trips
+
+    # Нижняя граница числа машин: наибольшее число одновременных рейсов с учетом оборота
+    turnaround = timedelta(minutes=10)
+    events = sorted([(t.departure_time, 1) for t in trips] + [(t.arrival_time + turnaround, -1) for t in trips],
+                    key=lambda e: (e[0], e[1]))
+    concurrent = peak = 0
+    for _, delta in events:
+        concurrent += delta
+        peak = max(peak, concurrent)
+
+    scheduler = FleetScheduler(company, turnaround, max_shift=timedelta(hours=9))
+    started = time.perf_counter()
+    plan = scheduler.plan(trips, min_seats=50)
+    elapsed = time.perf_counter() - started
+    applied = _timed(lambda: scheduler.apply(plan))
+    print(f"Рейсов: {len(trips)}, машин и водителей в парке: {transports}")
+    print(f"  назначение: {elapsed:.2f} с, запись в компанию: {applied:.2f} с, без назначения: {len(plan.unassigned)}")
+    print(f"  машин: {plan.vehicle_count} (нижняя граница {peak}), водителей: {plan.driver_count}")
+    print(f"  накладок после назначения: {len(company.schedule_conflicts())}")
+
+
+def bench_views(passengers, trips, count):
+    """
+    Материализованные отчеты: стоимость обновления и чтения по сравнению с полным пересчетом
+
+    Args:
+        passengers: количество пассажиров
+        trips: количество рейсов
+        count: количество продаж и возвратов в замере
+    """
+    company = build_company(passengers, trips)
+    rnd = random.Random(8)
+    bookings = {}
+    while len(bookings) < count:
+        trip = company.trips[rnd.randrange(trips)]
+        passenger_id = rnd.randrange(passengers) + 1
+        if not trip.has_passenger(passenger_id):
+            bookings[trip.id, passenger_id] = None
+
+    def book_and_cancel():
+        for trip_id, passenger_id in bookings:
+            company.book_ticket(trip_id, passenger_id)
+        for trip_id, passenger_id in bookings:
+            company.cancel_ticket(trip_id, passenger_id)
+
+    book_and_cancel()  # первый возврат строит индекс строк журнала билетов
+    plain = _timed(book_and_cancel)
+    attached = _timed(lambda: ReportViews(company))
+    views = company.views
+    with_views = _timed(book_and_cancel)
+    print(f"Рейсов: {trips}, билетов: {len(company.ledger)}, продаж и возвратов: {2 * count}")
+    print(f"  продажа и возврат: {plain / count / 2 * 1e6:.1f} мкс без отчетов, "
+          f"{with_views / count / 2 * 1e6:.1f} мкс с отчетами")
+    print(f"  построение отчетов: {attached:.2f} с, проверка: {_timed(views.verify):.2f} с")
+    print(f"  чтение всех отчетов: {_timed(views.snapshot) * 1000:.1f} мс")
+
+
+def bench_listing(trips):
+    """
+    Отображение страницы списка рейсов в меню
+
+    Args:
+        trips: количество рейсов
+    """
+    company = build_company(trips // 10, trips)
+    manager = TransportManager(company)
+    pages = (trips + manager.TRIPS_PAGE_SIZE - 1) // manager.TRIPS_PAGE_SIZE
+    middle = pages // 2
+
+    cold = _timed(lambda: manager._render_trips_page(middle, pages))
+    warm = _timed(lambda: manager._render_trips_page(middle, pages))
+    trip = company.trips_page(middle * manager.TRIPS_PAGE_SIZE, 1)[0]
+    passenger = next(p for p in company.passengers if not trip.has_passenger(p.id))
+    company.book_ticket(trip.id, passenger.id)
+    booked = _timed(lambda: manager._render_trips_page(middle, pages))
+    print(f"Рейсов: {trips}, страниц: {pages} по {manager.TRIPS_PAGE_SIZE}")
+    print(f"  страница: {cold * 1000:.2f} мс первый раз, {warm * 1000:.2f} мс из кэша, "
+          f"{booked * 1000:.2f} мс после продажи билета")
+
+
+def bench_csv(rows):
+    """
+    Импорт пассажиров из CSV: порциями через add_passengers и построчно через add_passenger
+
+    Args:
+        rows: количество строк (каждая сотая - с ошибкой)
+    """
+    with tempfile.TemporaryDirectory() as tmp:
+        filename = os.path.join(tmp, "passengers.csv")
+        with open(filename, 'w', encoding='utf-8', newline='') as f:
+            f.write("name,phone,email,discount,category\n")
+            for i in range(rows):
+                discount = 150 if i % 100 == 99 else i % 50
+                f.write(f"Пассажир {i},+7{i:010d},p{i}@example.com,{discount},{CATEGORIES[i % 4]}\n")
+
+        company = TransportCompany("Импорт")
+        started = time.perf_counter()
+        result = import_csv(company, 'passengers', filename, os.path.join(tmp, "rejected.csv"))
+        batched = time.perf_counter() - started
+
+        single = TransportCompany("Импорт")
+        started = time.perf_counter()
+        import_csv(single, 'passengers', filename, batch_size=1)
+        per_batch_of_one = time.perf_counter() - started
+
+    print(f"Строк: {rows}, {result}")
+    print(f"  порциями по 10000: {batched:.2f} с ({rows / batched:,.0f} строк/с), "
+          f"по одной строке: {per_batch_of_one:.2f} с ({rows / per_batch_of_one:,.0f} строк/с)")
+
+
+def bench_shards(shard_counts, trips, count, batch, routes=1000, transports=1000):
+    """
+    Продажа билетов в компании, разделенной между процессами, при разном количестве шардов
+
+    Args:
+        shard_counts: количества шардов
+        trips: количество рейсов
+        count: количество попыток покупки
+        batch: билетов в одном вызове book_many
+        routes: количество маршрутов
+        transports: количество транспортных средств (и водителей)
+    """
+    rnd = random.Random(7)
+    bookings = [(rnd.randrange(trips) + 1, rnd.randrange(count) + 1) for _ in range(count)]
+    batches = [bookings[i:i + batch] for i in range(0, count, batch)]
+    start = datetime(2030, 1, 1, 5, 0)
+    print(f"Рейсов: {trips}, попыток покупки: {count}, по {batch} в запросе, процессоров: {os.cpu_count()}")
+
+    def fill(company):
+        """Одинаковые данные для обычной и разделенной компании"""
+        company.add_transports([Bus(0, "ЛиАЗ", "5292", 2020, 100, str(i)) for i in range(transports)])
+        company.add_employees([Employee(0, f"Водитель {i}", f"+7{i:010d}", "Водитель", 60000)
+                               for i in range(transports)])
+        company.add_passengers([Passenger(0, f"Пассажир {i}", f"+7{i:010d}", "", (i % 4) * 25, CATEGORIES[i % 4])
+                                for i in range(count)])
+        route_objects = [Route(0, str(i + 1), f"Остановка {i}", f"Остановка {i + 1}", 10) for i in range(routes)]
+        company.add_routes(route_objects)
+        transport = Bus(0, "ЛиАЗ", "5292", 2020, 100, "")
+        driver = Employee(0, "Водитель", "+70000000000", "Водитель", 60000)
+        trip_objects = []
+        for i in range(trips):
+            transport.id = driver.id = i % transports + 1
+            departure = start + timedelta(minutes=i)
+            trip_objects.append(Trip(0, route_objects[i % routes], transport, driver,
+                                     departure, departure + timedelta(minutes=30), 50))
+        company.add_trips(trip_objects)
+
+    def sell(company):
+        """Продано билетов, общее время и время процессора в текущем процессе (маршрутизаторе)"""
+        sold = 0
+        started, cpu_started = time.perf_counter(), time.process_time()
+        for part in batches:
+            sold += sum(isinstance(result, float) for result in company.book_many(part, atomic=False))
+        return sold, time.perf_counter() - started, time.process_time() - cpu_started
+
+    company = TransportCompany("Один процесс")
+    fill(company)
+    sold, baseline, _ = sell(company)
+    print(f"  один процесс: {count / baseline:,.0f} попыток/с, продано {sold}")
+
+    for shards in shard_counts:
+        with ShardedCompany("Шарды", shards) as company:
+            fill(company)
+            sold, elapsed, router = sell(company)
+            lookups = [trip_id for trip_id, _ in bookings[:1000]]
+            single = _timed(lambda: [company.get_trip(trip_id) for trip_id in lookups]) / len(lookups)
+        print(f"  шардов {shards}: {count / elapsed:,.0f} попыток/с ({baseline / elapsed:.2f}x), продано {sold}, "
+              f"запрос к одному шарду: {single * 1e6:.0f} мкс")
+        # Маршрутизатор работает последовательно: при шардах на разных ядрах время не меньше router
+        print(f"    маршрутизатор: {router:.2f} с из {elapsed:.2f} с, оценка при {shards} ядрах: "
+              f"{count / max(router, elapsed / shards):,.0f} попыток/с")
+
+
+def build_city(stops, trips, hubs=100, transports=5000, seed=5):
+    """
+    Синтетическая городская сеть: пересадочные узлы связаны между собой,
+    остальные остановки - со своим узлом в обе стороны
+
+    Args:
+        stops: количество остановок
+        trips: количество рейсов за день
+        hubs: количество пересадочных узлов
+        transports: количество транспортных средств (и водителей)
+        seed: зерно генератора случайных чисел
+    """
+    rnd = random.Random(seed)
+    company = TransportCompany("Синтетический город")
+    for i in range(transports):
+        company.add_transport(Bus(0, "ЛиАЗ", "5292", 2015 + i % 8, 100, str(i)))
+        company.add_employee(Employee(0, f"Водитель {i}", f"+7{i:010d}", "Водитель", 60000))
+
+    names = [f"Остановка {i}" for i in range(stops)]
+    pairs = [(a, b) for a in range(hubs) for b in range(hubs) if a != b]
+    pairs += [pair for s in range(hubs, stops) for pair in ((s, s % hubs), (s % hubs, s))]
+    for number, (a, b) in enumerate(pairs, 1):
+        company.add_route(Route(0, str(number), names[a], names[b], 2 + rnd.randrange(15)))
+
+    start = datetime(2030, 1, 1, 5, 0)
+    departures = sorted(start + timedelta(seconds=rnd.randrange(19 * 3600)) for _ in range(trips))
+    for i, departure in enumerate(departures):
+        route = company.routes[rnd.randrange(len(company.routes))]
+        company.add_trip(Trip(0, route, company.transports[i % transports], company.employees[i % transports],
+                              departure, departure + timedelta(minutes=route.distance * 2), 40))
+    return company
+
+
+def bench_journey(stops, trips, queries):
+    """
+    Планирование поездок с пересадками на синтетической городской сети
+
+    Args:
+        stops: количество остановок
+        trips: количество рейсов
+        queries: количество запросов
+    """
+    company = build_city(stops, trips)
+    build_time = _timed(lambda: JourneyPlanner(company))
+    planner = JourneyPlanner(company)
+    print(f"Остановок: {stops}, рейсов: {trips}, построение связей: {build_time:.2f} с")
+
+    rnd = random.Random(6)
+    times, found = [], 0
+    for _ in range(queries):
+        origin, destination = (f"Остановка {rnd.randrange(100, stops)}" for _ in range(2))
+        departure = datetime(2030, 1, 1, 6, 0) + timedelta(minutes=rnd.randrange(14 * 60))
+        started = time.perf_counter()
+        journey = planner.plan(origin, destination, departure, max_transfers=3)
+        times.append(time.perf_counter() - started)
+        found += journey is not None
+
+    times.sort()
+    print(f"  запросов: {queries}, найдено поездок: {found}")
+    print(f"  p50: {times[len(times) // 2] * 1000:.1f} мс, p99: {times[int(len(times) * 0.99)] * 1000:.1f} мс, "
+          f"среднее: {sum(times) / len(times) * 1000:.1f} мс")
+
+
+class _DictPassenger:
+    """Пассажир в прежнем виде для сравнения: атрибуты в __dict__, строки не интернируются"""
+
+    def __init__(self, id, name, phone, email="", discount=0.0, category="взрослый"):
+        if not name or len(name.strip()) == 0:
+            raise InvalidDataException("Имя не может быть пустым")
+        if not phone:
+            raise InvalidDataException("Телефон не может быть пустым")
+        self.id = id
+        self.name = name
+        self.phone = phone
+        self.email = email
+        if discount < 0 or discount > 100:
+            raise InvalidDataException("Скидка должна быть от 0 до 100")
+        self.discount = discount
+        self.category = category
+
+
+def _measure_passengers(cls, count):
+    """Память (байт на объект, включая строки) и время создания count пассажиров класса cls"""
+    gc.collect()
+    tracemalloc.start()
+    before, _ = tracemalloc.get_traced_memory()
+    started = time.perf_counter()
+
+    passengers = [
+        cls(i + 1, f"Пассажир {i}", f"+7{i:010d}", "", (i % 4) * 25, _fresh_string(CATEGORIES[i % 4]))
+        for i in range(count)
+    ]
+
+    elapsed = time.perf_counter() - started
+    after, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del passengers
+    return (after - before) / count, elapsed
+
+
+def bench_memory(count):
+    """
+    Память на один объект Passenger: со __slots__ и интернированием строк
+    и в прежнем виде с __dict__
+
+    Args:
+        count: количество пассажиров
+    """
+    print(f"Пассажиров: {count}")
+    results = {}
+    for title, cls in (("с __dict__", _DictPassenger), ("со __slots__", Passenger)):
+        per_object, elapsed = results[title] = _measure_passengers(cls, count)
+        print(f"  {title}: {per_object * count / 1024 / 1024:.1f} МБ, {per_object:.0f} байт на объект "
+              f"(включая строки), создание {elapsed:.2f} с")
+    saved = 1 - results["со __slots__"][0] / results["с __dict__"][0]
+    print(f"  экономия памяти: {saved:.0%}")
+
+
+def bench_ledger(count):
+    """
+    Скорость отчетов по журналу билетов
+
+    Args:
+        count: количество билетов
+    """
+    import numpy as np
+
+    rnd = np.random.default_rng(1)
+    ticket_ledger = TicketLedger()
+    ticket_ledger.categories = list(CATEGORIES)
+    columns = {
+        'trip_ids': rnd.integers(1, 100_000, count),
+        'passenger_ids': rnd.integers(1, 1_000_000, count),
+        'route_ids': rnd.integers(1, 500, count),
+        'category_codes': rnd.integers(0, len(CATEGORIES), count),
+        'discounts': rnd.choice([0.0, 25.0, 50.0, 100.0], count),
+        'fares': rnd.uniform(0, 100, count),
+        'departures': rnd.integers(1_900_000_000, 1_900_000_000 + 365 * 86400, count),
+    }
+    for name, typecode in TicketLedger.COLUMNS:
+        getattr(ticket_ledger, name).frombytes(columns[name].astype(typecode).tobytes())
+    del columns
+
+    print(f"Билетов: {len(ticket_ledger)}")
+    for report in ('revenue_by_route', 'revenue_by_day', 'revenue_by_category', 'discount_distribution'):
+        started = time.perf_counter()
+        result = getattr(ticket_ledger, report)()
+        elapsed = time.perf_counter() - started
+        print(f"  {report}: {elapsed * 1000:.1f} мс ({len(result)} групп)")
+
+
+def main():
+    """Главная функция"""
+    parser = argparse.ArgumentParser(description='Замеры производительности транспортной компании')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    memory_parser = subparsers.add_parser('memory', help='Память на объект Passenger')
+    memory_parser.add_argument('-n', '--count', type=int, default=1_000_000, help='Количество пассажиров')
+
+    ledger_parser = subparsers.add_parser('ledger', help='Отчеты по журналу билетов')
+    ledger_parser.add_argument('-n', '--count', type=int, default=10_000_000, help='Количество билетов')
+
+    persistence_parser = subparsers.add_parser('persistence', help='Сохранение и загрузка')
+    persistence_parser.add_argument('-p', '--passengers', type=int, default=1_000_000, help='Количество пассажиров')
+    persistence_parser.add_argument('-t', '--trips', type=int, default=200_000, help='Количество рейсов')
+
+    booking_parser = subparsers.add_parser('booking', help='Продажа билетов из многих потоков')
+    booking_parser.add_argument('-j', '--threads', type=int, default=32, help='Количество потоков')
+    booking_parser.add_argument('-n', '--attempts', type=int, default=200_000, help='Количество попыток')
+    booking_parser.add_argument('-t', '--trips', type=int, default=5_000, help='Количество рейсов')
+
+    book_many_parser = subparsers.add_parser('book-many', help='Покупка группы билетов')
+    book_many_parser.add_argument('-n', '--count', type=int, default=100_000, help='Количество билетов')
+
+    search_parser = subparsers.add_parser('search', help='Поиск рейсов по направлению')
+    search_parser.add_argument('-t', '--trips', type=int, default=1_000_000, help='Количество рейсов')
+    search_parser.add_argument('-q', '--queries', type=int, default=10_000, help='Количество запросов')
+
+    journey_parser = subparsers.add_parser('journey', help='Планирование поездок с пересадками')
+    journey_parser.add_argument('-s', '--stops', type=int, default=10_000, help='Количество остановок')
+    journey_parser.add_argument('-t', '--trips', type=int, default=1_000_000, help='Количество рейсов')
+    journey_parser.add_argument('-q', '--queries', type=int, default=200, help='Количество запросов')
+
+    conflicts_parser = subparsers.add_parser('conflicts', help='Накладки в расписании')
+    conflicts_parser.add_argument('-t', '--trips', type=int, default=1_000_000, help='Количество рейсов')
+    conflicts_parser.add_argument('-q', '--queries', type=int, default=10_000, help='Количество проверок')
+
+    timetable_parser = subparsers.add_parser('timetable', help='Генерация расписания')
+    timetable_parser.add_argument('-r', '--routes', type=int, default=10, help='Количество маршрутов')
+    timetable_parser.add_argument('-d', '--days', type=int, default=365, help='Длина периода в днях')
+
+    fleet_parser = subparsers.add_parser('fleet', help='Назначение транспорта и водителей')
+    fleet_parser.add_argument('-r', '--routes', type=int, default=350, help='Количество маршрутов')
+    fleet_parser.add_argument('-n', '--transports', type=int, default=20_000, help='Количество машин и водителей')
+
+    views_parser = subparsers.add_parser('views', help='Материализованные отчеты')
+    views_parser.add_argument('-p', '--passengers', type=int, default=100_000, help='Количество пассажиров')
+    views_parser.add_argument('-t', '--trips', type=int, default=100_000, help='Количество рейсов')
+    views_parser.add_argument('-n', '--count', type=int, default=100_000, help='Количество продаж')
+
+    listing_parser = subparsers.add_parser('listing', help='Страница списка рейсов')
+    listing_parser.add_argument('-t', '--trips', type=int, default=100_000, help='Количество рейсов')
+
+    csv_parser = subparsers.add_parser('csv', help='Импорт из CSV')
+    csv_parser.add_argument('-n', '--rows', type=int, default=1_000_000, help='Количество строк')
+
+    shards_parser = subparsers.add_parser('shards', help='Компания, разделенная между процессами')
+    shards_parser.add_argument('-s', '--shards', type=int, nargs='+', default=[1, 2, 4], help='Количества шардов')
+    shards_parser.add_argument('-t', '--trips', type=int, default=100_000, help='Количество рейсов')
+    shards_parser.add_argument('-n', '--count', type=int, default=1_000_000, help='Количество попыток покупки')
+    shards_parser.add_argument('-b', '--batch', type=int, default=1000, help='Билетов в одном запросе')
+
+    journal_parser = subparsers.add_parser('journal', help='Журнал изменений')
+    journal_parser.add_argument('-n', '--count', type=int, default=5_000, help='Количество билетов')
+
+    args = parser.parse_args()
+
+    if args.command == 'memory':
+        bench_memory(args.count)
+    elif args.command == 'ledger':
+        bench_ledger(args.count)
+    elif args.command == 'persistence':
+        bench_persistence(args.passengers, args.trips)
+    elif args.command == 'booking':
+        bench_booking(args.threads, args.attempts, args.trips)
+    elif args.command == 'book-many':
+        bench_book_many(args.count)
+    elif args.command == 'search':
+        bench_search(args.trips, args.queries)
+    elif args.command == 'journey':
+        bench_journey(args.stops, args.trips, args.queries)
+    elif args.command == 'timetable':
+        bench_timetable(args.routes, args.days)
+    elif args.command == 'fleet':
+        bench_fleet(args.routes, args.transports)
+    elif args.command == 'views':
+        bench_views(args.passengers, args.trips, args.count)
+    elif args.command == 'listing':
+        bench_listing(args.trips)
+    elif args.command == 'conflicts':
+        bench_conflicts(args.trips, args.queries)
+    elif args.command == 'csv':
+        bench_csv(args.rows)
+    elif args.command == 'shards':
+        bench_shards(args.shards, args.trips, args.count, args.batch)
+    elif args.command == 'journal':
+        bench_journal(args.count)
+
+
+if __name__ == '__main__':
+    main()
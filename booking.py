@@ -0,0 +1,74 @@
+"""
+Потокобезопасная продажа билетов поверх TransportCompany
+"""
+
+from contextlib import nullcontext
+from threading import Lock
+from typing import Dict
+from exceptions import NotFoundException
+
+
+class BookingEngine:
+    """
+    Продажа и возврат билетов из многих потоков
+
+    Проверка свободных мест и посадка пассажира выполняются под блокировкой рейса,
+    поэтому два потока не могут занять последнее место одновременно, а продажи
+    на разные рейсы друг друга не ждут. Общие журнал билетов, журнал изменений
+    и подключенные отчеты обновляются под отдельной короткой блокировкой (внутри
+    блокировки рейса, чтобы продажа и возврат одного билета попадали в журналы
+    в том же порядке). Запись журнала изменений на диск (fsync) откладывается
+    до выхода из этих блокировок.
+
+    Добавлять рейсы и пассажиров, загружать данные и строить отчеты нужно,
+    пока продажи через движок не идут.
+    """
+
+    def __init__(self, company):
+        self.company = company
+        self._trip_locks: Dict[int, Lock] = {}
+        self._trip_locks_guard = Lock()
+        self._records_lock = Lock()
+
+    def _trip_lock(self, trip_id: int) -> Lock:
+        """Блокировка рейса (создается при первом обращении)"""
+        lock = self._trip_locks.get(trip_id)
+        if lock is None:
+            with self._trip_locks_guard:
+                lock = self._trip_locks.setdefault(trip_id, Lock())
+        return lock
+
+    def _deferred_journal(self):
+        """Блок, после которого журнал изменений записывает набравшуюся группу"""
+        journal = self.company.journal
+        return journal.deferred() if journal is not None else nullcontext()
+
+    def book(self, trip_id: int, passenger_id: int) -> float:
+        """Покупка билета. Возвращает стоимость"""
+        company = self.company
+        trip = company.get_trip(trip_id)
+        if not trip:
+            raise NotFoundException(f"Рейс с ID {trip_id} не найден")
+        passenger = company.get_passenger(passenger_id)
+        if not passenger:
+            raise NotFoundException(f"Пассажир с ID {passenger_id} не найден")
+
+        with self._deferred_journal(), self._trip_lock(trip_id):
+            trip.add_passenger(passenger)
+            price = trip.ticket_price(passenger)
+            with self._records_lock:
+                company._ticket_booked(trip, passenger, price)
+        return price
+
+    def cancel(self, trip_id: int, passenger_id: int):
+        """Возврат билета"""
+        trip = self.company.get_trip(trip_id)
+        if not trip:
+            raise NotFoundException(f"Рейс с ID {trip_id} не найден")
+
+        with self._deferred_journal(), self._trip_lock(trip_id):
+            if not trip.has_passenger(passenger_id):
+                raise NotFoundException(f"Билет пассажира {passenger_id} на рейс {trip_id} не найден")
+            passenger = trip.remove_passenger(passenger_id)
+            with self._records_lock:
+                self.company._ticket_cancelled(trip, passenger)
@@ -0,0 +1,152 @@
+"""
+Потоковый импорт данных компании из CSV
+
+Файл читается порциями по batch_size строк: каждая строка проверяется правилами
+моделей (объект создается конструктором), правильные строки порции добавляются
+в компанию одним вызовом add_transports/add_employees/add_passengers/add_routes/
+add_trips с ID из одного зарезервированного блока. Неправильные строки не прерывают
+импорт, а записываются в отчет: исходные столбцы, номер строки файла и причина.
+
+Столбцы CSV (первая строка - заголовок, ID назначаются при импорте):
+    transports: type (bus, tram, trolleybus), brand, model, year, capacity[, status, route_number, line_number]
+    employees:  name, phone, position, salary
+    passengers: name, phone[, email, discount, category]
+    routes:     number, start_point, end_point, distance
+    trips:      route_id, transport_id, driver_id, departure_time, arrival_time (ISO 8601), fare
+"""
+
+import csv
+from contextlib import nullcontext
+from datetime import datetime
+from itertools import islice
+from typing import Callable, Dict, Optional
+from models import Transport, Tram, Employee, Passenger, Route, Trip
+from exceptions import TransportException, InvalidDataException, NotFoundException, FileOperationException
+from storage import TRANSPORT_CLASSES
+
+TRANSPORT_STATUSES = (Transport.STATUS_ACTIVE, Transport.STATUS_REPAIR, Transport.STATUS_RETIRED)
+
+
+def _transport_from_row(company, row: Dict[str, str]) -> Transport:
+    cls = TRANSPORT_CLASSES.get(row['type'].strip().lower())
+    if cls is None:
+        raise InvalidDataException(f"Неизвестный тип транспорта: {row['type']}")
+    number = row.get('line_number' if cls is Tram else 'route_number') or ''
+    transport = cls(0, row['brand'], row['model'], int(row['year']), int(row['capacity']), number)
+    status = row.get('status')
+    if status:
+        if status not in TRANSPORT_STATUSES:
+            raise InvalidDataException(f"Неизвестный статус: {status}")
+        transport.status = status
+    return transport
+
+
+def _employee_from_row(company, row: Dict[str, str]) -> Employee:
+    return Employee(0, row['name'], row['phone'], row['position'], float(row['salary']))
+
+
+def _passenger_from_row(company, row: Dict[str, str]) -> Passenger:
+    return Passenger(0, row['name'], row['phone'], row.get('email') or '',
+                     float(row.get('discount') or 0), row.get('category') or 'взрослый')
+
+
+def _route_from_row(company, row: Dict[str, str]) -> Route:
+    return Route(0, row['number'], row['start_point'], row['end_point'], float(row['distance']))
+
+
+def _trip_from_row(company, row: Dict[str, str]) -> Trip:
+    route = company.get_route(int(row['route_id']))
+    if not route:
+        raise NotFoundException(f"Маршрут с ID {row['route_id']} не найден")
+    transport = company.get_transport(int(row['transport_id']))
+    if not transport:
+        raise NotFoundException(f"Транспорт с ID {row['transport_id']} не найден")
+    driver = company.get_employee(int(row['driver_id']))
+    if not driver:
+        raise NotFoundException(f"Сотрудник с ID {row['driver_id']} не найден")
+    return Trip(0, route, transport, driver, datetime.fromisoformat(row['departure_time']),
+                datetime.fromisoformat(row['arrival_time']), float(row['fare']))
+
+
+# Секция -> (обязательные столбцы, создание объекта из строки, массовое добавление в компанию)
+IMPORTERS: Dict[str, tuple] = {
+    'transports': (('type', 'brand', 'model', 'year', 'capacity'), _transport_from_row, 'add_transports'),
+    'employees': (('name', 'phone', 'position', 'salary'), _employee_from_row, 'add_employees'),
+    'passengers': (('name', 'phone'), _passenger_from_row, 'add_passengers'),
+    'routes': (('number', 'start_point', 'end_point', 'distance'), _route_from_row, 'add_routes'),
+    'trips': (('route_id', 'transport_id', 'driver_id', 'departure_time', 'arrival_time', 'fare'),
+              _trip_from_row, 'add_trips'),
+}
+
+
+class ImportResult:
+    """Итог импорта: количество добавленных и отклоненных строк"""
+
+    def __init__(self, section: str):
+        self.section = section
+        self.imported = 0
+        self.rejected = 0
+
+    def __str__(self):
+        return f"{self.section}: добавлено {self.imported}, отклонено {self.rejected}"
+
+
+def import_csv(company, section: str, filename: str, rejected_filename: Optional[str] = None,
+               batch_size: int = 10_000, delimiter: str = ',',
+               progress: Optional[Callable[[ImportResult], None]] = None) -> ImportResult:
+    """
+    Импорт одной секции из CSV
+
+    Args:
+        company: транспортная компания (нужны методы add_<секция> для массового добавления)
+        section: transports, employees, passengers, routes или trips
+        filename: файл CSV в UTF-8 (допускается BOM)
+        rejected_filename: отчет об отклоненных строках (CSV); None - отчет не пишется
+        batch_size: строк в порции
+        delimiter: разделитель столбцов
+        progress: вызывается после каждой порции
+
+    Порции, добавленные до ошибки чтения файла, остаются в компании.
+    """
+    if section not in IMPORTERS:
+        raise InvalidDataException(f"Неизвестная секция: {section}")
+    required, from_row, add_method = IMPORTERS[section]
+    add_many = getattr(company, add_method)
+    result = ImportResult(section)
+
+    try:
+        with open(filename, 'r', encoding='utf-8-sig', newline='') as f, \
+                (open(rejected_filename, 'w', encoding='utf-8', newline='') if rejected_filename
+                 else nullcontext()) as report:
+            reader = csv.DictReader(f, delimiter=delimiter)
+            missing = [name for name in required if name not in (reader.fieldnames or ())]
+            if missing:
+                raise InvalidDataException(f"В файле {filename} нет столбцов: {', '.join(missing)}")
+            writer = None
+            if report is not None:
+                writer = csv.writer(report, delimiter=delimiter)
+                writer.writerow(list(reader.fieldnames) + ['line', 'error'])
+
+            while True:
+                # Номер строки файла (для значения с переводами строк - последней строки записи)
+                batch = [(reader.line_num, row) for row in islice(reader, batch_size)]
+                if not batch:
+                    break
+
+                objects = []
+                for line, row in batch:
+                    try:
+                        objects.append(from_row(company, row))
+                    except (TransportException, ValueError, TypeError, AttributeError) as e:
+                        result.rejected += 1
+                        if writer is not None:
+                            writer.writerow([row.get(name) for name in reader.fieldnames] + [line, str(e)])
+                add_many(objects)
+                result.imported += len(objects)
+                if progress is not None:
+                    progress(result)
+    except OSError as e:
+        raise FileOperationException(f"Ошибка импорта из CSV: {e}")
+    except csv.Error as e:
+        raise InvalidDataException(f"Ошибка чтения CSV {filename}: {e}")
+    return result
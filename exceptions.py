@@ -16,4 +16,9 @@ class NotFoundException(TransportException):
 
 class FileOperationException(TransportException):
     """Исключение при работе с файлами"""
-    pass
\ No newline at end of file
+    pass
+
+
+class ScheduleConflictException(TransportException):
+    """Исключение при пересечении рейсов одного транспорта или водителя"""
+    pass
@@ -0,0 +1,211 @@
+"""
+Назначение транспорта и водителей на рейсы
+
+FleetScheduler распределяет рейсы (например, рейсы одного дня) между активным
+транспортом и водителями так, чтобы задействовать как можно меньше машин и людей.
+Рейсы просматриваются в порядке отправления (sweep line) один раз: машина и водитель
+назначаются вместе, водитель занимается только рейсом, получившим машину. Занятые машины
+и водители лежат в куче по времени освобождения, а свободные - в упорядоченных списках
+и куче; рейс обрабатывается за O(log n) плюс число кандидатов, которые пришлось
+пропустить: водителей, чью смену рейс продлил бы дольше max_shift, и машин и водителей,
+занятых рейсами компании вне плана.
+Положение машин не учитывается: освободившаяся машина может взять любой рейс.
+"""
+
+import heapq
+from bisect import bisect_left, insort
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Optional, Tuple
+from models import Transport, Employee, Trip
+
+
+class FleetPlan:
+    """Результат назначения: транспорт и водитель по ID рейса и рейсы без назначения"""
+
+    def __init__(self):
+        self.vehicles: Dict[int, Transport] = {}
+        self.drivers: Dict[int, Employee] = {}
+        self.unassigned: List[Trip] = []
+
+    @property
+    def vehicle_count(self) -> int:
+        """Количество задействованных машин"""
+        return len({t.id for t in self.vehicles.values()})
+
+    @property
+    def driver_count(self) -> int:
+        """Количество задействованных водителей"""
+        return len({d.id for d in self.drivers.values()})
+
+
+class FleetScheduler:
+    """Назначение транспорта и водителей методом разбиения интервалов"""
+
+    def __init__(self, company, turnaround: timedelta = timedelta(minutes=10),
+                 driver_break: Optional[timedelta] = None, max_shift: Optional[timedelta] = None):
+        """
+        Args:
+            company: транспортная компания
+            turnaround: время между прибытием машины и ее следующим отправлением
+            driver_break: перерыв водителя между рейсами (по умолчанию - turnaround)
+            max_shift: наибольшая длина смены водителя от первого отправления до последнего прибытия
+        """
+        self.company = company
+        self.turnaround = turnaround
+        self.driver_break = turnaround if driver_break is None else driver_break
+        self.max_shift = max_shift
+
+    def plan(self, trips: List[Trip], min_seats: int = 0) -> FleetPlan:
+        """
+        Назначение для рейсов без изменения компании
+
+        Машине рейса должно хватать мест на уже проданные билеты и не меньше min_seats;
+        из подходящих берется свободная машина наименьшей вместимости, новая машина -
+        только если свободной нет. Водитель - освободившийся с самой ранней сменой,
+        которую рейс не продлит дольше max_shift. Рейсы компании, не вошедшие в trips
+        (например, ночной рейс прошлого дня), остаются на своих машинах и водителях:
+        машина или водитель такого рейса не берет пересекающийся с ним рейс плана
+        (с учетом оборота и перерыва). Длина смены считается только по рейсам плана.
+        Рейс, для которого не нашлось машины или водителя, попадает в unassigned.
+        """
+        trips = sorted(trips, key=lambda t: (t.departure_time, t.arrival_time, t.id))
+        planned = {t.id for t in trips}
+        vehicles = _VehiclePool(self.company.get_active_transports(), self.turnaround,
+                                self._fixed_trips_check('transport', self.turnaround, planned))
+        drivers = _DriverPool(self.company.get_drivers(), self.driver_break, self.max_shift,
+                              self._fixed_trips_check('driver', self.driver_break, planned))
+
+        result = FleetPlan()
+        for trip in trips:
+            vehicles.release(trip.departure_time)
+            drivers.release(trip.departure_time)
+            transport = vehicles.take(max(trip.get_passenger_count(), min_seats), trip)
+            if transport is None:
+                result.unassigned.append(trip)
+                continue
+            driver = drivers.take(trip)
+            if driver is None:
+                # Машина остается свободной для следующих рейсов
+                vehicles.give_back(transport)
+                result.unassigned.append(trip)
+                continue
+            vehicles.occupy(transport, trip)
+            drivers.occupy(driver, trip)
+            result.vehicles[trip.id] = transport
+            result.drivers[trip.id] = driver
+        return result
+
+    def _fixed_trips_check(self, kind: str, gap: timedelta, planned) -> Callable[[int, Trip], bool]:
+        """
+        Проверка, занята ли машина (kind='transport') или водитель (kind='driver')
+        рейсом компании вне плана, который не оставляет gap до или после рейса trip
+        """
+        index = self.company._trip_intervals[kind]
+
+        def busy(obj_id: int, trip: Trip) -> bool:
+            overlapping = index.overlapping(obj_id, trip.departure_time - gap, trip.arrival_time + gap)
+            return any(trip_id not in planned for trip_id in overlapping)
+        return busy
+
+    def apply(self, plan: FleetPlan):
+        """Запись назначения в компанию"""
+        for trip_id, transport in plan.vehicles.items():
+            self.company.reassign_trip(trip_id, transport.id, plan.drivers[trip_id].id)
+
+
+class _VehiclePool:
+    """Машины при проходе по рейсам: свободные, еще не задействованные и занятые до момента"""
+
+    def __init__(self, transports: List[Transport], turnaround: timedelta, busy: Callable[[int, Trip], bool]):
+        self.transports = {t.id: t for t in transports}
+        self.turnaround = turnaround
+        self.busy_with_fixed = busy
+        # Свободные и еще не задействованные машины: отсортированные списки (вместимость, ID)
+        self.free: List[Tuple[int, int]] = []
+        self.unused = sorted((t.capacity, t.id) for t in transports)
+        self.busy: List[Tuple[datetime, int]] = []
+        self._used = set()
+
+    def release(self, moment: datetime):
+        """Машины, освободившиеся к моменту moment, становятся свободными"""
+        while self.busy and self.busy[0][0] <= moment:
+            transport = self.transports[heapq.heappop(self.busy)[1]]
+            insort(self.free, (transport.capacity, transport.id))
+
+    def take(self, need: int, trip: Trip) -> Optional[Transport]:
+        """Свободная машина наименьшей вместимости не меньше need, иначе - новая (не занятая рейсами вне плана)"""
+        for pool in (self.free, self.unused):
+            for pos in range(bisect_left(pool, (need,)), len(pool)):
+                if not self.busy_with_fixed(pool[pos][1], trip):
+                    return self.transports[pool.pop(pos)[1]]
+        return None
+
+    def give_back(self, transport: Transport):
+        """Возврат взятой, но не назначенной машины туда, откуда она взята"""
+        insort(self.free if transport.id in self._used else self.unused, (transport.capacity, transport.id))
+
+    def occupy(self, transport: Transport, trip: Trip):
+        self._used.add(transport.id)
+        heapq.heappush(self.busy, (trip.arrival_time + self.turnaround, transport.id))
+
+
+class _DriverPool:
+    """Водители при проходе по рейсам: свободные по началу смены, еще не задействованные и занятые"""
+
+    def __init__(self, drivers: List[Employee], driver_break: timedelta, max_shift: Optional[timedelta],
+                 busy: Callable[[int, Trip], bool]):
+        self.unused = drivers[::-1]
+        self.drivers = {d.id: d for d in drivers}
+        self.driver_break = driver_break
+        self.max_shift = max_shift
+        self.busy_with_fixed = busy
+        # Начало смены водителя; свободные водители - куча (начало смены, ID)
+        self.shift_start: Dict[int, datetime] = {}
+        self.free: List[Tuple[datetime, int]] = []
+        self.busy: List[Tuple[datetime, int]] = []
+
+    def release(self, moment: datetime):
+        """Водители, освободившиеся к моменту moment, становятся свободными"""
+        while self.busy and self.busy[0][0] <= moment:
+            driver_id = heapq.heappop(self.busy)[1]
+            heapq.heappush(self.free, (self.shift_start[driver_id], driver_id))
+
+    def take(self, trip: Trip) -> Optional[Employee]:
+        """
+        Свободный водитель с самой ранней сменой, которую рейс не продлит дольше max_shift, иначе - новый
+
+        Пропущенные водители (смена стала бы слишком длинной, занят рейсом вне плана)
+        возвращаются в кучу, поэтому время - O(log n) на каждого пропущенного.
+        """
+        max_shift = self.max_shift
+        driver_id = None
+        postponed = []
+        while self.free:
+            start, candidate = heapq.heappop(self.free)
+            if max_shift is not None and trip.arrival_time - start > max_shift:
+                # Закончившаяся смена больше не понадобится, иначе - подойдет более короткому рейсу
+                if trip.departure_time - start < max_shift:
+                    postponed.append((start, candidate))
+                continue
+            if self.busy_with_fixed(candidate, trip):
+                postponed.append((start, candidate))
+                continue
+            driver_id = candidate
+            break
+        for item in postponed:
+            heapq.heappush(self.free, item)
+
+        if driver_id is None:
+            if max_shift is not None and trip.arrival_time - trip.departure_time > max_shift:
+                return None
+            for pos in range(len(self.unused) - 1, -1, -1):
+                if not self.busy_with_fixed(self.unused[pos].id, trip):
+                    driver_id = self.unused.pop(pos).id
+                    break
+            else:
+                return None
+        return self.drivers[driver_id]
+
+    def occupy(self, driver: Employee, trip: Trip):
+        self.shift_start.setdefault(driver.id, trip.departure_time)
+        heapq.heappush(self.busy, (trip.arrival_time + self.driver_break, driver.id))
@@ -0,0 +1,330 @@
+"""
+HTTP-сервис с JSON для работы с транспортной компанией
+
+Сервер на asyncio без сторонних библиотек: соединения keep-alive, конвейерные
+запросы (ответы отправляются в порядке запросов), ограничение числа запросов,
+обрабатываемых одновременно, и закрытие простаивающих соединений.
+
+Запросы:
+    GET    /company                               - название и количество объектов
+    GET    /transports?status=...&limit=&offset=  - транспорт
+    GET    /transports/{id}
+    GET    /routes?number=...                     - маршруты
+    GET    /routes/{id}
+    GET    /passengers/{id}
+    GET    /trips?from=...&to=...&route_id=...&limit=...
+                                                  - рейсы в интервале [from, to) или ближайшие после from
+    GET    /trips/{id}
+    POST   /trips/{id}/tickets  {"passenger_id": N} - покупка билета
+    DELETE /trips/{id}/tickets/{passenger_id}     - возврат билета
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+from datetime import datetime
+from itertools import islice
+from typing import Dict, Optional, Tuple
+from urllib.parse import parse_qs, urlsplit
+from models import Transport
+from exceptions import NotFoundException, InvalidDataException, TransportException
+from storage import RECORD_BUILDERS, trip_to_record
+from transport_company import TransportCompany
+
+REASONS = {
+    200: 'OK',
+    201: 'Created',
+    400: 'Bad Request',
+    404: 'Not Found',
+    405: 'Method Not Allowed',
+    409: 'Conflict',
+    411: 'Length Required',
+    413: 'Payload Too Large',
+    431: 'Request Header Fields Too Large',
+    500: 'Internal Server Error',
+    501: 'Not Implemented',
+}
+
+MAX_BODY = 1 << 20
+DEFAULT_LIMIT = 100
+
+logger = logging.getLogger(__name__)
+
+
+class HttpError(Exception):
+    """Ошибка запроса с кодом ответа HTTP"""
+
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+
+
+def trip_to_json(trip) -> Dict:
+    """Рейс для ответа: без списка пассажиров, со свободными местами"""
+    record = trip_to_record(trip)
+    del record['passengers']
+    record['free_seats'] = trip.get_free_seats()
+    return record
+
+
+class TransportService:
+    """HTTP-сервис поверх TransportCompany"""
+
+    def __init__(self, company: TransportCompany, max_concurrency: int = 64, idle_timeout: float = 60.0):
+        """
+        Args:
+            company: транспортная компания
+            max_concurrency: сколько запросов обрабатывается одновременно (до отправки ответа);
+                остальные ждут, пока не завершится обработка одного из них
+            idle_timeout: через сколько секунд без нового запроса соединение закрывается
+        """
+        self.company = company
+        self.idle_timeout = idle_timeout
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+
+    async def start(self, host: str = '127.0.0.1', port: int = 8080) -> asyncio.AbstractServer:
+        """Запуск сервера (port=0 - любой свободный порт)"""
+        return await asyncio.start_server(self.handle_connection, host, port)
+
+    async def handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        """
+        Обработка соединения: запросы читаются и обрабатываются по очереди
+
+        Конвейерные запросы, уже пришедшие в буфер, читаются без ожидания ответов
+        на предыдущие, а ответы пишутся в том же порядке. Место в ограничении
+        max_concurrency занимает только обработка запроса, а не ожидание следующего:
+        соединение, не приславшее запрос за idle_timeout секунд, закрывается.
+        """
+        try:
+            while True:
+                try:
+                    request = await asyncio.wait_for(self._read_request(reader), self.idle_timeout)
+                except asyncio.TimeoutError:
+                    break
+                except HttpError as e:
+                    await self._respond(writer, e.status, {'error': str(e)}, keep_alive=False)
+                    break
+                if request is None:
+                    break
+
+                method, target, version, headers, body = request
+                keep_alive = _keep_alive(version, headers)
+                async with self._semaphore:
+                    status, payload = self.dispatch(method, target, body)
+                    await self._respond(writer, status, payload, keep_alive)
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    @staticmethod
+    async def _read_request(reader: asyncio.StreamReader) -> Optional[Tuple]:
+        """Чтение запроса: (метод, адрес, версия, заголовки, тело) или None при закрытом соединении"""
+        try:
+            head = await reader.readuntil(b'\r\n\r\n')
+        except asyncio.IncompleteReadError as e:
+            if e.partial.strip():
+                raise HttpError(400, "Неполный запрос")
+            return None
+        except asyncio.LimitOverrunError:
+            raise HttpError(431, "Слишком большие заголовки")
+
+        lines = head.decode('latin-1').split('\r\n')
+        try:
+            method, target, version = lines[0].split(' ')
+        except ValueError:
+            raise HttpError(400, "Неверная строка запроса")
+
+        headers = {}
+        for line in lines[1:]:
+            if line:
+                name, _, value = line.partition(':')
+                headers[name.strip().lower()] = value.strip()
+
+        if 'chunked' in headers.get('transfer-encoding', ''):
+            raise HttpError(501, "Передача частями не поддерживается")
+        try:
+            length = int(headers.get('content-length', 0))
+        except ValueError:
+            raise HttpError(400, "Неверный Content-Length")
+        if length > MAX_BODY:
+            raise HttpError(413, "Слишком большое тело запроса")
+        body = await reader.readexactly(length) if length else b''
+        return method, target, version, headers, body
+
+    @staticmethod
+    async def _respond(writer: asyncio.StreamWriter, status: int, payload, keep_alive: bool):
+        body = json.dumps(payload, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+        head = (f"HTTP/1.1 {status} {REASONS[status]}\r\n"
+                f"Content-Type: application/json; charset=utf-8\r\n"
+                f"Content-Length: {len(body)}\r\n"
+                f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n")
+        writer.write(head.encode('latin-1') + body)
+        await writer.drain()
+
+    def dispatch(self, method: str, target: str, body: bytes) -> Tuple[int, object]:
+        """Обработка запроса: (код ответа, данные для JSON)"""
+        url = urlsplit(target)
+        parts = [part for part in url.path.split('/') if part]
+        query = {name: values[-1] for name, values in parse_qs(url.query).items()}
+        try:
+            return self._route(method, parts, query, body)
+        except HttpError as e:
+            return e.status, {'error': str(e)}
+        except NotFoundException as e:
+            return 404, {'error': str(e)}
+        except InvalidDataException as e:
+            return 400, {'error': str(e)}
+        except TransportException as e:
+            return 409, {'error': str(e)}
+        except Exception:
+            # Подробности ошибки остаются в журнале сервера и клиенту не передаются
+            logger.exception("Ошибка обработки запроса %s %s", method, target)
+            return 500, {'error': "Внутренняя ошибка сервера"}
+
+    def _route(self, method: str, parts: list, query: Dict[str, str], body: bytes) -> Tuple[int, object]:
+        company = self.company
+        if not parts:
+            raise HttpError(404, "Неизвестный адрес")
+        resource, args = parts[0], parts[1:]
+
+        if resource == 'trips' and len(args) >= 2 and args[1] == 'tickets':
+            trip_id = _int(args[0], 'ID рейса')
+            if method == 'POST' and len(args) == 2:
+                passenger_id = _int(_json_body(body).get('passenger_id'), 'passenger_id')
+                price = company.book_ticket(trip_id, passenger_id)
+                return 201, {'trip_id': trip_id, 'passenger_id': passenger_id, 'price': price}
+            if method == 'DELETE' and len(args) == 3:
+                company.cancel_ticket(trip_id, _int(args[2], 'ID пассажира'))
+                return 200, {}
+            raise HttpError(405 if len(args) in (2, 3) else 404, "Метод не поддерживается")
+
+        if method != 'GET':
+            raise HttpError(405, "Метод не поддерживается")
+
+        if resource == 'company' and not args:
+            return 200, {
+                'name': company.name,
+                'transports': len(company.transports),
+                'employees': len(company.employees),
+                'passengers': len(company.passengers),
+                'routes': len(company.routes),
+                'trips': len(company.trips),
+            }
+
+        if resource in ('transports', 'routes', 'passengers', 'trips') and len(args) == 1:
+            obj = getattr(company, f'get_{resource[:-1]}')(_int(args[0], 'ID'))
+            if obj is None:
+                raise NotFoundException(f"Объект с ID {args[0]} не найден")
+            return 200, trip_to_json(obj) if resource == 'trips' else RECORD_BUILDERS[resource](obj)
+
+        if args:
+            raise HttpError(404, "Неизвестный адрес")
+        limit = _int(query.get('limit', DEFAULT_LIMIT), 'limit')
+        offset = _int(query.get('offset', 0), 'offset')
+
+        if resource == 'transports':
+            if 'status' in query:
+                transports = company.query(Transport, status=query['status'])
+            else:
+                transports = company.transports
+            return 200, [RECORD_BUILDERS['transports'](t) for t in islice(transports, offset, offset + limit)]
+
+        if resource == 'routes':
+            if 'number' in query:
+                route = company.get_route_by_number(query['number'])
+                routes = [route] if route else []
+            else:
+                routes = company.routes
+            return 200, [RECORD_BUILDERS['routes'](r) for r in islice(routes, offset, offset + limit)]
+
+        if resource == 'trips':
+            route_id = _int(query['route_id'], 'route_id') if 'route_id' in query else None
+            start = _datetime(query['from'], 'from') if 'from' in query else datetime.now()
+            if 'to' in query:
+                trips = company.trips_between(start, _datetime(query['to'], 'to'), route_id)
+                trips = trips[offset:offset + limit]
+            else:
+                trips = company.upcoming_trips(start, offset + limit, route_id)[offset:]
+            return 200, [trip_to_json(t) for t in trips]
+
+        raise HttpError(404, "Неизвестный адрес")
+
+
+def _int(value, name: str) -> int:
+    try:
+        number = int(value)
+    except (TypeError, ValueError):
+        raise HttpError(400, f"{name}: ожидается целое число")
+    if number < 0:
+        raise HttpError(400, f"{name}: ожидается неотрицательное число")
+    return number
+
+
+def _datetime(value: str, name: str) -> datetime:
+    try:
+        return datetime.fromisoformat(value)
+    except ValueError:
+        raise HttpError(400, f"{name}: ожидается дата и время в формате ISO")
+
+
+def _json_body(body: bytes) -> Dict:
+    try:
+        data = json.loads(body or b'{}')
+    except ValueError:
+        raise HttpError(400, "Тело запроса не является JSON")
+    if not isinstance(data, dict):
+        raise HttpError(400, "Тело запроса должно быть JSON-объектом")
+    return data
+
+
+def _keep_alive(version: str, headers: Dict[str, str]) -> bool:
+    """HTTP/1.1 держит соединение, пока клиент не попросит закрыть, HTTP/1.0 - наоборот"""
+    connection = headers.get('connection', '').lower()
+    if version == 'HTTP/1.0':
+        return connection == 'keep-alive'
+    return connection != 'close'
+
+
+def load_company(filename: str) -> TransportCompany:
+    """Загрузка компании из файла; формат определяется по расширению"""
+    company = TransportCompany("")
+    extension = filename.rsplit('.', 1)[-1].lower()
+    loaders = {'json': company.load_from_json, 'ndjson': company.load_from_ndjson,
+               'xml': company.load_from_xml, 'snap': company.load_from_snapshot}
+    loaders.get(extension, company.load_from_json)(filename)
+    return company
+
+
+async def serve(company: TransportCompany, host: str, port: int, max_concurrency: int, idle_timeout: float):
+    server = await TransportService(company, max_concurrency, idle_timeout).start(host, port)
+    address = server.sockets[0].getsockname()
+    print(f"Сервис запущен: http://{address[0]}:{address[1]}/")
+    async with server:
+        await server.serve_forever()
+
+
+def main():
+    """Главная функция"""
+    parser = argparse.ArgumentParser(description='HTTP-сервис транспортной компании')
+    parser.add_argument('data', nargs='?', help='Файл данных (json, ndjson, xml или snap)')
+    parser.add_argument('--host', default='127.0.0.1', help='Адрес')
+    parser.add_argument('-p', '--port', type=int, default=8080, help='Порт')
+    parser.add_argument('-c', '--concurrency', type=int, default=64, help='Запросов одновременно')
+    parser.add_argument('--idle-timeout', type=float, default=60.0,
+                        help='Закрытие соединения без запросов через столько секунд')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    company = load_company(args.data) if args.data else TransportCompany("Транспортная компания")
+    try:
+        asyncio.run(serve(company, args.host, args.port, args.concurrency, args.idle_timeout))
+    except KeyboardInterrupt:
+        print("\nСервис остановлен")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,211 @@
+"""
+Вторичные индексы для объектов транспортной компании
+"""
+
+import heapq
+from bisect import bisect_left, bisect_right, insort
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Set, Tuple
+
+
+class HashIndex:
+    """Индекс по значению атрибута: значение -> множество ID объектов"""
+
+    def __init__(self, key: Callable[[Any], Any]):
+        self.key = key
+        self._buckets: Dict[Any, Set[int]] = {}
+
+    def add(self, obj):
+        """Добавление объекта в индекс"""
+        self._buckets.setdefault(self.key(obj), set()).add(obj.id)
+
+    def add_many(self, objects: Iterable):
+        """Добавление многих объектов"""
+        key, buckets = self.key, self._buckets
+        for obj in objects:
+            buckets.setdefault(key(obj), set()).add(obj.id)
+
+    def remove(self, obj, value=None):
+        """Удаление объекта из индекса (value - значение, под которым он был добавлен)"""
+        if value is None:
+            value = self.key(obj)
+        bucket = self._buckets.get(value)
+        if bucket is not None:
+            bucket.discard(obj.id)
+            if not bucket:
+                del self._buckets[value]
+
+    def get(self, value) -> Set[int]:
+        """ID объектов с заданным значением"""
+        return self._buckets.get(value, set())
+
+    def keys(self) -> Iterable:
+        """Все значения, присутствующие в индексе"""
+        return self._buckets.keys()
+
+    def rebuild(self, objects: Iterable):
+        """Построение индекса заново по набору объектов"""
+        self._buckets = {}
+        for obj in objects:
+            self.add(obj)
+
+    def clear(self):
+        self._buckets.clear()
+
+
+class SortedIndex:
+    """Упорядоченный индекс для диапазонных запросов: отсортированный список (значение, ID)"""
+
+    def __init__(self, key: Callable[[Any], Any]):
+        self.key = key
+        self._entries: List[Tuple[Any, int]] = []
+
+    def add(self, obj):
+        """Добавление объекта в индекс"""
+        insort(self._entries, (self.key(obj), obj.id))
+
+    def add_many(self, objects: Iterable):
+        """Добавление многих объектов: дописывание и одна сортировка (слияние упорядоченных участков)"""
+        key = self.key
+        self._entries.extend((key(obj), obj.id) for obj in objects)
+        self._entries.sort()
+
+    def remove(self, obj, value=None):
+        """Удаление объекта из индекса (value - значение, под которым он был добавлен)"""
+        if value is None:
+            value = self.key(obj)
+        entry = (value, obj.id)
+        pos = bisect_left(self._entries, entry)
+        if pos < len(self._entries) and self._entries[pos] == entry:
+            del self._entries[pos]
+
+    def range(self, low=None, high=None, include_low=True, include_high=True) -> Iterator[int]:
+        """ID объектов со значением в диапазоне [low, high] в порядке возрастания значения"""
+        entries = self._entries
+        if low is None:
+            start = 0
+        elif include_low:
+            start = bisect_left(entries, (low,))
+        else:
+            start = bisect_right(entries, (low, float('inf')))
+
+        for pos in range(start, len(entries)):
+            value, obj_id = entries[pos]
+            if high is not None and (value > high or (value == high and not include_high)):
+                break
+            yield obj_id
+
+    def get(self, value) -> Set[int]:
+        """ID объектов с заданным значением"""
+        return set(self.range(value, value))
+
+    def __len__(self):
+        return len(self._entries)
+
+    def rank(self, value) -> int:
+        """Количество объектов со значением меньше value"""
+        return bisect_left(self._entries, (value,))
+
+    def page(self, offset: int, limit: int) -> List[int]:
+        """ID объектов с позиции offset (не более limit) в порядке возрастания значения"""
+        return [obj_id for _, obj_id in self._entries[offset:offset + limit]]
+
+    def rebuild(self, objects: Iterable):
+        """Построение индекса заново по набору объектов"""
+        self._entries = sorted((self.key(obj), obj.id) for obj in objects)
+
+    def clear(self):
+        self._entries.clear()
+
+
+class IntervalIndex:
+    """
+    Индекс интервалов [начало, конец) по группам (например, рейсы по транспорту):
+    в каждой группе отсортированный по началу список (начало, конец, ID)
+
+    Для группы запоминается наибольшая длина интервала, поэтому пересекающиеся
+    с [start, end) интервалы ищутся двоичным поиском среди начинающихся
+    в [start - наибольшая длина, end), без просмотра всей группы.
+    """
+
+    def __init__(self, group: Callable[[Any], Any], start: Callable[[Any], Any], end: Callable[[Any], Any]):
+        self.group = group
+        self.start = start
+        self.end = end
+        self._groups: Dict[Any, List[Tuple[Any, Any, int]]] = {}
+        self._max_length: Dict[Any, Any] = {}
+
+    def _value(self, obj) -> Tuple[Any, Any, Any]:
+        return self.group(obj), self.start(obj), self.end(obj)
+
+    def _track_length(self, key, length):
+        if key not in self._max_length or length > self._max_length[key]:
+            self._max_length[key] = length
+
+    def add(self, obj):
+        """Добавление объекта в индекс"""
+        key, start, end = self._value(obj)
+        insort(self._groups.setdefault(key, []), (start, end, obj.id))
+        self._track_length(key, end - start)
+
+    def add_many(self, objects: Iterable):
+        """Добавление многих объектов: по группам дописывание и одна сортировка"""
+        touched = set()
+        for obj in objects:
+            key, start, end = self._value(obj)
+            self._groups.setdefault(key, []).append((start, end, obj.id))
+            self._track_length(key, end - start)
+            touched.add(key)
+        for key in touched:
+            self._groups[key].sort()
+
+    def remove(self, obj, value=None):
+        """Удаление объекта из индекса (value - (группа, начало, конец), под которыми он был добавлен)"""
+        key, start, end = self._value(obj) if value is None else value
+        entries = self._groups.get(key)
+        if entries is None:
+            return
+        entry = (start, end, obj.id)
+        pos = bisect_left(entries, entry)
+        if pos < len(entries) and entries[pos] == entry:
+            del entries[pos]
+            if not entries:
+                del self._groups[key]
+                del self._max_length[key]
+
+    def overlapping(self, key, start, end) -> List[int]:
+        """ID объектов группы key, интервалы которых пересекаются с [start, end), в порядке начала"""
+        entries = self._groups.get(key)
+        if not entries:
+            return []
+        low = bisect_left(entries, (start - self._max_length[key],))
+        high = bisect_left(entries, (end,))
+        return [obj_id for _, entry_end, obj_id in entries[low:high] if entry_end > start]
+
+    def conflicts(self) -> Iterator[Tuple[Any, int, int]]:
+        """
+        Все пары пересекающихся интервалов: (группа, ID начавшегося раньше, ID начавшегося позже)
+
+        Проход по группе в порядке начала с кучей концов еще не закончившихся интервалов:
+        O(n log n + число пар).
+        """
+        for key, entries in self._groups.items():
+            active: List[Tuple[Any, int]] = []
+            for start, end, obj_id in entries:
+                while active and active[0][0] <= start:
+                    heapq.heappop(active)
+                for _, other_id in active:
+                    yield key, other_id, obj_id
+                heapq.heappush(active, (end, obj_id))
+
+    def keys(self) -> Iterable:
+        """Все группы, в которых есть интервалы"""
+        return self._groups.keys()
+
+    def rebuild(self, objects: Iterable):
+        """Построение индекса заново по набору объектов"""
+        self.clear()
+        self.add_many(objects)
+
+    def clear(self):
+        self._groups.clear()
+        self._max_length.clear()
@@ -8,6 +8,75 @@ import urllib.error
 import socket
 from regex_patterns import IPV6_PATTERN
 
+try:
+    import numpy as np
+except ImportError:  # NumPy необязателен: без него is_valid_many работает поэлементно
+    np = None
+
+# Размер пачки строк, обрабатываемой за один проход предфильтра
+_PREFILTER_CHUNK = 1 << 20
+
+# Классы символов для предфильтра
+_CLS_HEX, _CLS_COLON, _CLS_DOT, _CLS_PERCENT, _CLS_LETTER, _CLS_SPACE, _CLS_UNKNOWN, _CLS_BAD = range(8)
+
+
+def _build_char_classes():
+    """Таблица битов классов для всех значений байта"""
+    table = np.full(256, _CLS_BAD, dtype=np.uint8)
+    for ch in '0123456789abcdefABCDEF':
+        table[ord(ch)] = _CLS_HEX
+    for ch in 'ghijklmnopqrstuvwxyzGHIJKLMNOPQRSTUVWXYZ':
+        table[ord(ch)] = _CLS_LETTER
+    for ch in ' \t\n\r\x0b\x0c\x1c\x1d\x1e\x1f':
+        table[ord(ch)] = _CLS_SPACE
+    table[ord(':')] = _CLS_COLON
+    table[ord('.')] = _CLS_DOT
+    table[ord('%')] = _CLS_PERCENT
+    # '?' - замена для символов вне latin-1, байты >= 128 - не-ASCII символы
+    table[ord('?')] = _CLS_UNKNOWN
+    table[128:] = _CLS_UNKNOWN
+    # Каждому классу соответствует свой бит, чтобы наличие классов в строке считалось одним OR
+    bits = (np.uint8(1) << table).astype(np.uint8)
+    # Разделитель строк '\0' не относится ни к одному классу
+    bits[0] = 0
+    return bits
+
+
+def _build_verdicts():
+    """
+    Решения предфильтра для каждого набора классов символов строки
+
+    Returns:
+        tuple: (отклонить всегда, отклонить если длина строки > 4)
+    """
+    present = np.arange(256, dtype=np.uint8)
+
+    def has(cls):
+        return (present & (1 << cls)) != 0
+
+    no_colon = ~has(_CLS_COLON) & ~has(_CLS_PERCENT)
+    unknown = has(_CLS_UNKNOWN)
+
+    # Правила ниже опираются только на ASCII символы строки: не-ASCII символ
+    # может оказаться пробелом (strip) или буквой зоны, но не hex цифрой или ':'
+    always = (
+        has(_CLS_BAD)
+        | (present == 0)
+        # Любой вариант шаблона содержит hex цифру или ':'
+        | (~has(_CLS_HEX) & ~has(_CLS_COLON))
+        # Буквы g-z допустимы только в имени зоны после '%'
+        | (has(_CLS_LETTER) & ~has(_CLS_PERCENT))
+        # Без ':' и '%' валидна только одна группа из 1-4 hex цифр
+        | (no_colon & has(_CLS_DOT))
+    )
+    # Строки с пробелами (обрезаются strip) не подпадают под правило длины
+    too_long = no_colon & ~has(_CLS_SPACE) & ~unknown
+    return always, too_long
+
+
+_CHAR_BITS = _build_char_classes().tobytes() if np is not None else None
+_REJECT_ALWAYS, _REJECT_TOO_LONG = _build_verdicts() if np is not None else (None, None)
+
 
 class IPv6Checker:
     """Класс для проверки и поиска IPv6 адресов"""
@@ -41,6 +110,74 @@ class IPv6Checker:
         # Полное совпадение всей строки
         return bool(self.pattern.fullmatch(ip_string))
 
+    def is_valid_many(self, items):
+        """
+        Пакетная проверка строк на IPv6
+
+        Очевидно невалидные строки (пустые, с недопустимыми символами,
+        без двоеточий и т.п.) отсеиваются векторно через NumPy,
+        полная проверка регулярным выражением выполняется только для оставшихся.
+
+        Args:
+            items: Итерируемый набор строк
+
+        Returns:
+            numpy.ndarray: Массив bool (список bool, если NumPy не установлен)
+        """
+        if not isinstance(items, list):
+            items = list(items)
+        if np is None:
+            return [self.is_valid_ipv6(item) for item in items]
+
+        result = np.zeros(len(items), dtype=bool)
+        fullmatch = self.pattern.fullmatch
+
+        for start in range(0, len(items), _PREFILTER_CHUNK):
+            chunk = items[start:start + _PREFILTER_CHUNK]
+            try:
+                joined = '\0'.join(chunk)
+            except TypeError:
+                chunk = [item if isinstance(item, str) else '' for item in chunk]
+                joined = '\0'.join(chunk)
+
+            survivors = np.flatnonzero(self._prefilter(chunk, joined))
+            valid = [fullmatch(chunk[i].strip()) is not None for i in survivors.tolist()]
+            result[start + survivors] = valid
+
+        return result
+
+    @staticmethod
+    def _prefilter(strings, joined):
+        """
+        Векторный предфильтр: False для строк, которые точно не являются IPv6
+
+        Строки склеены через '\\0' в один байтовый массив, где каждый символ
+        заменен битом своего класса; набор классов строки собирается через reduceat.
+        Фильтр консервативен: не-ASCII символы не учитываются в правиле длины.
+        """
+        encoded = joined.encode('latin-1', errors='replace').translate(_CHAR_BITS)
+        data = np.frombuffer(encoded, dtype=np.uint8)
+        separators = np.flatnonzero(data == 0)
+        if len(separators) == len(strings) - 1:
+            ends = np.append(separators, len(data))
+        else:
+            # Внутри строк встречается '\\0' - считаем границы по длинам
+            ends = np.cumsum(np.fromiter(map(len, strings), dtype=np.int64, count=len(strings)) + 1) - 1
+        starts = np.empty_like(ends)
+        starts[0] = 0
+        starts[1:] = ends[:-1] + 1
+        lengths = ends - starts
+
+        # Разделитель после строки попадает в ее сегмент, но его бит нулевой
+        if len(data):
+            present = np.bitwise_or.reduceat(data, np.minimum(starts, len(data) - 1))
+            present[lengths == 0] = 0
+        else:
+            present = np.zeros(len(strings), dtype=np.uint8)
+
+        rejected = _REJECT_ALWAYS[present] | (_REJECT_TOO_LONG[present] & (lengths > 4))
+        return ~rejected
+
     def find_ipv6(self, text):
         """
         Поиск всех IPv6 адресов в тексте
@@ -0,0 +1,327 @@
+"""
+Журнал изменений: дозапись каждого изменения компании для сохранности без перезаписи файлов
+
+Файл журнала - NDJSON: первая строка - заголовок с контрольной суммой снапшота,
+после которого начат журнал, далее по строке на изменение:
+    ["add", секция, запись]           - добавление объекта (запись как в storage.py)
+    ["remove_transport", id]          - удаление транспорта
+    ["status", id, статус]            - смена статуса транспорта
+    ["book", id рейса, id пассажира]  - продажа билета
+    ["cancel", id рейса, id пассажира] - возврат билета
+    ["assign", id рейса, id транспорта, id водителя] - смена транспорта и водителя рейса
+
+Восстановление - загрузка снапшота и повторение журнала (recover), сжатие - запись
+нового снапшота и начало пустого журнала (compact).
+"""
+
+import json
+import os
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Dict, Iterator, List, Optional, Tuple
+from models import Employee, Passenger, Route, Trip
+from exceptions import InvalidDataException, NotFoundException
+from storage import TRANSPORT_CLASSES, atomic_write, paused_gc
+from snapshot import write_snapshot, read_checksum, read_snapshot
+
+JOURNAL_FORMAT = 'transport-company-journal'
+JOURNAL_VERSION = 1
+
+
+class Journal:
+    """
+    Журнал изменений с групповой фиксацией
+
+    Записи накапливаются в памяти и записываются в файл с одним fsync на группу:
+    когда накоплено group_size записей, через flush_interval секунд после первой
+    незаписанной записи (фоновым таймером, даже если новых записей нет), а также
+    при flush() и close().
+    Изменения, не попавшие в файл к моменту сбоя, теряются (не более одной группы).
+    Загрузка данных из файлов (load_from_*) в журнал не записывается - после нее нужен compact.
+
+    Запись группы с fsync не держит блокировку накопления: пока одна группа
+    записывается, другие потоки продолжают добавлять записи в следующую.
+    """
+
+    def __init__(self, filename: str, snapshot_checksum: Optional[int] = None,
+                 group_size: int = 256, flush_interval: float = 0.05):
+        """
+        Args:
+            filename: файл журнала (создается, если его нет; существующий дописывается)
+            snapshot_checksum: контрольная сумма снапшота, после которого начат журнал
+            group_size: сколько записей фиксируется одним fsync
+            flush_interval: наибольшая задержка записи в секундах
+        """
+        self.filename = filename
+        self.group_size = group_size
+        self.flush_interval = flush_interval
+        self._encode = json.JSONEncoder(ensure_ascii=False, separators=(',', ':')).encode
+        self._pending: List[str] = []
+        # Записи добавляются из потоков компании, а записываются и из потока таймера:
+        # _lock защищает накопленные записи и таймер, _write_lock - порядок записи групп в файл
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        self._timer: Optional[threading.Timer] = None
+        self._local = threading.local()
+
+        if not os.path.exists(filename):
+            _write_header(filename, snapshot_checksum)
+        self.snapshot_checksum = read_header(filename).get('snapshot')
+        _truncate_torn_tail(filename)
+        self._file = open(filename, 'a', encoding='utf-8')
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    @property
+    def pending(self) -> int:
+        """Количество записей, еще не записанных в файл"""
+        return len(self._pending)
+
+    def append(self, record: tuple):
+        """Добавление записи об изменении"""
+        line = self._encode(record) + '\n'
+        with self._lock:
+            self._pending.append(line)
+            due = self._group_ready()
+            if not due and self._timer is None:
+                self._timer = threading.Timer(self.flush_interval, self.flush)
+                self._timer.daemon = True
+                self._timer.start()
+        if due and not getattr(self._local, 'deferred', False):
+            self.flush()
+
+    def _group_ready(self) -> bool:
+        return len(self._pending) >= self.group_size or (self.flush_interval <= 0 and bool(self._pending))
+
+    @contextmanager
+    def deferred(self):
+        """
+        Отложенная запись группы: внутри блока записи этого потока только накапливаются,
+        а набравшаяся группа записывается после выхода из блока
+
+        Нужна, чтобы fsync не выполнялся под блокировками вызывающего кода.
+        """
+        self._local.deferred = True
+        try:
+            yield
+        finally:
+            self._local.deferred = False
+            with self._lock:
+                due = self._group_ready()
+            if due:
+                self.flush()
+
+    def flush(self):
+        """Запись накопленных записей в файл с fsync"""
+        with self._write_lock:
+            with self._lock:
+                data = self._take_pending()
+            self._write(data)
+
+    def _take_pending(self) -> str:
+        self._cancel_timer()
+        data = ''.join(self._pending)
+        self._pending.clear()
+        return data
+
+    def _cancel_timer(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+    def _write(self, data: str):
+        if not data or self._file.closed:
+            return
+        self._file.write(data)
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+    def reset(self, snapshot_checksum: int):
+        """Начало пустого журнала после нового снапшота (файл заменяется атомарно)"""
+        with self._write_lock, self._lock:
+            self._take_pending()
+            self._file.close()
+            _write_header(self.filename, snapshot_checksum)
+            self.snapshot_checksum = snapshot_checksum
+            self._file = open(self.filename, 'a', encoding='utf-8')
+
+    def close(self):
+        """Запись оставшихся записей и закрытие файла"""
+        with self._write_lock:
+            if self._file.closed:
+                return
+            with self._lock:
+                data = self._take_pending()
+            self._write(data)
+            self._file.close()
+
+
+def _write_header(filename: str, snapshot_checksum: Optional[int]):
+    header = {'format': JOURNAL_FORMAT, 'version': JOURNAL_VERSION, 'snapshot': snapshot_checksum}
+    with atomic_write(filename) as f:
+        f.write(json.dumps(header) + '\n')
+
+
+def _truncate_torn_tail(filename: str, chunk_size: int = 4096):
+    """
+    Отрезание записи, прерванной сбоем (все после последнего перевода строки)
+
+    Иначе первая дописанная запись склеится с обрывком в одну испорченную строку.
+    """
+    with open(filename, 'rb+') as f:
+        size = end = f.seek(0, os.SEEK_END)
+        while end > 0:
+            start = max(end - chunk_size, 0)
+            f.seek(start)
+            pos = f.read(end - start).rfind(b'\n')
+            if pos >= 0:
+                end = start + pos + 1
+                break
+            end = start
+        if end < size:
+            f.truncate(end)
+            f.flush()
+            os.fsync(f.fileno())
+
+
+def read_header(filename: str) -> Dict:
+    """Заголовок журнала"""
+    with open(filename, 'r', encoding='utf-8') as f:
+        try:
+            header = json.loads(f.readline())
+        except ValueError:
+            header = None
+    if not isinstance(header, dict) or header.get('format') != JOURNAL_FORMAT:
+        raise InvalidDataException("Файл не является журналом транспортной компании")
+    if header.get('version', 0) > JOURNAL_VERSION:
+        raise InvalidDataException(f"Неподдерживаемая версия журнала: {header['version']}")
+    return header
+
+
+def read_journal(filename: str) -> Tuple[Dict, Iterator[list]]:
+    """
+    Чтение журнала
+
+    Последняя строка без перевода строки - запись, прерванная сбоем, и пропускается.
+
+    Returns:
+        tuple: заголовок и итератор записей
+    """
+    header = read_header(filename)
+
+    def records():
+        with open(filename, 'r', encoding='utf-8') as f:
+            f.readline()
+            for number, line in enumerate(f, 2):
+                if not line.endswith('\n'):
+                    return
+                try:
+                    yield json.loads(line)
+                except ValueError:
+                    raise InvalidDataException(f"Журнал поврежден: строка {number}")
+
+    return header, records()
+
+
+def _add_transport(company, r: Dict):
+    cls = TRANSPORT_CLASSES[r['type']]
+    number = r['line_number'] if r['type'] == 'tram' else r['route_number']
+    transport = cls(r['id'], r['brand'], r['model'], r['year'], r['capacity'], number)
+    transport.status = r['status']
+    company.add_transport(transport)
+
+
+def _add_trip(company, r: Dict):
+    route = company.get_route(r['route_id'])
+    transport = company.get_transport(r['transport_id'])
+    driver = company.get_employee(r['driver_id'])
+    if not route or not transport or not driver:
+        raise NotFoundException(f"Рейс {r['id']} ссылается на несуществующий объект")
+    trip = Trip(r['id'], route, transport, driver, datetime.fromisoformat(r['departure_time']),
+                datetime.fromisoformat(r['arrival_time']), r['fare'])
+    passengers = [company.get_passenger(p_id) for p_id in r['passengers']]
+    if None in passengers:
+        raise NotFoundException(f"Рейс {r['id']} ссылается на несуществующего пассажира")
+    trip.add_passengers(passengers)
+    company.add_trip(trip)
+
+
+ADDERS = {
+    'transports': _add_transport,
+    'employees': lambda company, r: company.add_employee(Employee(**r)),
+    'passengers': lambda company, r: company.add_passenger(Passenger(**r)),
+    'routes': lambda company, r: company.add_route(Route(**r)),
+    'trips': _add_trip,
+}
+
+
+def apply_record(company, record: list):
+    """Повторение одного изменения из журнала"""
+    op, *args = record
+    if op == 'add':
+        section, r = args
+        ADDERS[section](company, r)
+        # Объекты добавлены с явными ID, поэтому счетчик ID сдвигается вручную
+        key = section[:-1]
+        company._next_id[key] = max(company._next_id.get(key, 1), r['id'] + 1)
+    elif op == 'remove_transport':
+        company.remove_transport(*args)
+    elif op == 'status':
+        transport_id, status = args
+        company.get_transport(transport_id).status = status
+    elif op == 'book':
+        company.book_ticket(*args)
+    elif op == 'cancel':
+        company.cancel_ticket(*args)
+    elif op == 'assign':
+        company.reassign_trip(*args)
+    else:
+        raise InvalidDataException(f"Неизвестная запись журнала: {op}")
+
+
+def replay(company, filename: str) -> int:
+    """Повторение всех изменений журнала. Возвращает количество записей"""
+    _, records = read_journal(filename)
+    count = 0
+    with paused_gc():
+        for record in records:
+            apply_record(company, record)
+            count += 1
+    return count
+
+
+def recover(company, snapshot_filename: str, journal_filename: str, **journal_options) -> Journal:
+    """
+    Восстановление компании: последний снапшот и изменения из журнала
+
+    Журнал повторяется, только если он начат после этого снапшота; журнал более старого
+    снапшота (сбой во время compact) уже учтен в снапшоте и заменяется пустым.
+    После восстановления журнал подключается к компании для записи новых изменений.
+    """
+    checksum = None
+    if os.path.exists(snapshot_filename):
+        read_snapshot(company, snapshot_filename)
+        checksum = read_checksum(snapshot_filename)
+
+    company.journal = None
+    if os.path.exists(journal_filename) and read_header(journal_filename).get('snapshot') == checksum:
+        replay(company, journal_filename)
+        journal = Journal(journal_filename, **journal_options)
+    else:
+        _write_header(journal_filename, checksum)
+        journal = Journal(journal_filename, **journal_options)
+
+    company.journal = journal
+    return journal
+
+
+def compact(company, snapshot_filename: str, journal: Journal):
+    """Сжатие: запись текущего состояния в новый снапшот и начало пустого журнала"""
+    journal.flush()
+    checksum = write_snapshot(company, snapshot_filename)
+    journal.reset(checksum)
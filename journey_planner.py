@@ -0,0 +1,117 @@
+"""
+Планировщик поездок с пересадками (Connection Scan Algorithm)
+
+Каждый рейс - связь между начальной и конечной точкой маршрута со временем
+отправления и прибытия. Связи упорядочены по времени отправления, запрос
+просматривает их один раз начиная с момента отправления пассажира.
+"""
+
+from bisect import bisect_left
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+from models import Trip
+from ledger import to_timestamp
+
+
+class JourneyPlanner:
+    """
+    Поиск поездки с самым ранним прибытием
+
+    Связи строятся по рейсам компании при создании планировщика (и в rebuild);
+    свободные места проверяются по текущему состоянию рейсов при каждом запросе.
+    """
+
+    def __init__(self, company, min_transfer: timedelta = timedelta(minutes=3)):
+        """
+        Args:
+            company: транспортная компания
+            min_transfer: наименьшее время на пересадку между рейсами
+        """
+        self.company = company
+        self.min_transfer = min_transfer
+        self.rebuild()
+
+    def rebuild(self):
+        """Построение массивов связей по текущим рейсам компании"""
+        trips = self.company.upcoming_trips(datetime.min)
+
+        self.stops: Dict[str, int] = {}
+        stop_id = self.stops.setdefault
+        self.trips: List[Trip] = trips
+        self.departures = [to_timestamp(t.departure_time) for t in trips]
+        self.arrivals = [to_timestamp(t.arrival_time) for t in trips]
+        self.from_stops = [stop_id(t.route.start_point, len(self.stops)) for t in trips]
+        self.to_stops = [stop_id(t.route.end_point, len(self.stops)) for t in trips]
+
+    def plan(self, origin: str, destination: str, departure: datetime, max_transfers: int = 3,
+             min_free_seats: int = 1) -> Optional[List[Trip]]:
+        """
+        Поездка с самым ранним прибытием (при равном прибытии - с меньшим числом пересадок)
+
+        Args:
+            origin: начальная точка
+            destination: конечная точка
+            departure: время, не раньше которого можно отправиться
+            max_transfers: наибольшее число пересадок
+            min_free_seats: сколько свободных мест должно быть на каждом рейсе (0 - не проверять)
+
+        Returns:
+            list: рейсы поездки по порядку ([] - если точки совпадают) или None, если поездки нет
+        """
+        source, target = self.stops.get(origin), self.stops.get(destination)
+        if origin == destination:
+            return []
+        if source is None or target is None:
+            return None
+
+        inf = float('inf')
+        legs = max_transfers + 1
+        transfer = int(self.min_transfer.total_seconds())
+        stop_count = len(self.stops)
+        # ready[k][s] - когда можно отправиться из s после k рейсов (с учетом пересадки),
+        # arrival[k][s] и via[k][s] - прибытие в s на k-м рейсе и номер связи этого рейса
+        ready = [[inf] * stop_count for _ in range(legs)]
+        arrival = [[inf] * stop_count for _ in range(legs + 1)]
+        via = [[-1] * stop_count for _ in range(legs + 1)]
+        earliest_ready = [inf] * stop_count
+        ready[0][source] = earliest_ready[source] = start = to_timestamp(departure)
+        best = inf
+
+        departures, arrivals = self.departures, self.arrivals
+        from_stops, to_stops, trips = self.from_stops, self.to_stops, self.trips
+        for i in range(bisect_left(departures, start), len(departures)):
+            dep = departures[i]
+            if dep >= best:
+                break
+            u = from_stops[i]
+            if earliest_ready[u] > dep:
+                continue
+            if min_free_seats and trips[i].get_free_seats() < min_free_seats:
+                continue
+
+            v, arr = to_stops[i], arrivals[i]
+            for k in range(legs):
+                if ready[k][u] <= dep:
+                    # Меньшее число рейсов с тем же прибытием лучше, поэтому проверяем только первое k
+                    if arr < arrival[k + 1][v]:
+                        arrival[k + 1][v] = arr
+                        via[k + 1][v] = i
+                        if v == target:
+                            best = min(best, arr)
+                        elif k + 1 < legs and arr + transfer < ready[k + 1][v]:
+                            ready[k + 1][v] = arr + transfer
+                            earliest_ready[v] = min(earliest_ready[v], arr + transfer)
+                    break
+
+        if best == inf:
+            return None
+        k = min(k for k in range(1, legs + 1) if arrival[k][target] == best)
+        journey = []
+        stop = target
+        while k > 0:
+            i = via[k][stop]
+            journey.append(trips[i])
+            stop = from_stops[i]
+            k -= 1
+        journey.reverse()
+        return journey
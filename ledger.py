@@ -0,0 +1,237 @@
+"""
+Колоночный журнал проданных билетов для отчетов по выручке и пассажиропотоку
+"""
+
+from array import array
+from datetime import date, datetime, timedelta
+from itertools import repeat
+from typing import Dict, Iterable, List, Optional
+from models import Passenger, Trip
+
+try:
+    import numpy as np
+except ImportError:  # NumPy необязателен: без него отчеты считаются циклом
+    np = None
+
+EPOCH = datetime(1970, 1, 1)
+SECONDS_PER_DAY = 86400
+
+
+def to_timestamp(moment: datetime) -> int:
+    """Секунды от начала эпохи (время без часового пояса считается как есть)"""
+    return int((moment - EPOCH).total_seconds())
+
+
+class TicketLedger:
+    """
+    Журнал билетов: параллельные массивы по одному элементу на билет
+
+    Столбцы хранятся в array.array, поэтому запись билета - O(1) без NumPy,
+    а отчеты работают с теми же буферами через numpy.frombuffer без копирования.
+    """
+
+    COLUMNS = (
+        ('trip_ids', 'q'),
+        ('passenger_ids', 'q'),
+        ('route_ids', 'q'),
+        ('category_codes', 'H'),
+        ('discounts', 'd'),
+        ('fares', 'd'),
+        ('departures', 'q'),
+    )
+
+    def __init__(self):
+        self.categories: List[str] = []
+        self._category_codes: Dict[str, int] = {}
+        # ключ билета (см. _ticket_key) -> номер строки; строится при первом возврате билета
+        self._rows: Optional[Dict[int, int]] = None
+        # Рейсы, по которым журнал будет построен при первом обращении (см. rebuild)
+        self._pending_trips: Optional[Iterable[Trip]] = None
+        self.clear()
+
+    def __len__(self):
+        self._ensure_built()
+        return len(self.trip_ids)
+
+    def clear(self):
+        """Очистка журнала"""
+        for name, typecode in self.COLUMNS:
+            setattr(self, name, array(typecode))
+        self._rows = None
+        self._pending_trips = None
+
+    @staticmethod
+    def _ticket_key(trip_id: int, passenger_id: int) -> int:
+        """Ключ билета одним числом (не кортеж), чтобы не нагружать сборщик мусора"""
+        return (trip_id << 32) | passenger_id
+
+    def _category_code(self, category: str) -> int:
+        code = self._category_codes.get(category)
+        if code is None:
+            code = self._category_codes[category] = len(self.categories)
+            self.categories.append(category)
+        return code
+
+    def record(self, trip: Trip, passenger: Passenger, fare: float):
+        """Запись проданного билета"""
+        if self._pending_trips is not None:
+            # Билет уже учтен в рейсе и попадет в журнал при его построении
+            return
+        if self._rows is not None:
+            self._rows[self._ticket_key(trip.id, passenger.id)] = len(self.trip_ids)
+        self.trip_ids.append(trip.id)
+        self.passenger_ids.append(passenger.id)
+        self.route_ids.append(trip.route.id)
+        self.category_codes.append(self._category_code(passenger.category))
+        self.discounts.append(passenger.discount)
+        self.fares.append(fare)
+        self.departures.append(to_timestamp(trip.departure_time))
+
+    def record_many(self, trip: Trip, passengers: List[Passenger], fares: List[float]):
+        """Запись группы билетов на один рейс: столбцы дополняются целиком"""
+        if self._pending_trips is not None:
+            return
+        count = len(passengers)
+        if self._rows is not None:
+            start = len(self.trip_ids)
+            for row, p in enumerate(passengers, start):
+                self._rows[self._ticket_key(trip.id, p.id)] = row
+        self.trip_ids.extend(repeat(trip.id, count))
+        self.passenger_ids.extend([p.id for p in passengers])
+        self.route_ids.extend(repeat(trip.route.id, count))
+        self.category_codes.extend([self._category_code(p.category) for p in passengers])
+        self.discounts.extend([p.discount for p in passengers])
+        self.fares.extend(fares)
+        self.departures.extend(repeat(to_timestamp(trip.departure_time), count))
+
+    def cancel(self, trip_id: int, passenger_id: int) -> bool:
+        """Удаление билета: последняя строка переносится на место удаленной"""
+        if self._pending_trips is not None:
+            return True
+        if self._rows is None:
+            self._rows = {self._ticket_key(t, p): row
+                          for row, (t, p) in enumerate(zip(self.trip_ids, self.passenger_ids))}
+
+        row = self._rows.pop(self._ticket_key(trip_id, passenger_id), None)
+        if row is None:
+            return False
+
+        last = len(self.trip_ids) - 1
+        if row != last:
+            for name, _ in self.COLUMNS:
+                column = getattr(self, name)
+                column[row] = column[last]
+            self._rows[self._ticket_key(self.trip_ids[row], self.passenger_ids[row])] = row
+        for name, _ in self.COLUMNS:
+            getattr(self, name).pop()
+        return True
+
+    def rebuild(self, trips: Iterable[Trip], lazy: bool = False):
+        """
+        Заполнение журнала по текущим пассажирам рейсов
+
+        При lazy=True журнал строится при первом обращении к отчетам по состоянию рейсов
+        на тот момент, а до этого record/cancel ничего не делают (например, после загрузки
+        данных, когда отчеты могут и не понадобиться).
+        """
+        self.clear()
+        if lazy:
+            self._pending_trips = trips
+        else:
+            self._build(trips)
+
+    def _ensure_built(self):
+        if self._pending_trips is not None:
+            trips = self._pending_trips
+            self._pending_trips = None
+            self._build(trips)
+
+    def _build(self, trips: Iterable[Trip]):
+        """
+        Построение столбцов по рейсам
+
+        Столбцы сначала собираются в списки и превращаются в array.array одним вызовом:
+        многократный array.extend маленькими порциями заметно медленнее.
+        """
+        columns = {name: [] for name, _ in self.COLUMNS}
+        trip_ids, passenger_ids, route_ids, category_codes, discounts, fares, departures = \
+            (columns[name] for name, _ in self.COLUMNS)
+        category_code = self._category_code
+
+        for trip in trips:
+            passengers = trip.passengers
+            count = len(passengers)
+            if not count:
+                continue
+
+            trip_ids.extend([trip.id] * count)
+            passenger_ids.extend([p.id for p in passengers])
+            route_ids.extend([trip.route.id] * count)
+            category_codes.extend([category_code(p.category) for p in passengers])
+            discounts.extend([p.discount for p in passengers])
+            fares.extend(map(trip.ticket_price, passengers))
+            departures.extend([to_timestamp(trip.departure_time)] * count)
+
+        for name, typecode in self.COLUMNS:
+            setattr(self, name, array(typecode, columns[name]))
+
+    def _column(self, name: str):
+        """Столбец как массив NumPy (без копирования) или как array.array"""
+        self._ensure_built()
+        column = getattr(self, name)
+        if np is None or not len(column):
+            return column
+        return np.frombuffer(column, dtype=column.typecode)
+
+    @staticmethod
+    def _group_sum(keys, weights=None) -> Dict[int, float]:
+        """Сумма весов (или количество) по целочисленным ключам"""
+        if np is not None and isinstance(keys, np.ndarray):
+            offset = int(keys.min())
+            shifted = keys - offset
+            counts = np.bincount(shifted)
+            totals = counts if weights is None else np.bincount(shifted, weights=weights)
+            return {k + offset: totals[k].item() for k in np.flatnonzero(counts).tolist()}
+
+        totals = {}
+        if weights is None:
+            for key in keys:
+                totals[key] = totals.get(key, 0) + 1
+        else:
+            for key, weight in zip(keys, weights):
+                totals[key] = totals.get(key, 0) + weight
+        return totals
+
+    def revenue_by_route(self) -> Dict[int, float]:
+        """Выручка по ID маршрута"""
+        return self._group_sum(self._column('route_ids'), self._column('fares'))
+
+    def revenue_by_day(self) -> Dict[date, float]:
+        """Выручка по дням отправления"""
+        departures = self._column('departures')
+        if np is not None and isinstance(departures, np.ndarray):
+            days = departures // SECONDS_PER_DAY
+        else:
+            days = [moment // SECONDS_PER_DAY for moment in departures]
+        totals = self._group_sum(days, self._column('fares'))
+        return {EPOCH.date() + timedelta(days=day): total for day, total in sorted(totals.items())}
+
+    def revenue_by_category(self) -> Dict[str, float]:
+        """Выручка по льготным категориям"""
+        totals = self._group_sum(self._column('category_codes'), self._column('fares'))
+        return {self.categories[code]: total for code, total in totals.items()}
+
+    def tickets_by_category(self) -> Dict[str, int]:
+        """Количество билетов по льготным категориям"""
+        totals = self._group_sum(self._column('category_codes'))
+        return {self.categories[code]: int(total) for code, total in totals.items()}
+
+    def discount_distribution(self) -> Dict[int, int]:
+        """Количество билетов по размеру скидки (в целых процентах)"""
+        discounts = self._column('discounts')
+        if np is not None and isinstance(discounts, np.ndarray):
+            percents = np.rint(discounts).astype(np.int64)
+        else:
+            percents = [round(discount) for discount in discounts]
+        totals = self._group_sum(percents)
+        return {percent: int(total) for percent, total in sorted(totals.items())}
@@ -0,0 +1,137 @@
+"""
+Нагрузочный клиент для HTTP-сервиса транспортной компании
+
+Открывает несколько keep-alive соединений и отправляет в каждое запросы пачками
+(конвейером), затем выводит количество запросов в секунду и задержки p50/p99.
+
+Пример:
+    python http_service.py company.snap -p 8080
+    python load_generator.py -p 8080 -c 32 -n 50000 --pipeline 8
+    python load_generator.py --demo 100000     # сервис с синтетическими данными в этом же процессе
+"""
+
+import argparse
+import asyncio
+import random
+import time
+from typing import List, Tuple
+
+
+def percentile(sorted_values: List[float], fraction: float) -> float:
+    """Процентиль уже отсортированного списка"""
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(int(len(sorted_values) * fraction), len(sorted_values) - 1)]
+
+
+def make_requests(trips: int, passengers: int, count: int, seed: int = 1) -> List[Tuple[str, str, bytes]]:
+    """Смесь запросов: поиск рейса по ID, ближайшие рейсы маршрута, пассажир, покупка билета"""
+    rnd = random.Random(seed)
+    requests = []
+    for i in range(count):
+        kind = i % 10
+        if kind < 5:
+            requests.append(('GET', f'/trips/{rnd.randrange(trips) + 1}', b''))
+        elif kind < 7:
+            requests.append(('GET', f'/trips?from=2030-06-01T00:00:00&limit=10&route_id={rnd.randrange(200) + 1}', b''))
+        elif kind < 9:
+            requests.append(('GET', f'/passengers/{rnd.randrange(passengers) + 1}', b''))
+        else:
+            body = f'{{"passenger_id": {rnd.randrange(passengers) + 1}}}'.encode()
+            requests.append(('POST', f'/trips/{rnd.randrange(trips) + 1}/tickets', body))
+    return requests
+
+
+def encode_request(method: str, path: str, body: bytes, host: str) -> bytes:
+    head = f"{method} {path} HTTP/1.1\r\nHost: {host}\r\nContent-Length: {len(body)}\r\n\r\n"
+    return head.encode('latin-1') + body
+
+
+async def read_response(reader: asyncio.StreamReader) -> int:
+    """Чтение ответа. Возвращает код ответа"""
+    head = await reader.readuntil(b'\r\n\r\n')
+    lines = head.decode('latin-1').split('\r\n')
+    status = int(lines[0].split(' ')[1])
+    length = 0
+    for line in lines[1:]:
+        name, _, value = line.partition(':')
+        if name.strip().lower() == 'content-length':
+            length = int(value)
+    await reader.readexactly(length)
+    return status
+
+
+async def run_connection(host: str, port: int, requests: List[bytes], pipeline: int,
+                         latencies: List[float], statuses: dict):
+    """Отправка запросов одного соединения пачками по pipeline штук"""
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        for start in range(0, len(requests), pipeline):
+            batch = requests[start:start + pipeline]
+            sent = time.perf_counter()
+            writer.write(b''.join(batch))
+            await writer.drain()
+            for _ in batch:
+                status = await read_response(reader)
+                latencies.append(time.perf_counter() - sent)
+                statuses[status] = statuses.get(status, 0) + 1
+    finally:
+        writer.close()
+
+
+async def run_load(host: str, port: int, requests: List[Tuple[str, str, bytes]], connections: int, pipeline: int):
+    encoded = [encode_request(method, path, body, host) for method, path, body in requests]
+    latencies: List[float] = []
+    statuses: dict = {}
+
+    started = time.perf_counter()
+    await asyncio.gather(*(run_connection(host, port, encoded[i::connections], pipeline, latencies, statuses)
+                           for i in range(connections)))
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    print(f"Запросов: {len(latencies)}, соединений: {connections}, конвейер: {pipeline}")
+    print(f"  {len(latencies) / elapsed:,.0f} запросов/с")
+    print(f"  задержка p50: {percentile(latencies, 0.5) * 1000:.2f} мс, "
+          f"p99: {percentile(latencies, 0.99) * 1000:.2f} мс")
+    print("  ответы: " + ", ".join(f"{status}: {count}" for status, count in sorted(statuses.items())))
+
+
+async def run_demo(passengers: int, args):
+    """Сервис с синтетическими данными в этом же процессе и нагрузка на него"""
+    from benchmark import build_company
+    from http_service import TransportService
+
+    trips = max(passengers // 5, 1)
+    company = build_company(passengers, trips)
+    server = await TransportService(company, args.concurrency).start(args.host, 0)
+    port = server.sockets[0].getsockname()[1]
+    async with server:
+        await run_load(args.host, port, make_requests(trips, passengers, args.requests),
+                       args.connections, args.pipeline)
+
+
+def main():
+    """Главная функция"""
+    parser = argparse.ArgumentParser(description='Нагрузочный клиент HTTP-сервиса транспортной компании')
+    parser.add_argument('--host', default='127.0.0.1', help='Адрес сервиса')
+    parser.add_argument('-p', '--port', type=int, default=8080, help='Порт сервиса')
+    parser.add_argument('-c', '--connections', type=int, default=32, help='Количество соединений')
+    parser.add_argument('-n', '--requests', type=int, default=20_000, help='Количество запросов')
+    parser.add_argument('--pipeline', type=int, default=4, help='Запросов в одной пачке')
+    parser.add_argument('--trips', type=int, default=1000, help='Диапазон ID рейсов в запросах')
+    parser.add_argument('--passengers', type=int, default=1000, help='Диапазон ID пассажиров в запросах')
+    parser.add_argument('--demo', type=int, metavar='PASSENGERS',
+                        help='Запустить сервис с синтетическими данными в этом процессе')
+    parser.add_argument('--concurrency', type=int, default=64, help='Запросов одновременно в режиме --demo')
+    args = parser.parse_args()
+
+    if args.demo:
+        asyncio.run(run_demo(args.demo, args))
+    else:
+        requests = make_requests(args.trips, args.passengers, args.requests)
+        asyncio.run(run_load(args.host, args.port, requests, args.connections, args.pipeline))
+
+
+if __name__ == '__main__':
+    main()
@@ -2,13 +2,27 @@ from transport_company import TransportCompany
 from models import Bus, Tram, Trolleybus, Employee, Passenger, Route, Trip
 from exceptions import TransportException, NotFoundException, InvalidDataException
 from datetime import datetime, timedelta
-from typing import Optional
+from typing import Dict, List, Optional, Tuple
+from csv_import import IMPORTERS, import_csv
 
 class TransportManager:
     """Менеджер для интерактивной работы с транспортной компанией"""
 
+    # Рейсов на странице списка рейсов и в списке рейсов для покупки билета
+    TRIPS_PAGE_SIZE = 20
+
+    CATEGORY_EMOJI = {
+        "пенсионер": "👴",
+        "студент": "🎓",
+        "ребенок": "🧒",
+        "взрослый": "👤"
+    }
+
     def __init__(self, company: TransportCompany):
         self.company = company
+        # Готовый текст рейсов по ID: (ключ актуальности, текст), см. _cached_trip_text
+        self._trip_blocks: Dict[int, Tuple[tuple, str]] = {}
+        self._trip_summaries: Dict[int, Tuple[tuple, str]] = {}
 
     def interactive_mode(self):
         """Интерактивный режим работы"""
@@ -46,6 +60,8 @@ class TransportManager:
                     self._save_data()
                 elif choice == '13':
                     self._load_data()
+                elif choice == '14':
+                    self._import_csv()
                 else:
                     print("Неверный выбор. Пожалуйста, выберите пункт из меню.")
 
@@ -73,6 +89,7 @@ class TransportManager:
         print("11. Купить билет")
         print("12. Сохранить данные в файл")
         print("13. Загрузить данные из файла")
+        print("14. Импорт из CSV")
         print("0. Выход")
 
     def _show_all_transports(self):
@@ -197,99 +214,118 @@ class TransportManager:
             raise InvalidDataException("Ошибка ввода числовых данных")
 
     def _show_all_trips(self):
-        """Показать все рейсы с детальной информацией"""
-        if not self.company.trips:
+        """Показать рейсы с детальной информацией постранично в порядке отправления"""
+        total = len(self.company.trips)
+        if not total:
             print("\n❌ Рейсы не найдены.")
             return
 
-        print("\n" + "=" * 80)
-        print("📋 СПИСОК ВСЕХ РЕЙСОВ")
-        print("=" * 80)
-
-        # Группируем рейсы по датам
-        trips_by_date = {}
-        for trip in self.company.trips:
-            date_key = trip.departure_time.strftime('%d.%m.%Y')
-            if date_key not in trips_by_date:
-                trips_by_date[date_key] = []
-            trips_by_date[date_key].append(trip)
-
-        # Сортируем даты
-        for date in sorted(trips_by_date.keys()):
-            print(f"\n📅 {date}:")
-            print("-" * 80)
-
-            # Сортируем рейсы по времени отправления
-            for trip in sorted(trips_by_date[date], key=lambda x: x.departure_time):
+        pages = (total + self.TRIPS_PAGE_SIZE - 1) // self.TRIPS_PAGE_SIZE
+        page = 0
+        while True:
+            print(self._render_trips_page(page, pages))
+            choice = input("Enter - следующая страница, п - предыдущая, номер страницы "
+                           "или дата (ГГГГ-ММ-ДД), 0 - выход: ").strip().lower()
+            if choice == '0':
+                return
+            elif choice == '':
+                if page + 1 >= pages:
+                    return
+                page += 1
+            elif choice in ('п', 'p'):
+                page = max(page - 1, 0)
+            elif choice.isdecimal():
+                if int(choice) < 1:
+                    print("Номер страницы должен быть от 1.")
+                    continue
+                page = min(int(choice), pages) - 1
+            else:
                 try:
-                    # Базовая информация в одну строку
-                    dep_time = trip.departure_time.strftime('%H:%M')
-                    arr_time = trip.arrival_time.strftime('%H:%M')
-
-                    # Иконка транспорта
-                    if "Электробус" in trip.transport.model:
-                        transport_icon = "⚡"
-                    elif isinstance(trip.transport, Bus):
-                        transport_icon = "🚌"
-                    elif isinstance(trip.transport, Tram):
-                        transport_icon = "🚊"
-                    elif isinstance(trip.transport, Trolleybus):
-                        transport_icon = "🔌"
-                    else:
-                        transport_icon = "🚍"
-
-                    # Получаем имя водителя (фамилия и инициалы)
-                    driver_name_parts = trip.driver.name.split()
-                    if len(driver_name_parts) >= 2:
-                        driver_short = f"{driver_name_parts[0]} {driver_name_parts[1][0]}."
-                    else:
-                        driver_short = trip.driver.name
-
-                    # Строка с основной информацией
-                    print(f"\n{transport_icon} РЕЙС #{trip.id} | Маршрут {trip.route.number}")
-                    print(f"   📍 {trip.route.start_point} → {trip.route.end_point} ({trip.route.distance} км)")
-                    print(
-                        f"   ⏰ {dep_time} - {arr_time} | В пути: {self._format_duration(trip.arrival_time - trip.departure_time)}")
-                    print(f"   🚌 Транспорт: {trip.transport.brand} {trip.transport.model} ({trip.transport.year} г.)")
-                    print(f"   👨‍✈️ Водитель: {trip.driver.name} ({trip.driver.position})")
-                    print(f"   💰 Стоимость проезда: {trip.fare} руб.")
-                    print(
-                        f"   👥 Места: {trip.get_passenger_count()}/{trip.transport.capacity} занято | Свободно: {trip.get_free_seats()}")
-
-                    # Выручка с учетом льгот
-                    revenue = trip.get_total_revenue()
-                    print(f"   💵 Выручка за рейс: {revenue:.2f} руб.")
-
-                    # Показываем пассажиров
-                    if trip.passengers:
-                        print("   📋 ПАССАЖИРЫ:")
-                        # Группируем по категориям
-                        passengers_by_cat = {}
-                        for p in trip.passengers:
-                            if p.category not in passengers_by_cat:
-                                passengers_by_cat[p.category] = []
-                            passengers_by_cat[p.category].append(p)
-
-                        for category, cat_passengers in passengers_by_cat.items():
-                            # Эмодзи для разных категорий
-                            cat_emoji = {
-                                "пенсионер": "👴",
-                                "студент": "🎓",
-                                "ребенок": "🧒",
-                                "взрослый": "👤"
-                            }.get(category, "👤")
-
-                            print(f"      {cat_emoji} {category.capitalize()} ({len(cat_passengers)}):")
-                            for p in cat_passengers:
-                                льгота = f"(скидка {p.discount}%)" if p.discount > 0 else ""
-                                print(f"         • {p.name} {льгота}")
-                    else:
-                        print("   📋 Пассажиров нет")
-
-                except Exception as e:
-                    print(f"   ⚠️ Ошибка при отображении рейса {trip.id}: {e}")
-
-                print("-" * 60)
+                    day = datetime.strptime(choice, "%Y-%m-%d")
+                except ValueError:
+                    print("Неверный ввод.")
+                    continue
+                page = min(self.company.count_trips_before(day) // self.TRIPS_PAGE_SIZE, pages - 1)
+
+    def _render_trips_page(self, page: int, pages: int) -> str:
+        """Текст страницы списка рейсов: рейсы берутся из индекса времени отправления"""
+        size = self.TRIPS_PAGE_SIZE
+        parts = ["\n" + "=" * 80 + f"\n📋 СПИСОК ВСЕХ РЕЙСОВ (страница {page + 1} из {pages})\n" + "=" * 80 + "\n"]
+        current_date = None
+        for trip in self.company.trips_page(page * size, size):
+            date = trip.departure_time.date()
+            if date != current_date:
+                current_date = date
+                parts.append(f"\n📅 {date.strftime('%d.%m.%Y')}:\n" + "-" * 80 + "\n")
+            parts.append(self._cached_trip_text(self._trip_blocks, trip, self._format_trip_block))
+        return "".join(parts)
+
+    @staticmethod
+    def _cached_trip_text(cache: Dict[int, Tuple[tuple, str]], trip: Trip, render) -> str:
+        """Текст рейса из кэша; пересчитывается после посадки или высадки и смены транспорта или водителя"""
+        key = (trip.version, trip.transport, trip.driver)
+        cached = cache.get(trip.id)
+        if cached is None or cached[0] != key:
+            cached = cache[trip.id] = (key, render(trip))
+        return cached[1]
+
+    def _format_trip_block(self, trip: Trip) -> str:
+        """Подробное описание рейса для списка рейсов"""
+        lines = []
+        try:
+            # Базовая информация в одну строку
+            dep_time = trip.departure_time.strftime('%H:%M')
+            arr_time = trip.arrival_time.strftime('%H:%M')
+
+            # Иконка транспорта
+            if "Электробус" in trip.transport.model:
+                transport_icon = "⚡"
+            elif isinstance(trip.transport, Bus):
+                transport_icon = "🚌"
+            elif isinstance(trip.transport, Tram):
+                transport_icon = "🚊"
+            elif isinstance(trip.transport, Trolleybus):
+                transport_icon = "🔌"
+            else:
+                transport_icon = "🚍"
+
+            # Строка с основной информацией
+            lines.append(f"\n{transport_icon} РЕЙС #{trip.id} | Маршрут {trip.route.number}")
+            lines.append(f"   📍 {trip.route.start_point} → {trip.route.end_point} ({trip.route.distance} км)")
+            lines.append(
+                f"   ⏰ {dep_time} - {arr_time} | В пути: {self._format_duration(trip.arrival_time - trip.departure_time)}")
+            lines.append(f"   🚌 Транспорт: {trip.transport.brand} {trip.transport.model} ({trip.transport.year} г.)")
+            lines.append(f"   👨‍✈️ Водитель: {trip.driver.name} ({trip.driver.position})")
+            lines.append(f"   💰 Стоимость проезда: {trip.fare} руб.")
+            lines.append(
+                f"   👥 Места: {trip.get_passenger_count()}/{trip.transport.capacity} занято | Свободно: {trip.get_free_seats()}")
+
+            # Выручка с учетом льгот
+            revenue = trip.get_total_revenue()
+            lines.append(f"   💵 Выручка за рейс: {revenue:.2f} руб.")
+
+            # Показываем пассажиров
+            if trip.get_passenger_count():
+                lines.append("   📋 ПАССАЖИРЫ:")
+                # Группируем по категориям
+                passengers_by_cat = {}
+                for p in trip.passengers:
+                    passengers_by_cat.setdefault(p.category, []).append(p)
+
+                for category, cat_passengers in passengers_by_cat.items():
+                    cat_emoji = self.CATEGORY_EMOJI.get(category, "👤")
+                    lines.append(f"      {cat_emoji} {category.capitalize()} ({len(cat_passengers)}):")
+                    for p in cat_passengers:
+                        льгота = f"(скидка {p.discount}%)" if p.discount > 0 else ""
+                        lines.append(f"         • {p.name} {льгота}")
+            else:
+                lines.append("   📋 Пассажиров нет")
+
+        except Exception as e:
+            lines.append(f"   ⚠️ Ошибка при отображении рейса {trip.id}: {e}")
+
+        lines.append("-" * 60)
+        return "\n".join(lines) + "\n"
 
     def _format_duration(self, duration):
         """Форматирование продолжительности"""
@@ -361,7 +397,7 @@ class TransportManager:
             fare = float(input("Стоимость проезда (руб): ").strip())
 
             trip = Trip(0, route, transport, driver, departure, arrival, fare)
-            self.company.add_trip(trip)
+            self.company.add_trip(trip, allow_conflicts=False)
             print(f"Рейс успешно создан с ID {trip.id}")
 
         except ValueError as e:
@@ -375,20 +411,21 @@ class TransportManager:
             print("Нет доступных рейсов!")
             return
 
-        # Показываем доступные рейсы
-        print("\nДоступные рейсы:")
-        for t in self.company.trips:
-            if t.get_free_seats() > 0 and t.departure_time > datetime.now():
-                print(f"[{t.id}] {t} (свободно {t.get_free_seats()} мест)")
+        # Показываем доступные рейсы: по направлению, если оно указано
+        start_point = input("Откуда (Enter - все направления): ").strip()
+        end_point = input("Куда: ").strip() if start_point else ""
+        trips = self._bookable_trips(start_point, end_point, datetime.now(), self.TRIPS_PAGE_SIZE)
+
+        lines = ["\nДоступные рейсы:"]
+        lines.extend(f"[{t.id}] {self._cached_trip_text(self._trip_summaries, t, str)} "
+                     f"(свободно {t.get_free_seats()} мест)" for t in trips)
+        if len(trips) == self.TRIPS_PAGE_SIZE:
+            lines.append(f"Показаны ближайшие {len(trips)} рейсов.")
+        print("\n".join(lines))
 
         try:
             trip_id = int(input("ID рейса: ").strip())
-            trip = None
-            for t in self.company.trips:
-                if t.id == trip_id:
-                    trip = t
-                    break
-
+            trip = self.company.get_trip(trip_id)
             if not trip:
                 raise NotFoundException("Рейс не найден")
 
@@ -409,13 +446,26 @@ class TransportManager:
             if not passenger:
                 raise NotFoundException("Пассажир не найден")
 
-            trip.add_passenger(passenger)
-            price = trip.fare * (1 - passenger.discount / 100)
+            price = self.company.book_ticket(trip.id, passenger.id)
             print(f"Билет успешно куплен! Стоимость: {price:.2f} руб.")
 
         except ValueError as e:
             raise InvalidDataException("Ошибка ввода данных")
 
+    def _bookable_trips(self, start_point: str, end_point: str, now: datetime, limit: int) -> List[Trip]:
+        """Ближайшие рейсы со свободными местами (по направлению, если оно указано)"""
+        if start_point and end_point:
+            return self.company.search_trips(start_point, end_point, now, limit=limit)
+        trips = []
+        offset = self.company.count_trips_before(now)
+        while len(trips) < limit:
+            page = self.company.trips_page(offset, limit)
+            if not page:
+                break
+            trips.extend(t for t in page if t.get_free_seats() > 0 and t.departure_time > now)
+            offset += limit
+        return trips[:limit]
+
     def _save_data(self):
         """Сохранение данных в файл"""
         print("\n--- СОХРАНЕНИЕ ДАННЫХ ---")
@@ -439,6 +489,26 @@ class TransportManager:
         except Exception as e:
             print(f"Ошибка сохранения: {e}")
 
+    def _import_csv(self):
+        """Массовый импорт из CSV"""
+        print("\n--- ИМПОРТ ИЗ CSV ---")
+        sections = list(IMPORTERS)
+        for number, section in enumerate(sections, 1):
+            print(f"{number}. {section} (столбцы: {', '.join(IMPORTERS[section][0])})")
+
+        try:
+            section = sections[int(input("Выберите данные: ").strip()) - 1]
+        except (ValueError, IndexError):
+            raise InvalidDataException("Неверный выбор")
+        filename = input("Файл CSV: ").strip()
+        rejected_filename = input("Отчет об отклоненных строках (Enter - rejected.csv): ").strip() or "rejected.csv"
+
+        result = import_csv(self.company, section, filename, rejected_filename,
+                            progress=lambda r: print(f"\r  обработано строк: {r.imported + r.rejected}", end=""))
+        print(f"\nИмпорт завершен: {result}")
+        if result.rejected:
+            print(f"Отклоненные строки с причинами записаны в {rejected_filename}")
+
     def _load_data(self):
         """Загрузка данных из файла"""
         print("\n--- ЗАГРУЗКА ДАННЫХ ---")
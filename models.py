@@ -1,10 +1,12 @@
+import sys
 from datetime import datetime
-from typing import Optional, List
+from typing import Optional, List, Dict
 from exceptions import TransportException, InvalidDataException
 
 
 class Person:
     """Базовый класс для всех людей"""
+    __slots__ = ('id', 'name', 'phone')
 
     def __init__(self, id: int, name: str, phone: str):
         if not name or len(name.strip()) == 0:
@@ -22,6 +24,7 @@ class Person:
 
 class Employee(Person):
     """Сотрудник транспортной компании"""
+    __slots__ = ('position', 'salary')
 
     def __init__(self, id: int, name: str, phone: str, position: str, salary: float):
         super().__init__(id, name, phone)
@@ -31,7 +34,7 @@ class Employee(Person):
         if salary <= 0:
             raise InvalidDataException("Зарплата должна быть положительной")
 
-        self.position = position
+        self.position = sys.intern(position)
         self.salary = salary
 
     def __str__(self):
@@ -39,7 +42,13 @@ class Employee(Person):
 
 
 class Passenger(Person):
-    """Пассажир с учетом льготной категории"""
+    """
+    Пассажир с учетом льготной категории
+
+    Скидка и категория после создания не меняются: по ним рейсы ведут
+    выручку и счетчики категорий, а журнал билетов - проданные билеты.
+    """
+    __slots__ = ('email', '_discount', '_category')
 
     def __init__(self, id: int, name: str, phone: str, email: str = "", discount: float = 0.0,
                  category: str = "взрослый"):
@@ -48,8 +57,16 @@ class Passenger(Person):
         self.email = email
         if discount < 0 or discount > 100:
             raise InvalidDataException("Скидка должна быть от 0 до 100")
-        self.discount = discount
-        self.category = category
+        self._discount = discount
+        self._category = sys.intern(category)
+
+    @property
+    def discount(self) -> float:
+        return self._discount
+
+    @property
+    def category(self) -> str:
+        return self._category
 
     def __str__(self):
         discount_str = ""
@@ -63,6 +80,7 @@ class Passenger(Person):
 
 class Transport:
     """Базовый класс для транспорта"""
+    __slots__ = ('id', 'brand', 'model', '_year', '_capacity', '_status', '_listener')
     STATUS_ACTIVE = "Активен"
     STATUS_REPAIR = "В ремонте"
     STATUS_RETIRED = "Списан"
@@ -78,11 +96,45 @@ class Transport:
             raise InvalidDataException("Вместимость должна быть положительной")
 
         self.id = id
-        self.brand = brand
-        self.model = model
-        self.year = year
-        self.capacity = capacity
-        self.status = self.STATUS_ACTIVE
+        self.brand = sys.intern(brand)
+        self.model = sys.intern(model)
+        # Обработчик изменения индексируемых полей (устанавливается компанией для обновления индексов)
+        self._listener = None
+        self._year = year
+        self._capacity = capacity
+        self._status = sys.intern(self.STATUS_ACTIVE)
+
+    def _changed(self, field: str, old_value):
+        """Уведомление обработчика об изменении поля field"""
+        if self._listener is not None and old_value != getattr(self, field):
+            self._listener(self, field, old_value)
+
+    @property
+    def year(self) -> int:
+        return self._year
+
+    @year.setter
+    def year(self, value: int):
+        old_year, self._year = self._year, value
+        self._changed('year', old_year)
+
+    @property
+    def capacity(self) -> int:
+        return self._capacity
+
+    @capacity.setter
+    def capacity(self, value: int):
+        old_capacity, self._capacity = self._capacity, value
+        self._changed('capacity', old_capacity)
+
+    @property
+    def status(self) -> str:
+        return self._status
+
+    @status.setter
+    def status(self, value: str):
+        old_status, self._status = self._status, sys.intern(value)
+        self._changed('status', old_status)
 
     def __str__(self):
         return f"{self.brand} {self.model} ({self.year} г.), {self.capacity} мест"
@@ -90,6 +142,7 @@ class Transport:
 
 class Bus(Transport):
     """Автобус (включая электробусы)"""
+    __slots__ = ('route_number',)
 
     def __init__(self, id: int, brand: str, model: str, year: int, capacity: int, route_number: str = ""):
         super().__init__(id, brand, model, year, capacity)
@@ -103,6 +156,7 @@ class Bus(Transport):
 
 class Tram(Transport):
     """Трамвай"""
+    __slots__ = ('line_number',)
 
     def __init__(self, id: int, brand: str, model: str, year: int, capacity: int, line_number: str = ""):
         super().__init__(id, brand, model, year, capacity)
@@ -115,6 +169,7 @@ class Tram(Transport):
 
 class Trolleybus(Transport):
     """Троллейбус"""
+    __slots__ = ('route_number',)
 
     def __init__(self, id: int, brand: str, model: str, year: int, capacity: int, route_number: str = ""):
         super().__init__(id, brand, model, year, capacity)
@@ -127,6 +182,7 @@ class Trolleybus(Transport):
 
 class Route:
     """Маршрут"""
+    __slots__ = ('id', 'number', 'start_point', 'end_point', 'distance')
 
     def __init__(self, id: int, number: str, start_point: str, end_point: str, distance: float):
         if not number:
@@ -147,7 +203,14 @@ class Route:
 
 
 class Trip:
-    """Поездка/рейс"""
+    """
+    Поездка/рейс
+
+    Стоимость проезда после создания не меняется: от нее зависят выручка рейса
+    и цены билетов, уже записанные в журнал.
+    """
+    __slots__ = ('id', 'route', 'transport', 'driver', 'departure_time', 'arrival_time', '_fare',
+                 '_passengers', '_revenue', '_category_counts', '_version')
 
     def __init__(self, id: int, route: Route, transport: Transport, driver: Employee,
                  departure_time: datetime, arrival_time: datetime, fare: float):
@@ -164,41 +227,114 @@ class Trip:
         self.driver = driver
         self.departure_time = departure_time
         self.arrival_time = arrival_time
-        self.fare = fare
-        self.passengers: List[Passenger] = []
+        self._fare = fare
+
+        # Пассажиры по ID и агрегаты, обновляемые при каждой посадке/высадке
+        self._passengers: Dict[int, Passenger] = {}
+        self._revenue = 0.0
+        self._category_counts: Dict[str, int] = {}
+        # Номер изменения состава пассажиров (для кэшей отображения рейса)
+        self._version = 0
+
+    @property
+    def fare(self) -> float:
+        return self._fare
+
+    @property
+    def version(self) -> int:
+        """Номер изменения состава пассажиров: растет при каждой посадке и высадке"""
+        return self._version
+
+    @property
+    def passengers(self) -> List[Passenger]:
+        """Пассажиры рейса в порядке посадки"""
+        return list(self._passengers.values())
+
+    def ticket_price(self, passenger: Passenger) -> float:
+        """Стоимость билета для пассажира с учетом льгот"""
+        if passenger.discount == 100:
+            return 0  # Бесплатно
+        return self.fare * (1 - passenger.discount / 100)
 
     def add_passenger(self, passenger: Passenger):
         """Добавление пассажира в рейс с учетом льгот"""
-        if len(self.passengers) >= self.transport.capacity:
+        if len(self._passengers) >= self.transport.capacity:
             raise TransportException("Транспорт заполнен, нельзя добавить больше пассажиров")
-        self.passengers.append(passenger)
-
-    def remove_passenger(self, passenger_id: int):
-        """Удаление пассажира из рейса"""
-        self.passengers = [p for p in self.passengers if p.id != passenger_id]
+        if passenger.id in self._passengers:
+            raise TransportException("Пассажир уже зарегистрирован на этот рейс")
+        self._passengers[passenger.id] = passenger
+        self._version += 1
+        self._revenue += self.ticket_price(passenger)
+        self._category_counts[passenger.category] = self._category_counts.get(passenger.category, 0) + 1
+
+    def add_passengers(self, passengers: List[Passenger]):
+        """Посадка группы пассажиров за один шаг: одна проверка вместимости и пересчет агрегатов"""
+        if len(self._passengers) + len(passengers) > self.transport.capacity:
+            raise TransportException("Транспорт заполнен, нельзя добавить больше пассажиров")
+        added = {p.id: p for p in passengers}
+        if len(added) != len(passengers) or not added.keys().isdisjoint(self._passengers):
+            raise TransportException("Пассажир уже зарегистрирован на этот рейс")
+
+        self._passengers.update(added)
+        self._version += 1
+        fare = self.fare
+        counts = self._category_counts
+        for p in passengers:
+            if p.discount != 100:
+                self._revenue += fare * (1 - p.discount / 100)
+            counts[p.category] = counts.get(p.category, 0) + 1
+
+    def remove_passenger(self, passenger_id: int) -> Optional[Passenger]:
+        """Удаление пассажира из рейса. Возвращает удаленного пассажира (None, если его не было)"""
+        passenger = self._passengers.pop(passenger_id, None)
+        if passenger is None:
+            return None
+        self._version += 1
+
+        if self._passengers:
+            self._revenue -= self.ticket_price(passenger)
+        else:
+            # Сбрасываем накопленную погрешность вычислений с плавающей точкой
+            self._revenue = 0.0
+
+        count = self._category_counts[passenger.category] - 1
+        if count:
+            self._category_counts[passenger.category] = count
+        else:
+            del self._category_counts[passenger.category]
+        return passenger
+
+    def get_passenger_ids(self) -> List[int]:
+        """ID пассажиров рейса в порядке посадки"""
+        return list(self._passengers)
+
+    def has_passenger(self, passenger_id: int) -> bool:
+        """Зарегистрирован ли пассажир на рейс"""
+        return passenger_id in self._passengers
 
     def get_passenger_count(self) -> int:
         """Количество пассажиров"""
-        return len(self.passengers)
+        return len(self._passengers)
 
     def get_free_seats(self) -> int:
         """Свободные места"""
-        return self.transport.capacity - len(self.passengers)
+        return self.transport.capacity - len(self._passengers)
+
+    def get_occupancy(self) -> float:
+        """Заполненность рейса (доля занятых мест)"""
+        return len(self._passengers) / self.transport.capacity
 
     def get_total_revenue(self) -> float:
         """Общая выручка за рейс с учетом льгот"""
-        total = 0
-        for passenger in self.passengers:
-            if passenger.discount == 100:
-                ticket_price = 0  # Бесплатно
-            else:
-                ticket_price = self.fare * (1 - passenger.discount / 100)
-            total += ticket_price
-        return total
+        return self._revenue
+
+    def get_category_counts(self) -> Dict[str, int]:
+        """Количество пассажиров по категориям"""
+        return dict(self._category_counts)
 
     def get_passengers_by_category(self, category: str) -> List[Passenger]:
         """Получение пассажиров по категории"""
-        return [p for p in self.passengers if p.category == category]
+        return [p for p in self._passengers.values() if p.category == category]
 
     def __str__(self):
         """Красивое отображение информации о рейсе"""
@@ -224,11 +360,7 @@ class Trip:
         free_seats = self.get_free_seats()
 
         # Подсчет по категориям
-        categories = {}
-        for p in self.passengers:
-            categories[p.category] = categories.get(p.category, 0) + 1
-
-        categories_str = ", ".join([f"{cat}: {count}" for cat, count in categories.items()])
+        categories_str = ", ".join([f"{cat}: {count}" for cat, count in self._category_counts.items()])
 
         # Выручка с учетом льгот
         revenue = self.get_total_revenue()
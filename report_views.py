@@ -0,0 +1,157 @@
+"""
+Материализованные отчеты по выручке и пассажиропотоку
+
+ReportViews подключается к TransportCompany и обновляет агрегаты при каждой продаже
+и возврате билета, добавлении рейса и смене транспорта рейса - за O(1) на билет,
+поэтому чтение отчета не требует прохода по всем рейсам. rebuild пересчитывает
+отчеты заново, verify сравнивает их с полным пересчетом.
+"""
+
+from datetime import date
+from typing import Dict, List, Optional, Tuple
+from models import Passenger, Transport, Trip
+
+# Допустимое расхождение сумм выручки из-за накопленной погрешности вычислений
+REVENUE_TOLERANCE = 1e-6
+
+
+class ReportViews:
+    """
+    Отчеты, поддерживаемые в актуальном состоянии:
+        revenue_by_route_day - выручка по (ID маршрута, день отправления)
+        tickets_by_route_day - количество билетов по (ID маршрута, день отправления)
+        riders_by_category - количество билетов по льготной категории
+        revenue_by_category - выручка по льготной категории
+        seats_by_transport - [продано мест, предложено мест] по ID транспорта
+    """
+
+    VIEWS = ('revenue_by_route_day', 'tickets_by_route_day', 'riders_by_category',
+             'revenue_by_category', 'seats_by_transport')
+
+    def __init__(self, company):
+        """Подключение к компании с построением отчетов по текущим данным"""
+        self.company = company
+        self.rebuild()
+        company.views = self
+
+    def detach(self):
+        """Отключение от компании: отчеты перестают обновляться"""
+        if self.company.views is self:
+            self.company.views = None
+
+    def rebuild(self):
+        """Пересчет всех отчетов по рейсам компании"""
+        for name, view in self._compute(self.company.trips).items():
+            setattr(self, name, view)
+
+    def snapshot(self) -> Dict[str, dict]:
+        """Копии всех отчетов на текущий момент (дальнейшие изменения в них не попадают)"""
+        views = {name: dict(getattr(self, name)) for name in self.VIEWS}
+        views['seats_by_transport'] = {k: list(v) for k, v in views['seats_by_transport'].items()}
+        return views
+
+    def verify(self) -> List[str]:
+        """Расхождения с полным пересчетом (пустой список - отчеты верны)"""
+        problems = []
+        expected = self._compute(self.company.trips)
+        for name in self.VIEWS:
+            actual, wanted = getattr(self, name), expected[name]
+            for key in sorted(actual.keys() | wanted.keys(), key=repr):
+                a, w = actual.get(key), wanted.get(key)
+                if isinstance(a, float) and isinstance(w, float) and abs(a - w) <= REVENUE_TOLERANCE * max(1.0, abs(w)):
+                    continue
+                if a != w:
+                    problems.append(f"{name}[{key!r}]: {a!r} вместо {w!r}")
+        return problems
+
+    def load_factor(self, transport_id: int) -> Optional[float]:
+        """Доля проданных мест по всем рейсам транспорта (None, если рейсов нет)"""
+        seats = self.seats_by_transport.get(transport_id)
+        if not seats or not seats[1]:
+            return None
+        return seats[0] / seats[1]
+
+    @staticmethod
+    def _compute(trips) -> Dict[str, dict]:
+        """Полный пересчет отчетов по рейсам"""
+        revenue_by_route_day: Dict[Tuple[int, date], float] = {}
+        tickets_by_route_day: Dict[Tuple[int, date], int] = {}
+        riders_by_category: Dict[str, int] = {}
+        revenue_by_category: Dict[str, float] = {}
+        seats_by_transport: Dict[int, List[int]] = {}
+
+        for trip in trips:
+            seats = seats_by_transport.setdefault(trip.transport.id, [0, 0])
+            count = trip.get_passenger_count()
+            seats[0] += count
+            seats[1] += trip.transport.capacity
+            if not count:
+                continue
+            key = (trip.route.id, trip.departure_time.date())
+            revenue_by_route_day[key] = revenue_by_route_day.get(key, 0.0) + trip.get_total_revenue()
+            tickets_by_route_day[key] = tickets_by_route_day.get(key, 0) + count
+            for category, category_count in trip.get_category_counts().items():
+                riders_by_category[category] = riders_by_category.get(category, 0) + category_count
+            for passenger in trip.passengers:
+                revenue_by_category[passenger.category] = (revenue_by_category.get(passenger.category, 0.0)
+                                                           + trip.ticket_price(passenger))
+
+        return {
+            'revenue_by_route_day': revenue_by_route_day,
+            'tickets_by_route_day': tickets_by_route_day,
+            'riders_by_category': riders_by_category,
+            'revenue_by_category': revenue_by_category,
+            'seats_by_transport': seats_by_transport,
+        }
+
+    # События компании
+    def ticket_booked(self, trip: Trip, passenger: Passenger, price: float):
+        """Продажа билета"""
+        key = (trip.route.id, trip.departure_time.date())
+        category = passenger.category
+        self.revenue_by_route_day[key] = self.revenue_by_route_day.get(key, 0.0) + price
+        self.tickets_by_route_day[key] = self.tickets_by_route_day.get(key, 0) + 1
+        self.revenue_by_category[category] = self.revenue_by_category.get(category, 0.0) + price
+        self.riders_by_category[category] = self.riders_by_category.get(category, 0) + 1
+        self.seats_by_transport.setdefault(trip.transport.id, [0, 0])[0] += 1
+
+    def tickets_booked(self, trip: Trip, passengers: List[Passenger], prices: List[float]):
+        """Продажа группы билетов на один рейс"""
+        for passenger, price in zip(passengers, prices):
+            self.ticket_booked(trip, passenger, price)
+
+    def ticket_cancelled(self, trip: Trip, passenger: Passenger, price: float):
+        """Возврат билета; группа без билетов удаляется вместе с накопленной погрешностью суммы"""
+        key = (trip.route.id, trip.departure_time.date())
+        category = passenger.category
+        if self.tickets_by_route_day[key] == 1:
+            del self.tickets_by_route_day[key]
+            del self.revenue_by_route_day[key]
+        else:
+            self.tickets_by_route_day[key] -= 1
+            self.revenue_by_route_day[key] -= price
+        if self.riders_by_category[category] == 1:
+            del self.riders_by_category[category]
+            del self.revenue_by_category[category]
+        else:
+            self.riders_by_category[category] -= 1
+            self.revenue_by_category[category] -= price
+        self.seats_by_transport[trip.transport.id][0] -= 1
+
+    def trip_added(self, trip: Trip):
+        """Новый рейс (возможно, уже с пассажирами - при повторении журнала)"""
+        self.seats_by_transport.setdefault(trip.transport.id, [0, 0])[1] += trip.transport.capacity
+        for passenger in trip.passengers:
+            self.ticket_booked(trip, passenger, trip.ticket_price(passenger))
+
+    def trip_reassigned(self, trip: Trip, old_transport: Transport):
+        """Смена транспорта рейса: проданные и предложенные места переходят к новому транспорту"""
+        count = trip.get_passenger_count()
+        old_seats = self.seats_by_transport[old_transport.id]
+        old_seats[0] -= count
+        old_seats[1] -= old_transport.capacity
+        if not old_seats[1]:
+            del self.seats_by_transport[old_transport.id]
+        seats = self.seats_by_transport.setdefault(trip.transport.id, [0, 0])
+        seats[0] += count
+        seats[1] += trip.transport.capacity
@@ -0,0 +1,439 @@
+"""
+Транспортная компания, разделенная по маршрутам между процессами
+
+Каждый шард - отдельный процесс со своей TransportCompany, поэтому билеты на рейсы
+разных шардов продаются параллельно, а не по очереди под одним GIL. Маршрут и все
+его рейсы принадлежат шарду с номером ID маршрута % количество шардов; транспорт,
+сотрудники и пассажиры копируются во все шарды.
+
+ShardedCompany - маршрутизатор: выдает ID, передает запросы по рейсу его шарду через
+канал multiprocessing.Pipe, а запросы по всей компании (поиск, отчеты) рассылает всем
+шардам сразу и объединяет ответы.
+
+Ограничения:
+    - накладки транспорта и водителей проверяются только среди рейсов одного шарда;
+    - book_many(atomic=True) с рейсами разных шардов при ошибке в одном шарде отменяет
+      билеты, уже проданные в остальных, но до отмены они видны другим запросам;
+    - рейсы возвращаются записями storage.trip_to_record, а не объектами Trip.
+"""
+
+import heapq
+import multiprocessing
+import os
+from datetime import datetime
+from itertools import islice
+from operator import itemgetter
+from threading import Lock
+from typing import Dict, List, Optional, Tuple
+from models import Transport, Employee, Passenger, Route, Trip
+from exceptions import InvalidDataException, NotFoundException
+from storage import trip_to_record
+from transport_company import TransportCompany
+
+# Порядок рейсов в объединенных ответах: время отправления в ISO 8601 сравнивается как строка
+_TRIP_ORDER = itemgetter('departure_time', 'id')
+
+
+class _Shard:
+    """Команды, выполняемые в процессе шарда над его компанией"""
+
+    def __init__(self, name: str):
+        self.company = TransportCompany(name)
+
+    def add(self, section: str, objects: list):
+        """Добавление копий объектов справочника или маршрутов шарда"""
+        getattr(self.company, f'add_{section}')(objects)
+
+    def _trip_from_record(self, r: Dict) -> Trip:
+        """Рейс из записи со ссылками на объекты компании шарда"""
+        company = self.company
+        route = company.get_route(r['route_id'])
+        if not route:
+            raise NotFoundException(f"Маршрут с ID {r['route_id']} не найден")
+        transport = company.get_transport(r['transport_id'])
+        if not transport:
+            raise NotFoundException(f"Транспорт с ID {r['transport_id']} не найден")
+        driver = company.get_employee(r['driver_id'])
+        if not driver:
+            raise NotFoundException(f"Сотрудник с ID {r['driver_id']} не найден")
+        trip = Trip(r['id'], route, transport, driver, datetime.fromisoformat(r['departure_time']),
+                    datetime.fromisoformat(r['arrival_time']), r['fare'])
+        passengers = [company.get_passenger(passenger_id) for passenger_id in r['passengers']]
+        if None in passengers:
+            raise NotFoundException(f"Рейс {r['id']} ссылается на несуществующего пассажира")
+        if passengers:
+            trip.add_passengers(passengers)
+        return trip
+
+    def add_trip(self, record: Dict, allow_conflicts: bool):
+        self.company.add_trip(self._trip_from_record(record), allow_conflicts)
+
+    def add_trips(self, records: List[Dict]):
+        self.company.add_trips([self._trip_from_record(r) for r in records])
+
+    def get_trip(self, trip_id: int) -> Optional[Dict]:
+        trip = self.company.get_trip(trip_id)
+        return trip_to_record(trip) if trip else None
+
+    def book_ticket(self, trip_id: int, passenger_id: int) -> float:
+        return self.company.book_ticket(trip_id, passenger_id)
+
+    def book_many(self, bookings: List[Tuple[int, int]], atomic: bool) -> list:
+        return self.company.book_many(bookings, atomic)
+
+    def cancel_ticket(self, trip_id: int, passenger_id: int):
+        self.company.cancel_ticket(trip_id, passenger_id)
+
+    def cancel_many(self, bookings: List[Tuple[int, int]]):
+        for trip_id, passenger_id in bookings:
+            self.company.cancel_ticket(trip_id, passenger_id)
+
+    def search_trips(self, *args) -> List[Dict]:
+        return [trip_to_record(t) for t in self.company.search_trips(*args)]
+
+    def trips_between(self, start: datetime, end: datetime, route_id: Optional[int]) -> List[Dict]:
+        return [trip_to_record(t) for t in self.company.trips_between(start, end, route_id)]
+
+    def report(self, name: str) -> Dict:
+        """Отчет журнала билетов шарда (TicketLedger.<name>)"""
+        return getattr(self.company.ledger, name)()
+
+    def counts(self) -> Dict[str, int]:
+        company = self.company
+        return {'routes': len(company.routes), 'trips': len(company.trips), 'tickets': len(company.ledger)}
+
+
+def _serve(conn, name: str):
+    """
+    Цикл процесса шарда
+
+    Запрос - (команда, аргументы), ответ - ('ok', результат) или ('error', исключение);
+    None вместо запроса завершает процесс.
+    """
+    shard = _Shard(name)
+    while True:
+        message = conn.recv()
+        if message is None:
+            break
+        command, args = message
+        try:
+            reply = ('ok', getattr(shard, command)(*args))
+        except Exception as e:
+            reply = ('error', e)
+        conn.send(reply)
+    conn.close()
+
+
+class ShardedCompany:
+    """Маршрутизатор запросов к шардам компании (можно использовать в with)"""
+
+    def __init__(self, name: str, shards: Optional[int] = None, start_method: Optional[str] = None):
+        """
+        Запуск процессов шардов
+
+        Args:
+            name: название компании
+            shards: количество шардов (по умолчанию - количество процессоров)
+            start_method: способ запуска процессов multiprocessing (fork, spawn, forkserver)
+        """
+        if shards is None:
+            shards = os.cpu_count() or 1
+        if shards < 1:
+            raise InvalidDataException("Количество шардов должно быть положительным")
+        self.name = name
+        context = multiprocessing.get_context(start_method)
+        self._connections = []
+        self._processes = []
+        for number in range(shards):
+            conn, child_conn = context.Pipe()
+            process = context.Process(target=_serve, args=(child_conn, f"{name} (шард {number})"), daemon=True)
+            process.start()
+            child_conn.close()
+            self._connections.append(conn)
+            self._processes.append(process)
+        # Канал шарда используется одним запросом за раз: ответы приходят в порядке запросов
+        self._locks = [Lock() for _ in range(shards)]
+        # ID рейса -> номер шарда
+        self._trip_shards: Dict[int, int] = {}
+        # Счетчики ID и карта рейсов меняются запросами из разных потоков
+        self._router_lock = Lock()
+        self._closed = False
+
+        self._next_id = {
+            'transport': 1,
+            'employee': 1,
+            'passenger': 1,
+            'route': 1,
+            'trip': 1
+        }
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def close(self):
+        """Завершение процессов шардов"""
+        if self._closed:
+            return
+        self._closed = True
+        for conn, lock in zip(self._connections, self._locks):
+            with lock:
+                try:
+                    conn.send(None)
+                except OSError:
+                    pass
+        for conn, process in zip(self._connections, self._processes):
+            process.join(5)
+            if process.is_alive():
+                process.terminate()
+            conn.close()
+
+    @property
+    def shard_count(self) -> int:
+        return len(self._connections)
+
+    def shard_of_route(self, route_id: int) -> int:
+        """Номер шарда, которому принадлежат маршрут и его рейсы"""
+        return route_id % len(self._connections)
+
+    def _trip_shard(self, trip_id: int) -> int:
+        shard = self._trip_shards.get(trip_id)
+        if shard is None:
+            raise NotFoundException(f"Рейс с ID {trip_id} не найден")
+        return shard
+
+    def _assign_ids(self, entity_type: str, objects: list) -> list:
+        """Назначение ID новым объектам (id == 0) из одного блока; возвращает эти объекты"""
+        new_objects = [obj for obj in objects if obj.id == 0]
+        with self._router_lock:
+            first = self._next_id[entity_type]
+            self._next_id[entity_type] = first + len(new_objects)
+        for obj_id, obj in enumerate(new_objects, first):
+            obj.id = obj_id
+        return new_objects
+
+    def _release_ids(self, entity_type: str, objects: list):
+        """
+        Возврат ID объектов, которые шард не принял
+
+        ID объектов сбрасываются в 0. Счетчик уменьшается, только если после них
+        другие ID не выдавались, иначе в нумерации остается пропуск.
+        """
+        released = {obj.id for obj in objects}
+        for obj in objects:
+            obj.id = 0
+        with self._router_lock:
+            while self._next_id[entity_type] - 1 in released:
+                self._next_id[entity_type] -= 1
+
+    def _scatter(self, requests: Dict[int, Tuple[str, tuple]]) -> Dict[int, Tuple[str, object]]:
+        """
+        Отправка запросов нескольким шардам сразу и получение всех ответов
+
+        Шарды выполняют запросы параллельно; ответ - ('ok', результат) или ('error', исключение).
+        """
+        if self._closed:
+            raise InvalidDataException("Компания закрыта")
+        shards = sorted(requests)
+        # Блокировки в порядке номеров шардов: параллельные рассылки не ждут друг друга по кругу
+        for shard in shards:
+            self._locks[shard].acquire()
+        try:
+            for shard in shards:
+                self._connections[shard].send(requests[shard])
+            return {shard: self._connections[shard].recv() for shard in shards}
+        finally:
+            for shard in shards:
+                self._locks[shard].release()
+
+    def _call(self, shard: int, command: str, *args):
+        """Запрос к одному шарду"""
+        status, value = self._scatter({shard: (command, args)})[shard]
+        if status == 'error':
+            raise value
+        return value
+
+    def _gather(self, command: str, *args) -> list:
+        """Запрос ко всем шардам: результаты по порядку номеров шардов"""
+        replies = self._scatter({shard: (command, args) for shard in range(len(self._connections))})
+        for status, value in replies.values():
+            if status == 'error':
+                raise value
+        return [value for _, value in replies.values()]
+
+    # Справочники: копия в каждом шарде
+    def add_transport(self, transport: Transport):
+        self.add_transports([transport])
+
+    def add_transports(self, transports: List[Transport]):
+        transports = list(transports)
+        self._assign_ids('transport', transports)
+        self._gather('add', 'transports', transports)
+
+    def add_employee(self, employee: Employee):
+        self.add_employees([employee])
+
+    def add_employees(self, employees: List[Employee]):
+        employees = list(employees)
+        self._assign_ids('employee', employees)
+        self._gather('add', 'employees', employees)
+
+    def add_passenger(self, passenger: Passenger):
+        self.add_passengers([passenger])
+
+    def add_passengers(self, passengers: List[Passenger]):
+        passengers = list(passengers)
+        self._assign_ids('passenger', passengers)
+        self._gather('add', 'passengers', passengers)
+
+    # Маршруты и рейсы: в шарде маршрута
+    def add_route(self, route: Route):
+        self.add_routes([route])
+
+    def add_routes(self, routes: List[Route]):
+        routes = list(routes)
+        self._assign_ids('route', routes)
+        groups: Dict[int, List[Route]] = {}
+        for route in routes:
+            groups.setdefault(self.shard_of_route(route.id), []).append(route)
+        replies = self._scatter({shard: ('add', ('routes', group)) for shard, group in groups.items()})
+        for status, value in replies.values():
+            if status == 'error':
+                raise value
+
+    def add_trip(self, trip: Trip, allow_conflicts: bool = True):
+        """Добавление рейса (накладки при allow_conflicts=False ищутся среди рейсов шарда)"""
+        new_trips = self._assign_ids('trip', [trip])
+        shard = self.shard_of_route(trip.route.id)
+        try:
+            self._call(shard, 'add_trip', trip_to_record(trip), allow_conflicts)
+        except Exception:
+            self._release_ids('trip', new_trips)
+            raise
+        with self._router_lock:
+            self._trip_shards[trip.id] = shard
+
+    def add_trips(self, trips: List[Trip]):
+        """Добавление многих рейсов: один запрос на шард, шарды добавляют рейсы параллельно"""
+        trips = list(trips)
+        new_trips = {id(t) for t in self._assign_ids('trip', trips)}
+        groups: Dict[int, List[Trip]] = {}
+        for trip in trips:
+            groups.setdefault(self.shard_of_route(trip.route.id), []).append(trip)
+        replies = self._scatter({shard: ('add_trips', ([trip_to_record(t) for t in group],))
+                                 for shard, group in groups.items()})
+        errors = []
+        rejected = []
+        for shard, (status, value) in replies.items():
+            if status == 'error':
+                errors.append(value)
+                rejected.extend(t for t in groups[shard] if id(t) in new_trips)
+            else:
+                with self._router_lock:
+                    self._trip_shards.update((t.id, shard) for t in groups[shard])
+        if errors:
+            self._release_ids('trip', rejected)
+            raise errors[0]
+
+    def get_trip(self, trip_id: int) -> Optional[Dict]:
+        """Запись рейса (storage.trip_to_record) или None"""
+        shard = self._trip_shards.get(trip_id)
+        if shard is None:
+            return None
+        return self._call(shard, 'get_trip', trip_id)
+
+    # Билеты
+    def book_ticket(self, trip_id: int, passenger_id: int) -> float:
+        """Покупка билета в шарде рейса. Возвращает стоимость"""
+        return self._call(self._trip_shard(trip_id), 'book_ticket', trip_id, passenger_id)
+
+    def cancel_ticket(self, trip_id: int, passenger_id: int):
+        """Возврат билета"""
+        shard = self._trip_shards.get(trip_id)
+        if shard is None:
+            raise NotFoundException(f"Билет пассажира {passenger_id} на рейс {trip_id} не найден")
+        self._call(shard, 'cancel_ticket', trip_id, passenger_id)
+
+    def book_many(self, bookings: List[Tuple[int, int]], atomic: bool = True) -> list:
+        """
+        Покупка группы билетов: каждый шард получает свою часть одним запросом
+
+        Результат - как у TransportCompany.book_many. При atomic=True и ошибке в одном
+        из шардов билеты, проданные остальными шардами, возвращаются.
+        """
+        results: list = [None] * len(bookings)
+        # Номер шарда -> позиции в bookings
+        positions: Dict[int, List[int]] = {}
+        for pos, (trip_id, passenger_id) in enumerate(bookings):
+            shard = self._trip_shards.get(trip_id)
+            if shard is None:
+                error = NotFoundException(f"Рейс с ID {trip_id} не найден")
+                if atomic:
+                    raise error
+                results[pos] = error
+            else:
+                positions.setdefault(shard, []).append(pos)
+
+        parts = {shard: [bookings[pos] for pos in group] for shard, group in positions.items()}
+        replies = self._scatter({shard: ('book_many', (part, atomic)) for shard, part in parts.items()})
+        errors = [value for status, value in replies.values() if status == 'error']
+        if errors:
+            if atomic:
+                sold = {shard: ('cancel_many', (parts[shard],))
+                        for shard, (status, _) in replies.items() if status == 'ok'}
+                self._scatter(sold)
+            raise errors[0]
+        for shard, (_, prices) in replies.items():
+            for pos, price in zip(positions[shard], prices):
+                results[pos] = price
+        return results
+
+    # Запросы по всей компании
+    def search_trips(self, start_point: str, end_point: str, departure_from: datetime,
+                     departure_to: Optional[datetime] = None, min_free_seats: int = 1,
+                     limit: Optional[int] = None) -> List[Dict]:
+        """Поиск рейсов (см. TransportCompany.search_trips) во всех шардах с объединением по времени"""
+        parts = self._gather('search_trips', start_point, end_point, departure_from, departure_to,
+                             min_free_seats, limit)
+        return list(islice(heapq.merge(*parts, key=_TRIP_ORDER), limit))
+
+    def trips_between(self, start: datetime, end: datetime, route_id: Optional[int] = None) -> List[Dict]:
+        """Рейсы с отправлением в [start, end): по маршруту - из одного шарда, иначе из всех"""
+        if route_id is not None:
+            return self._call(self.shard_of_route(route_id), 'trips_between', start, end, route_id)
+        return list(heapq.merge(*self._gather('trips_between', start, end, None), key=_TRIP_ORDER))
+
+    @staticmethod
+    def _sum_parts(parts: List[Dict]) -> Dict:
+        """Сложение словарей, полученных от шардов, по ключам"""
+        totals: Dict = {}
+        for part in parts:
+            for key, value in part.items():
+                totals[key] = totals.get(key, 0) + value
+        return totals
+
+    def _merged_report(self, name: str) -> Dict:
+        """Сумма отчетов журналов билетов всех шардов"""
+        return self._sum_parts(self._gather('report', name))
+
+    def revenue_by_route(self) -> Dict[int, float]:
+        """Выручка по ID маршрута"""
+        return self._merged_report('revenue_by_route')
+
+    def revenue_by_day(self) -> Dict:
+        """Выручка по дням отправления"""
+        return dict(sorted(self._merged_report('revenue_by_day').items()))
+
+    def revenue_by_category(self) -> Dict[str, float]:
+        """Выручка по льготным категориям"""
+        return self._merged_report('revenue_by_category')
+
+    def tickets_by_category(self) -> Dict[str, int]:
+        """Количество билетов по льготным категориям"""
+        return self._merged_report('tickets_by_category')
+
+    def counts(self) -> Dict[str, int]:
+        """Количество маршрутов, рейсов и проданных билетов по всем шардам"""
+        return self._sum_parts(self._gather('counts'))
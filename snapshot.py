@@ -0,0 +1,277 @@
+"""
+Двоичный снапшот данных компании для быстрого сохранения и загрузки
+
+Формат (все числа little-endian):
+    заголовок: сигнатура, версия, CRC32 и длина содержимого
+    содержимое:
+        таблица строк: количество, смещения (в символах) и общий текст в UTF-8
+        название компании (номер в таблице строк) и счетчики ID
+        таблицы транспорта, сотрудников, пассажиров, маршрутов и рейсов -
+            количество записей и записи фиксированной длины (строки - номерами в таблице строк)
+        ID пассажиров рейсов подряд (рейс хранит количество своих пассажиров)
+
+Снапшот предназначен для быстрого восстановления собственных сохранений, поэтому данные
+при загрузке не проверяются повторно: целостность файла подтверждает контрольная сумма.
+
+Разбор файла при загрузке занимает малую долю времени: основное время уходит на создание
+объектов, словарей пассажиров рейсов и перестроение индексов - ту же работу, что и при
+загрузке из JSON, поэтому загрузка быстрее JSON в полтора-два раза, а сохранение - в несколько раз.
+"""
+
+import mmap
+import struct
+import zlib
+from array import array
+from datetime import datetime, timedelta
+from itertools import accumulate, starmap
+from operator import attrgetter
+from typing import Dict, List
+from models import Bus, Tram, Trolleybus, Employee, Passenger, Route, Trip
+from exceptions import InvalidDataException
+from storage import atomic_write, paused_gc
+
+MAGIC = b'TCSNAP\x00\x00'
+VERSION = 1
+
+HEADER = struct.Struct('<8sHHIQ')  # сигнатура, версия, резерв, CRC32, длина содержимого
+COUNT = struct.Struct('<Q')
+
+# id, тип, марка, модель, год, вместимость, статус, номер маршрута/линии
+TRANSPORT = struct.Struct('<qBIIhiII')
+# id, имя, телефон, должность, зарплата
+EMPLOYEE = struct.Struct('<qIIId')
+# id, имя, телефон, email, скидка, категория
+PASSENGER = struct.Struct('<qIIIdI')
+# id, номер, начальная точка, конечная точка, расстояние
+ROUTE = struct.Struct('<qIIId')
+# id, маршрут, транспорт, водитель, отправление, прибытие (мкс от начала эпохи),
+# стоимость, выручка, число пассажиров
+TRIP = struct.Struct('<qqqqqqddI')
+
+NEXT_ID_KEYS = ('transport', 'employee', 'passenger', 'route', 'trip')
+NEXT_ID = struct.Struct('<' + 'q' * len(NEXT_ID_KEYS))
+
+TRANSPORT_CLASSES = (Bus, Tram, Trolleybus)
+
+EPOCH = datetime(1970, 1, 1)
+MICROSECOND = timedelta(microseconds=1)
+
+
+class _StringTable:
+    """Таблица строк: каждая уникальная строка хранится один раз, номер - порядок добавления"""
+
+    def __init__(self):
+        self._index: Dict[str, int] = {}
+
+    def refs(self, values) -> List[int]:
+        """Номера строк в таблице (новые строки добавляются в конец)"""
+        index = self._index
+        return [index.setdefault(value, len(index)) for value in values]
+
+    def to_bytes(self) -> bytes:
+        strings = list(self._index)
+        offsets = array('Q', [0])
+        offsets.extend(accumulate(map(len, strings)))
+        text = ''.join(strings).encode('utf-8')
+        return COUNT.pack(len(strings)) + offsets.tobytes() + COUNT.pack(len(text)) + text
+
+
+def _table(record: struct.Struct, count: int, *columns) -> bytes:
+    """Таблица записей фиксированной длины из столбцов значений"""
+    return COUNT.pack(count) + b''.join(starmap(record.pack, zip(*columns)))
+
+
+def _column(objects, name: str) -> List:
+    return list(map(attrgetter(name), objects))
+
+
+def _microseconds(moments) -> List[int]:
+    return [(moment - EPOCH) // MICROSECOND for moment in moments]
+
+
+def write_snapshot(company, filename: str) -> int:
+    """Сохранение компании в двоичный снапшот. Возвращает контрольную сумму содержимого"""
+    s = _StringTable()
+    name_ref = s.refs([company.name])
+
+    transports = company.transports
+    numbers = [t.line_number if isinstance(t, Tram) else t.route_number for t in transports]
+    transport_table = _table(
+        TRANSPORT, len(transports), _column(transports, 'id'),
+        [TRANSPORT_CLASSES.index(type(t)) for t in transports],
+        s.refs(_column(transports, 'brand')), s.refs(_column(transports, 'model')),
+        _column(transports, 'year'), _column(transports, 'capacity'),
+        s.refs(_column(transports, 'status')), s.refs(numbers))
+
+    employees = company.employees
+    employee_table = _table(
+        EMPLOYEE, len(employees), _column(employees, 'id'),
+        s.refs(_column(employees, 'name')), s.refs(_column(employees, 'phone')),
+        s.refs(_column(employees, 'position')), _column(employees, 'salary'))
+
+    passengers = company.passengers
+    passenger_table = _table(
+        PASSENGER, len(passengers), _column(passengers, 'id'),
+        s.refs(_column(passengers, 'name')), s.refs(_column(passengers, 'phone')),
+        s.refs(_column(passengers, 'email')), _column(passengers, 'discount'),
+        s.refs(_column(passengers, 'category')))
+
+    routes = company.routes
+    route_table = _table(
+        ROUTE, len(routes), _column(routes, 'id'),
+        s.refs(_column(routes, 'number')), s.refs(_column(routes, 'start_point')),
+        s.refs(_column(routes, 'end_point')), _column(routes, 'distance'))
+
+    trips = company.trips
+    passenger_ids = array('q')
+    for t in trips:
+        passenger_ids.extend(t.get_passenger_ids())
+    trip_table = _table(
+        TRIP, len(trips), _column(trips, 'id'),
+        [t.route.id for t in trips], [t.transport.id for t in trips], [t.driver.id for t in trips],
+        _microseconds(_column(trips, 'departure_time')), _microseconds(_column(trips, 'arrival_time')),
+        _column(trips, 'fare'), [t.get_total_revenue() for t in trips],
+        [t.get_passenger_count() for t in trips])
+
+    payload = b''.join([
+        s.to_bytes(),
+        COUNT.pack(name_ref[0]),
+        NEXT_ID.pack(*(company._next_id.get(key, 1) for key in NEXT_ID_KEYS)),
+        transport_table, employee_table, passenger_table, route_table, trip_table,
+        COUNT.pack(len(passenger_ids)), passenger_ids.tobytes(),
+    ])
+
+    checksum = zlib.crc32(payload)
+    with atomic_write(filename, 'wb') as f:
+        f.write(HEADER.pack(MAGIC, VERSION, 0, checksum, len(payload)))
+        f.write(payload)
+    return checksum
+
+
+def read_checksum(filename: str) -> int:
+    """Контрольная сумма содержимого снапшота из заголовка (без чтения всего файла)"""
+    with open(filename, 'rb') as f:
+        header = f.read(HEADER.size)
+    if len(header) < HEADER.size or header[:len(MAGIC)] != MAGIC:
+        raise InvalidDataException("Файл не является снапшотом транспортной компании")
+    return HEADER.unpack(header)[3]
+
+
+class _Reader:
+    """Последовательное чтение содержимого снапшота из memoryview"""
+
+    def __init__(self, view: memoryview):
+        self.view = view
+        self.pos = 0
+
+    def take(self, size: int) -> memoryview:
+        if self.pos + size > len(self.view):
+            raise InvalidDataException("Снапшот поврежден: неожиданный конец данных")
+        chunk = self.view[self.pos:self.pos + size]
+        self.pos += size
+        return chunk
+
+    def count(self) -> int:
+        return COUNT.unpack(self.take(COUNT.size))[0]
+
+    def table(self, record: struct.Struct):
+        return record.iter_unpack(self.take(self.count() * record.size))
+
+    def strings(self) -> List[str]:
+        count = self.count()
+        offsets = array('Q')
+        offsets.frombytes(self.take((count + 1) * 8))
+        text = str(self.take(self.count()), 'utf-8')
+        return [text[start:end] for start, end in zip(offsets, offsets[1:])]
+
+
+def read_snapshot(company, filename: str):
+    """Загрузка компании из двоичного снапшота (файл отображается в память через mmap)"""
+    # Отображение не закрывается явно: срезы memoryview могут остаться в трассировке исключения,
+    # поэтому mmap освобождается сборщиком, когда на него больше нет ссылок
+    with open(filename, 'rb') as f:
+        view = memoryview(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ))
+
+    if len(view) < HEADER.size:
+        raise InvalidDataException("Файл не является снапшотом транспортной компании")
+    magic, version, _, checksum, length = HEADER.unpack(view[:HEADER.size])
+    if magic != MAGIC:
+        raise InvalidDataException("Файл не является снапшотом транспортной компании")
+    if version > VERSION:
+        raise InvalidDataException(f"Неподдерживаемая версия снапшота: {version}")
+
+    payload = view[HEADER.size:HEADER.size + length]
+    if len(payload) != length or zlib.crc32(payload) != checksum:
+        raise InvalidDataException("Снапшот поврежден: контрольная сумма не совпадает")
+
+    with paused_gc():
+        _load_payload(company, _Reader(payload))
+
+
+def _load_payload(company, reader: _Reader):
+    """Создание объектов из содержимого снапшота в обход конструкторов"""
+    new = object.__new__
+    strings = reader.strings()
+    name = strings[reader.count()]
+    next_id = dict(zip(NEXT_ID_KEYS, NEXT_ID.unpack(reader.take(NEXT_ID.size))))
+
+    transports = {}
+    for id, type_code, brand, model, year, capacity, status, number in reader.table(TRANSPORT):
+        cls = TRANSPORT_CLASSES[type_code]
+        t = new(cls)
+        t.id, t.brand, t.model, t._year, t._capacity = id, strings[brand], strings[model], year, capacity
+        t._status, t._listener = strings[status], None
+        if cls is Tram:
+            t.line_number = strings[number]
+        else:
+            t.route_number = strings[number]
+        transports[id] = t
+
+    employees = {}
+    for id, name_ref, phone, position, salary in reader.table(EMPLOYEE):
+        e = new(Employee)
+        e.id, e.name, e.phone, e.position, e.salary = id, strings[name_ref], strings[phone], strings[position], salary
+        employees[id] = e
+
+    passengers = {}
+    for id, name_ref, phone, email, discount, category in reader.table(PASSENGER):
+        p = new(Passenger)
+        p.id, p.name, p.phone, p.email = id, strings[name_ref], strings[phone], strings[email]
+        p._discount, p._category = discount, strings[category]
+        passengers[id] = p
+
+    routes = {}
+    for id, number, start_point, end_point, distance in reader.table(ROUTE):
+        r = new(Route)
+        r.id, r.number, r.start_point, r.end_point, r.distance = \
+            id, strings[number], strings[start_point], strings[end_point], distance
+        routes[id] = r
+
+    trip_rows = reader.table(TRIP)
+    passenger_ids = array('q')
+    passenger_ids.frombytes(reader.take(reader.count() * 8))
+
+    trips = []
+    # Категория читается из слота напрямую, минуя свойство
+    category = attrgetter('_category')
+    offset = 0
+    try:
+        for id, route_id, transport_id, driver_id, departure, arrival, fare, revenue, count in trip_rows:
+            trip = new(Trip)
+            trip.id, trip.route, trip.transport, trip.driver = \
+                id, routes[route_id], transports[transport_id], employees[driver_id]
+            trip.departure_time = EPOCH + departure * MICROSECOND
+            trip.arrival_time = EPOCH + arrival * MICROSECOND
+            trip._fare, trip._revenue, trip._version = fare, revenue, 0
+            ids = passenger_ids[offset:offset + count]
+            offset += count
+            trip._passengers = trip_passengers = dict(zip(ids, map(passengers.__getitem__, ids)))
+            trip._category_counts = counts = {}
+            for value in map(category, trip_passengers.values()):
+                counts[value] = counts.get(value, 0) + 1
+            trips.append(trip)
+    except KeyError as e:
+        raise InvalidDataException(f"Снапшот ссылается на несуществующий объект с ID {e}")
+
+    company._replace_contents(name, list(transports.values()), list(employees.values()),
+                              list(passengers.values()), list(routes.values()), trips, next_id)
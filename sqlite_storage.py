@@ -0,0 +1,391 @@
+"""
+Хранение данных транспортной компании в SQLite
+
+SqliteTransportCompany повторяет основные методы TransportCompany (add_*, get_*, поиск рейсов,
+продажа билетов), но держит данные в базе, а не в списках: объекты создаются только
+по запросу, поэтому с базой можно работать, даже если она не помещается в память.
+Возвращаемые объекты - снимки строк базы: изменения, сделанные через них (кроме статуса
+транспорта), в базу не попадают.
+"""
+
+import sqlite3
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional
+from models import Transport, Tram, Employee, Passenger, Route, Trip
+from exceptions import TransportException, NotFoundException
+from storage import TRANSPORT_CLASSES, transport_type
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS transports (
+    id INTEGER PRIMARY KEY,
+    type TEXT NOT NULL,
+    brand TEXT NOT NULL,
+    model TEXT NOT NULL,
+    year INTEGER NOT NULL,
+    capacity INTEGER NOT NULL,
+    status TEXT NOT NULL,
+    number TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS transports_status ON transports (status);
+CREATE TABLE IF NOT EXISTS employees (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL,
+    phone TEXT NOT NULL,
+    position TEXT NOT NULL,
+    salary REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS employees_position ON employees (position);
+CREATE TABLE IF NOT EXISTS passengers (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL,
+    phone TEXT NOT NULL,
+    email TEXT NOT NULL,
+    discount REAL NOT NULL,
+    category TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS routes (
+    id INTEGER PRIMARY KEY,
+    number TEXT NOT NULL,
+    start_point TEXT NOT NULL,
+    end_point TEXT NOT NULL,
+    distance REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS routes_number ON routes (number, id);
+CREATE TABLE IF NOT EXISTS trips (
+    id INTEGER PRIMARY KEY,
+    route_id INTEGER NOT NULL,
+    transport_id INTEGER NOT NULL,
+    driver_id INTEGER NOT NULL,
+    departure_time TEXT NOT NULL,
+    arrival_time TEXT NOT NULL,
+    fare REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS trips_departure ON trips (departure_time, id);
+CREATE INDEX IF NOT EXISTS trips_route_departure ON trips (route_id, departure_time, id);
+CREATE INDEX IF NOT EXISTS trips_transport ON trips (transport_id);
+CREATE TABLE IF NOT EXISTS tickets (
+    id INTEGER PRIMARY KEY,
+    trip_id INTEGER NOT NULL,
+    passenger_id INTEGER NOT NULL,
+    price REAL NOT NULL,
+    UNIQUE (trip_id, passenger_id)
+);
+"""
+
+TRANSPORT_COLUMNS = 'id, type, brand, model, year, capacity, status, number'
+EMPLOYEE_COLUMNS = 'id, name, phone, position, salary'
+PASSENGER_COLUMNS = 'id, name, phone, email, discount, category'
+ROUTE_COLUMNS = 'id, number, start_point, end_point, distance'
+TRIP_COLUMNS = 'id, route_id, transport_id, driver_id, departure_time, arrival_time, fare'
+
+# Ограничение на число параметров в одном запросе SQLite
+MAX_PARAMS = 900
+
+
+def _time_text(moment: datetime) -> str:
+    """Время в виде текста одинаковой длины, чтобы сравнение строк совпадало со сравнением времени"""
+    return moment.isoformat(sep=' ', timespec='microseconds')
+
+
+def _chunks(values: List, size: int = MAX_PARAMS):
+    for start in range(0, len(values), size):
+        yield values[start:start + size]
+
+
+class SqliteTransportCompany:
+    """Транспортная компания с данными в базе SQLite"""
+
+    def __init__(self, name: str, path: str = ':memory:'):
+        """
+        Args:
+            name: название компании (для новой базы; у существующей базы сохраняется прежнее)
+            path: путь к файлу базы, ':memory:' - база в памяти
+        """
+        # Транзакциями управляем сами (см. batch), поэтому автоматический BEGIN отключен
+        self._conn = sqlite3.connect(path, isolation_level=None)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._conn.executescript(SCHEMA)
+        self._depth = 0
+
+        row = self._conn.execute("SELECT value FROM meta WHERE key = 'name'").fetchone()
+        if row is None:
+            self._conn.execute("INSERT INTO meta (key, value) VALUES ('name', ?)", (name,))
+            row = (name,)
+        self.name = row[0]
+
+    def close(self):
+        """Закрытие соединения с базой"""
+        self._conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    @contextmanager
+    def batch(self):
+        """
+        Общая транзакция для группы изменений
+
+        Без batch каждое изменение фиксируется отдельно; внутри batch все изменения
+        фиксируются одной транзакцией в конце блока (при исключении отменяются).
+        Блоки можно вкладывать друг в друга.
+        """
+        if self._depth == 0:
+            self._conn.execute('BEGIN IMMEDIATE')
+        self._depth += 1
+        try:
+            yield
+        except BaseException:
+            self._depth -= 1
+            if self._depth == 0:
+                self._conn.execute('ROLLBACK')
+            raise
+        self._depth -= 1
+        if self._depth == 0:
+            self._conn.execute('COMMIT')
+
+    def _insert(self, table: str, columns: str, obj, values: tuple):
+        """Вставка строки; объекту с id == 0 назначается ID, выданный базой"""
+        placeholders = ', '.join('?' * len(values))
+        if obj.id == 0:
+            values = (None,) + values[1:]
+        with self.batch():
+            cursor = self._conn.execute(f'INSERT INTO {table} ({columns}) VALUES ({placeholders})', values)
+        obj.id = cursor.lastrowid
+
+    # Создание объектов из строк базы
+    def _transport_from_row(self, row) -> Transport:
+        id, type_name, brand, model, year, capacity, status, number = row
+        transport = TRANSPORT_CLASSES[type_name](id, brand, model, year, capacity, number)
+        transport.status = status
+        transport._listener = self._on_transport_changed
+        return transport
+
+    @staticmethod
+    def _employee_from_row(row) -> Employee:
+        return Employee(*row)
+
+    @staticmethod
+    def _passenger_from_row(row) -> Passenger:
+        return Passenger(*row)
+
+    @staticmethod
+    def _route_from_row(row) -> Route:
+        return Route(*row)
+
+    def _fetch(self, sql: str, params: Iterable = ()) -> list:
+        return self._conn.execute(sql, tuple(params)).fetchall()
+
+    def _objects_by_ids(self, table: str, columns: str, from_row, ids) -> Dict[int, object]:
+        """Объекты таблицы по множеству ID (запросами не более чем по MAX_PARAMS ID)"""
+        objects = {}
+        for chunk in _chunks(list(ids)):
+            placeholders = ', '.join('?' * len(chunk))
+            for row in self._fetch(f'SELECT {columns} FROM {table} WHERE id IN ({placeholders})', chunk):
+                objects[row[0]] = from_row(row)
+        return objects
+
+    def _trips_from_rows(self, rows) -> List[Trip]:
+        """
+        Рейсы по строкам таблицы trips
+
+        Маршруты, транспорт, водители и пассажиры загружаются общими запросами на всю группу
+        рейсов, одинаковые объекты внутри группы не дублируются.
+        """
+        if not rows:
+            return []
+        routes = self._objects_by_ids('routes', ROUTE_COLUMNS, self._route_from_row, {r[1] for r in rows})
+        transports = self._objects_by_ids('transports', TRANSPORT_COLUMNS, self._transport_from_row,
+                                          {r[2] for r in rows})
+        drivers = self._objects_by_ids('employees', EMPLOYEE_COLUMNS, self._employee_from_row,
+                                       {r[3] for r in rows})
+
+        trips = {}
+        parse_time = datetime.fromisoformat
+        for id, route_id, transport_id, driver_id, departure, arrival, fare in rows:
+            trips[id] = Trip(id, routes[route_id], transports[transport_id], drivers[driver_id],
+                             parse_time(departure), parse_time(arrival), fare)
+
+        passenger_columns = ', '.join(f'p.{c}' for c in PASSENGER_COLUMNS.split(', '))
+        passengers: Dict[int, Passenger] = {}
+        for chunk in _chunks(list(trips)):
+            placeholders = ', '.join('?' * len(chunk))
+            booked = self._fetch(f'SELECT k.trip_id, {passenger_columns} FROM tickets k '
+                                 f'JOIN passengers p ON p.id = k.passenger_id '
+                                 f'WHERE k.trip_id IN ({placeholders}) ORDER BY k.id', chunk)
+            for trip_id, *row in booked:
+                passenger = passengers.get(row[0])
+                if passenger is None:
+                    passenger = passengers[row[0]] = self._passenger_from_row(row)
+                trips[trip_id].add_passenger(passenger)
+        return list(trips.values())
+
+    # Транспорт
+    def add_transport(self, transport: Transport):
+        """Добавление транспорта"""
+        number = transport.line_number if isinstance(transport, Tram) else transport.route_number
+        self._insert('transports', TRANSPORT_COLUMNS, transport,
+                     (transport.id, transport_type(transport), transport.brand, transport.model,
+                      transport.year, transport.capacity, transport.status, number))
+        transport._listener = self._on_transport_changed
+
+    def get_transport(self, transport_id: int) -> Optional[Transport]:
+        """Получение транспорта по ID"""
+        rows = self._fetch(f'SELECT {TRANSPORT_COLUMNS} FROM transports WHERE id = ?', (transport_id,))
+        return self._transport_from_row(rows[0]) if rows else None
+
+    def remove_transport(self, transport_id: int):
+        """Удаление транспорта (транспорт, назначенный на рейсы, удалить нельзя)"""
+        with self.batch():
+            if self._fetch('SELECT 1 FROM trips WHERE transport_id = ? LIMIT 1', (transport_id,)):
+                raise TransportException(f"Транспорт с ID {transport_id} назначен на рейсы")
+            cursor = self._conn.execute('DELETE FROM transports WHERE id = ?', (transport_id,))
+        if cursor.rowcount == 0:
+            raise NotFoundException(f"Транспорт с ID {transport_id} не найден")
+
+    def _on_transport_changed(self, transport: Transport, field: str, old_value):
+        """Сохранение нового значения поля транспорта (status, year или capacity) в базе"""
+        with self.batch():
+            self._conn.execute(f'UPDATE transports SET {field} = ? WHERE id = ?',
+                               (getattr(transport, field), transport.id))
+
+    def get_active_transports(self) -> List[Transport]:
+        """Получение активного транспорта"""
+        rows = self._fetch(f'SELECT {TRANSPORT_COLUMNS} FROM transports WHERE status = ? ORDER BY id',
+                           (Transport.STATUS_ACTIVE,))
+        return [self._transport_from_row(row) for row in rows]
+
+    # Сотрудники
+    def add_employee(self, employee: Employee):
+        """Добавление сотрудника"""
+        self._insert('employees', EMPLOYEE_COLUMNS, employee,
+                     (employee.id, employee.name, employee.phone, employee.position, employee.salary))
+
+    def get_employee(self, employee_id: int) -> Optional[Employee]:
+        """Получение сотрудника по ID"""
+        rows = self._fetch(f'SELECT {EMPLOYEE_COLUMNS} FROM employees WHERE id = ?', (employee_id,))
+        return self._employee_from_row(rows[0]) if rows else None
+
+    def get_drivers(self) -> List[Employee]:
+        """Получение водителей"""
+        # lower() в SQLite меняет регистр только латиницы, поэтому должности отбираются в Python
+        positions = [p for (p,) in self._fetch('SELECT DISTINCT position FROM employees')
+                     if 'водитель' in p.lower()]
+        drivers = []
+        for chunk in _chunks(positions):
+            placeholders = ', '.join('?' * len(chunk))
+            drivers += self._fetch(f'SELECT {EMPLOYEE_COLUMNS} FROM employees WHERE position IN ({placeholders})',
+                                   chunk)
+        return [self._employee_from_row(row) for row in sorted(drivers)]
+
+    # Пассажиры
+    def add_passenger(self, passenger: Passenger):
+        """Добавление пассажира"""
+        self._insert('passengers', PASSENGER_COLUMNS, passenger,
+                     (passenger.id, passenger.name, passenger.phone, passenger.email,
+                      passenger.discount, passenger.category))
+
+    def get_passenger(self, passenger_id: int) -> Optional[Passenger]:
+        """Получение пассажира по ID"""
+        rows = self._fetch(f'SELECT {PASSENGER_COLUMNS} FROM passengers WHERE id = ?', (passenger_id,))
+        return self._passenger_from_row(rows[0]) if rows else None
+
+    # Маршруты
+    def add_route(self, route: Route):
+        """Добавление маршрута"""
+        self._insert('routes', ROUTE_COLUMNS, route,
+                     (route.id, route.number, route.start_point, route.end_point, route.distance))
+
+    def get_route(self, route_id: int) -> Optional[Route]:
+        """Получение маршрута по ID"""
+        rows = self._fetch(f'SELECT {ROUTE_COLUMNS} FROM routes WHERE id = ?', (route_id,))
+        return self._route_from_row(rows[0]) if rows else None
+
+    def get_route_by_number(self, number: str) -> Optional[Route]:
+        """Получение маршрута по номеру (при совпадении номеров - первый добавленный)"""
+        rows = self._fetch(f'SELECT {ROUTE_COLUMNS} FROM routes WHERE number = ? ORDER BY id LIMIT 1', (number,))
+        return self._route_from_row(rows[0]) if rows else None
+
+    # Рейсы
+    def add_trip(self, trip: Trip):
+        """Добавление рейса"""
+        self._insert('trips', TRIP_COLUMNS, trip,
+                     (trip.id, trip.route.id, trip.transport.id, trip.driver.id,
+                      _time_text(trip.departure_time), _time_text(trip.arrival_time), trip.fare))
+
+    def add_trips(self, trips: List[Trip]):
+        """Добавление многих рейсов одной транзакцией"""
+        with self.batch():
+            for trip in trips:
+                self.add_trip(trip)
+
+    def get_trip(self, trip_id: int) -> Optional[Trip]:
+        """Получение рейса по ID"""
+        trips = self._trips_from_rows(self._fetch(f'SELECT {TRIP_COLUMNS} FROM trips WHERE id = ?', (trip_id,)))
+        return trips[0] if trips else None
+
+    def trips_between(self, start: datetime, end: datetime, route_id: Optional[int] = None) -> List[Trip]:
+        """Рейсы с отправлением в интервале [start, end), упорядоченные по времени отправления"""
+        sql = f'SELECT {TRIP_COLUMNS} FROM trips WHERE departure_time >= ? AND departure_time < ?'
+        params = [_time_text(start), _time_text(end)]
+        if route_id is not None:
+            sql += ' AND route_id = ?'
+            params.append(route_id)
+        return self._trips_from_rows(self._fetch(sql + ' ORDER BY departure_time, id', params))
+
+    def upcoming_trips(self, now: datetime, limit: Optional[int] = None,
+                       route_id: Optional[int] = None) -> List[Trip]:
+        """Ближайшие рейсы с отправлением позже now (не более limit)"""
+        sql = f'SELECT {TRIP_COLUMNS} FROM trips WHERE departure_time > ?'
+        params = [_time_text(now)]
+        if route_id is not None:
+            sql += ' AND route_id = ?'
+            params.append(route_id)
+        sql += ' ORDER BY departure_time, id LIMIT ?'
+        params.append(-1 if limit is None else limit)
+        return self._trips_from_rows(self._fetch(sql, params))
+
+    def get_trips_by_date(self, date: datetime.date) -> List[Trip]:
+        """Получение рейсов по дате"""
+        start = datetime.combine(date, datetime.min.time())
+        return self.trips_between(start, start + timedelta(days=1))
+
+    def get_trips_by_route(self, route_id: int) -> List[Trip]:
+        """Получение рейсов по маршруту"""
+        rows = self._fetch(f'SELECT {TRIP_COLUMNS} FROM trips WHERE route_id = ? ORDER BY departure_time, id',
+                           (route_id,))
+        return self._trips_from_rows(rows)
+
+    # Билеты
+    def book_ticket(self, trip_id: int, passenger_id: int) -> float:
+        """Покупка билета: посадка пассажира на рейс. Возвращает стоимость"""
+        with self.batch():
+            trip = self.get_trip(trip_id)
+            if not trip:
+                raise NotFoundException(f"Рейс с ID {trip_id} не найден")
+            passenger = self.get_passenger(passenger_id)
+            if not passenger:
+                raise NotFoundException(f"Пассажир с ID {passenger_id} не найден")
+
+            # Проверки вместимости и повторной покупки - те же, что и у рейса в памяти
+            trip.add_passenger(passenger)
+            price = trip.ticket_price(passenger)
+            self._conn.execute('INSERT INTO tickets (trip_id, passenger_id, price) VALUES (?, ?, ?)',
+                               (trip_id, passenger_id, price))
+        return price
+
+    def cancel_ticket(self, trip_id: int, passenger_id: int):
+        """Возврат билета"""
+        with self.batch():
+            cursor = self._conn.execute('DELETE FROM tickets WHERE trip_id = ? AND passenger_id = ?',
+                                        (trip_id, passenger_id))
+        if cursor.rowcount == 0:
+            raise NotFoundException(f"Билет пассажира {passenger_id} на рейс {trip_id} не найден")
@@ -0,0 +1,375 @@
+"""
+Записи для сохранения данных компании и атомарная запись файлов
+"""
+
+import gc
+import json
+import os
+import secrets
+import stat
+import sys
+from contextlib import contextmanager
+from datetime import datetime
+from itertools import groupby
+from operator import itemgetter
+from typing import Dict, Iterable, Iterator, Tuple
+from models import Transport, Bus, Tram, Trolleybus, Employee, Passenger, Route, Trip
+from exceptions import InvalidDataException
+
+# Порядок секций в файлах: ссылки в рейсах идут на уже загруженные объекты
+SECTIONS = ('transports', 'employees', 'passengers', 'routes', 'trips')
+
+NDJSON_FORMAT = 'transport-company-ndjson'
+NDJSON_VERSION = 1
+
+
+def transport_type(transport: Transport) -> str:
+    """Тип транспорта: bus, tram, trolleybus"""
+    return transport.__class__.__name__.lower()
+
+
+def transport_to_record(t: Transport) -> Dict:
+    return {
+        'id': t.id,
+        'type': transport_type(t),
+        'brand': t.brand,
+        'model': t.model,
+        'year': t.year,
+        'capacity': t.capacity,
+        'status': t.status,
+        'route_number': getattr(t, 'route_number', ''),
+        'line_number': getattr(t, 'line_number', '')
+    }
+
+
+def employee_to_record(e: Employee) -> Dict:
+    return {
+        'id': e.id,
+        'name': e.name,
+        'phone': e.phone,
+        'position': e.position,
+        'salary': e.salary
+    }
+
+
+def passenger_to_record(p: Passenger) -> Dict:
+    return {
+        'id': p.id,
+        'name': p.name,
+        'phone': p.phone,
+        'email': p.email,
+        'discount': p.discount,
+        'category': p.category
+    }
+
+
+def route_to_record(r: Route) -> Dict:
+    return {
+        'id': r.id,
+        'number': r.number,
+        'start_point': r.start_point,
+        'end_point': r.end_point,
+        'distance': r.distance
+    }
+
+
+def trip_to_record(t: Trip) -> Dict:
+    return {
+        'id': t.id,
+        'route_id': t.route.id,
+        'transport_id': t.transport.id,
+        'driver_id': t.driver.id,
+        'departure_time': t.departure_time.isoformat(),
+        'arrival_time': t.arrival_time.isoformat(),
+        'fare': t.fare,
+        'passengers': t.get_passenger_ids()
+    }
+
+
+RECORD_BUILDERS = {
+    'transports': transport_to_record,
+    'employees': employee_to_record,
+    'passengers': passenger_to_record,
+    'routes': route_to_record,
+    'trips': trip_to_record,
+}
+
+
+def iter_section(company, section: str) -> Iterator[Dict]:
+    """Записи секции, создаваемые по одной прямо из объектов компании"""
+    to_record = RECORD_BUILDERS[section]
+    return (to_record(obj) for obj in getattr(company, section))
+
+
+TRANSPORT_CLASSES = {'bus': Bus, 'tram': Tram, 'trolleybus': Trolleybus}
+
+
+class BulkLoader:
+    """
+    Быстрая загрузка записей в объекты модели
+
+    Объекты создаются без конструкторов: правила проверки те же, что в models.py,
+    но константы (например, допустимый год выпуска) вычисляются один раз на загрузку.
+    Ссылки рейсов на маршруты, транспорт, водителей и пассажиров проверяются,
+    пассажиры рейса добавляются одним вызовом Trip.add_passengers.
+    """
+
+    def __init__(self):
+        self.transports: Dict[int, Transport] = {}
+        self.employees: Dict[int, Employee] = {}
+        self.passengers: Dict[int, Passenger] = {}
+        self.routes: Dict[int, Route] = {}
+        self.trips: Dict[int, Trip] = {}
+        self._max_year = datetime.now().year + 1
+
+    def load_section(self, section: str, records: Iterable[Dict]):
+        """Загрузка записей одной секции"""
+        if section not in SECTIONS:
+            raise InvalidDataException(f"Неизвестная секция: {section}")
+        getattr(self, f'_load_{section}')(records)
+
+    def _load_transports(self, records: Iterable[Dict]):
+        new, intern, max_year = object.__new__, sys.intern, self._max_year
+        transports = self.transports
+        for r in records:
+            cls = TRANSPORT_CLASSES.get(r['type'], Tram)
+            brand, model, year, capacity = r['brand'], r['model'], r['year'], r['capacity']
+            if not brand:
+                raise InvalidDataException("Марка не может быть пустой")
+            if not model:
+                raise InvalidDataException("Модель не может быть пустой")
+            if year < 1900 or year > max_year:
+                raise InvalidDataException("Некорректный год выпуска")
+            if capacity <= 0:
+                raise InvalidDataException("Вместимость должна быть положительной")
+
+            t = new(cls)
+            t.id = r['id']
+            t.brand = intern(brand)
+            t.model = intern(model)
+            t._year = year
+            t._capacity = capacity
+            t._status = intern(r.get('status', Transport.STATUS_ACTIVE))
+            t._listener = None
+            if cls is Tram:
+                t.line_number = r.get('line_number', '')
+            else:
+                t.route_number = r.get('route_number', '')
+            transports[t.id] = t
+
+    def _load_employees(self, records: Iterable[Dict]):
+        new, intern = object.__new__, sys.intern
+        employees = self.employees
+        for r in records:
+            name, phone, position, salary = r['name'], r['phone'], r['position'], r['salary']
+            if not name or not name.strip():
+                raise InvalidDataException("Имя не может быть пустым")
+            if not phone:
+                raise InvalidDataException("Телефон не может быть пустым")
+            if not position:
+                raise InvalidDataException("Должность не может быть пустой")
+            if salary <= 0:
+                raise InvalidDataException("Зарплата должна быть положительной")
+
+            e = new(Employee)
+            e.id = r['id']
+            e.name = name
+            e.phone = phone
+            e.position = intern(position)
+            e.salary = salary
+            employees[e.id] = e
+
+    def _load_passengers(self, records: Iterable[Dict]):
+        new, intern = object.__new__, sys.intern
+        passengers = self.passengers
+        for r in records:
+            name, phone, discount = r['name'], r['phone'], r['discount']
+            if not name or not name.strip():
+                raise InvalidDataException("Имя не может быть пустым")
+            if not phone:
+                raise InvalidDataException("Телефон не может быть пустым")
+            if discount < 0 or discount > 100:
+                raise InvalidDataException("Скидка должна быть от 0 до 100")
+
+            p = new(Passenger)
+            p.id = r['id']
+            p.name = name
+            p.phone = phone
+            p.email = r.get('email', '')
+            p._discount = discount
+            p._category = intern(r.get('category', 'взрослый'))
+            passengers[p.id] = p
+
+    def _load_routes(self, records: Iterable[Dict]):
+        new = object.__new__
+        routes = self.routes
+        for r in records:
+            number, start_point, end_point, distance = r['number'], r['start_point'], r['end_point'], r['distance']
+            if not number:
+                raise InvalidDataException("Номер маршрута не может быть пустым")
+            if not start_point or not end_point:
+                raise InvalidDataException("Начальная и конечная точки должны быть указаны")
+            if distance <= 0:
+                raise InvalidDataException("Расстояние должно быть положительным")
+
+            route = new(Route)
+            route.id = r['id']
+            route.number = number
+            route.start_point = start_point
+            route.end_point = end_point
+            route.distance = distance
+            routes[route.id] = route
+
+    def _load_trips(self, records: Iterable[Dict]):
+        new, parse_time = object.__new__, datetime.fromisoformat
+        routes, transports, employees, passengers = self.routes, self.transports, self.employees, self.passengers
+        trips = self.trips
+        for r in records:
+            try:
+                route = routes[r['route_id']]
+                transport = transports[r['transport_id']]
+                driver = employees[r['driver_id']]
+                trip_passengers = [passengers[p_id] for p_id in r['passengers']]
+            except KeyError as e:
+                raise InvalidDataException(f"Рейс {r['id']} ссылается на несуществующий объект с ID {e}")
+
+            departure, arrival, fare = parse_time(r['departure_time']), parse_time(r['arrival_time']), r['fare']
+            if departure >= arrival:
+                raise InvalidDataException("Время отправления должно быть раньше времени прибытия")
+            if fare < 0:
+                raise InvalidDataException("Стоимость проезда не может быть отрицательной")
+
+            trip = new(Trip)
+            trip.id = r['id']
+            trip.route = route
+            trip.transport = transport
+            trip.driver = driver
+            trip.departure_time = departure
+            trip.arrival_time = arrival
+            trip._fare = fare
+            trip._passengers = {}
+            trip._revenue = 0.0
+            trip._category_counts = {}
+            trip._version = 0
+            if trip_passengers:
+                trip.add_passengers(trip_passengers)
+            trips[trip.id] = trip
+
+    def next_ids(self) -> Dict[str, int]:
+        """Счетчики ID, следующие за максимальными загруженными ID"""
+        return {section[:-1]: max(getattr(self, section), default=0) + 1 for section in SECTIONS}
+
+    def install(self, company, name: str, next_id: Dict[str, int]):
+        """Замена данных компании загруженными объектами"""
+        company._replace_contents(
+            name,
+            list(self.transports.values()),
+            list(self.employees.values()),
+            list(self.passengers.values()),
+            list(self.routes.values()),
+            list(self.trips.values()),
+            next_id
+        )
+
+
+def read_ndjson(f) -> Tuple[Dict, Iterator[Tuple[str, Iterator[Dict]]]]:
+    """
+    Потоковое чтение NDJSON
+
+    Returns:
+        tuple: заголовок и итератор пар (секция, итератор записей секции)
+    """
+    loads = json.loads
+    header = loads(f.readline())
+    if header.get('format') != NDJSON_FORMAT:
+        raise InvalidDataException("Файл не является сохранением транспортной компании")
+    if header.get('version', 0) > NDJSON_VERSION:
+        raise InvalidDataException(f"Неподдерживаемая версия формата: {header['version']}")
+
+    def tagged_records():
+        section = None
+        for line in f:
+            record = loads(line)
+            if 'section' in record and len(record) == 1:
+                section = record['section']
+                continue
+            yield section, record
+
+    return header, group_sections(tagged_records())
+
+
+def group_sections(tagged_records: Iterable[Tuple[str, Dict]]) -> Iterator[Tuple[str, Iterator[Dict]]]:
+    """Пары (секция, запись) -> пары (секция, итератор записей секции) без накопления в памяти"""
+    return ((section, map(itemgetter(1), group))
+            for section, group in groupby(tagged_records, key=itemgetter(0)))
+
+
+@contextmanager
+def paused_gc():
+    """
+    Отключение циклического сборщика мусора на время массового создания объектов
+
+    Загружаемые объекты живут дольше загрузки, поэтому полные проходы сборщика,
+    которые запускаются по ходу создания миллионов объектов, не освобождают память.
+    """
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if enabled:
+            gc.enable()
+
+
+def _create_temp_file(directory: str) -> Tuple[int, str]:
+    """
+    Создание временного файла в каталоге directory
+
+    В отличие от tempfile.mkstemp (права 0600) права задаются как при open:
+    0666 с учетом umask, который применяет сама система.
+    """
+    flags = os.O_WRONLY | os.O_CREAT | os.O_EXCL | getattr(os, 'O_BINARY', 0)
+    while True:
+        temp_name = os.path.join(directory, f'.tmp-{secrets.token_hex(8)}')
+        try:
+            return os.open(temp_name, flags, 0o666), temp_name
+        except FileExistsError:
+            continue
+
+
+def _fsync_directory(directory: str):
+    """Сброс на диск записи каталога, чтобы переименование пережило сбой питания"""
+    if os.name == 'nt':
+        return  # На Windows каталог нельзя открыть через os.open
+    fd = os.open(directory, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+@contextmanager
+def atomic_write(filename: str, mode: str = 'w', encoding: str = 'utf-8'):
+    """
+    Запись во временный файл рядом с целевым и атомарное переименование
+
+    При ошибке целевой файл остается нетронутым, временный удаляется. Новый файл
+    получает права по umask, перезаписанный сохраняет права прежнего.
+    """
+    directory = os.path.dirname(os.path.abspath(filename))
+    fd, temp_name = _create_temp_file(directory)
+    try:
+        with open(fd, mode, encoding=None if 'b' in mode else encoding) as f:
+            yield f
+            f.flush()
+            os.fsync(f.fileno())
+        try:
+            os.chmod(temp_name, stat.S_IMODE(os.stat(filename).st_mode))
+        except FileNotFoundError:
+            pass
+        os.replace(temp_name, filename)
+    except BaseException:
+        if os.path.exists(temp_name):
+            os.unlink(temp_name)
+        raise
+    _fsync_directory(directory)
@@ -0,0 +1,123 @@
+"""
+Unit-тесты для потокобезопасной продажи билетов
+"""
+
+import unittest
+import sys
+import os
+import tempfile
+import threading
+import time
+from unittest import mock
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+import journal
+from booking import BookingEngine
+from models import Bus, Passenger, Trip
+from exceptions import TransportException, NotFoundException
+from test_transport_company import make_company
+
+
+class TestBookingEngine(unittest.TestCase):
+    """Тесты BookingEngine"""
+
+    def setUp(self):
+        """Подготовка перед каждым тестом: рейс на 10 мест и 200 пассажиров"""
+        self.company = make_company()
+        self.company.add_transport(Bus(0, "ПАЗ", "3205", 2015, 10, "21"))
+        departure = datetime(2030, 2, 1, 9, 0)
+        self.trip = Trip(0, self.company.get_route(1), self.company.get_transport(4), self.company.get_employee(1),
+                         departure, departure + timedelta(hours=1), 40)
+        self.company.add_trip(self.trip)
+        for i in range(200):
+            self.company.add_passenger(Passenger(0, f"Пассажир {i}", f"+7900{i:07d}", "", 50 * (i % 2)))
+        self.engine = BookingEngine(self.company)
+
+        switch_interval = sys.getswitchinterval()
+        sys.setswitchinterval(1e-6)
+        self.addCleanup(sys.setswitchinterval, switch_interval)
+
+    def run_threads(self, action, items, threads=32):
+        """Выполнение action для каждого элемента в threads потоках. Возвращает число успешных"""
+        def worker(part):
+            done = 0
+            for item in part:
+                try:
+                    action(*item)
+                    done += 1
+                except TransportException:
+                    pass
+            return done
+
+        with ThreadPoolExecutor(threads) as pool:
+            return sum(pool.map(worker, [items[i::threads] for i in range(threads)]))
+
+    def test_no_overbooking(self):
+        """Тест 1: 32 потока не продают больше мест, чем есть"""
+        trip_id = self.trip.id
+        booked = self.run_threads(self.engine.book, [(trip_id, p.id) for p in self.company.passengers])
+
+        self.assertEqual(booked, 10)
+        self.assertEqual(self.trip.get_passenger_count(), 10)
+        self.assertEqual(len(self.company.ledger), 10)
+        self.assertEqual(self.trip.get_total_revenue(),
+                         sum(self.trip.ticket_price(p) for p in self.trip.passengers))
+
+    def test_book_and_cancel(self):
+        """Тест 2: Одновременные продажи и возвраты на разные рейсы сохраняют журнал согласованным"""
+        requests = [(trip.id, p.id) for trip in self.company.trips[:4] for p in self.company.passengers[:60]]
+        booked = self.run_threads(self.engine.book, requests)
+        cancelled = self.run_threads(self.engine.cancel, requests[::3])
+
+        seated = sum(trip.get_passenger_count() for trip in self.company.trips)
+        self.assertEqual(seated, booked - cancelled)
+        self.assertEqual(len(self.company.ledger), seated)
+        self.assertEqual(sorted(zip(self.company.ledger.trip_ids, self.company.ledger.passenger_ids)),
+                         sorted((trip.id, p_id) for trip in self.company.trips for p_id in trip.get_passenger_ids()))
+
+        with self.assertRaises(NotFoundException):
+            self.engine.cancel(self.trip.id, 1)
+        with self.assertRaises(NotFoundException):
+            self.engine.book(100, 1)
+
+    def test_fsync_outside_locks(self):
+        """Тест 3: Пока один поток ждет fsync журнала изменений, другие потоки продают билеты"""
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.company.journal = journal.Journal(os.path.join(tmp.name, "company.journal"), group_size=1)
+        self.addCleanup(self.company.journal.close)
+
+        in_fsync, release = threading.Event(), threading.Event()
+        self.addCleanup(release.set)
+        real_fsync = os.fsync
+
+        def slow_fsync(fd):
+            if not release.is_set():
+                in_fsync.set()
+                release.wait(30)
+            real_fsync(fd)
+
+        with mock.patch('journal.os.fsync', slow_fsync):
+            first = threading.Thread(target=self.engine.book, args=(self.trip.id, 1))
+            first.start()
+            self.assertTrue(in_fsync.wait(5))
+
+            # Билет на другой рейс учитывается, хотя первый поток еще ждет fsync
+            second = threading.Thread(target=self.engine.book, args=(1, 2))
+            second.start()
+            for _ in range(500):
+                if len(self.company.ledger) == 2:
+                    break
+                time.sleep(0.01)
+            self.assertEqual(len(self.company.ledger), 2)
+
+            release.set()
+            first.join()
+            second.join()
+
+        self.assertEqual(sorted(journal.read_journal(self.company.journal.filename)[1]),
+                         [['book', 1, 2], ['book', self.trip.id, 1]])
+
+
+if __name__ == '__main__':
+    unittest.main()
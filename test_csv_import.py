@@ -0,0 +1,110 @@
+"""
+Unit-тесты для импорта из CSV
+"""
+
+import unittest
+import tempfile
+import os
+import csv
+from datetime import datetime
+from csv_import import import_csv
+from models import Transport
+from exceptions import InvalidDataException, FileOperationException
+from test_transport_company import make_company
+
+
+class TestCsvImport(unittest.TestCase):
+    """Тесты import_csv"""
+
+    def setUp(self):
+        """Подготовка перед каждым тестом"""
+        self.company = make_company()
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.rejected = self.path("rejected.csv")
+
+    def path(self, name):
+        return os.path.join(self.tmp.name, name)
+
+    def write(self, name, text):
+        filename = self.path(name)
+        with open(filename, 'w', encoding='utf-8-sig', newline='') as f:
+            f.write(text)
+        return filename
+
+    def read_rejected(self):
+        with open(self.rejected, encoding='utf-8', newline='') as f:
+            return list(csv.reader(f))
+
+    def test_passengers(self):
+        """Тест 1: Правильные строки добавляются порциями, неправильные попадают в отчет"""
+        filename = self.write("passengers.csv",
+                              "name,phone,email,discount,category\n"
+                              "Новиков Илья,+79994444444,,,\n"
+                              ",+79995555555,,,\n"
+                              "Орлова Вера,+79996666666,vera@example.com,50,студент\n"
+                              "Зайцев Петр,+79997777777,,150,\n"
+                              "Белова Ольга,+79998888888,,много,\n"
+                              "Ершов Иван,+79999999999,,100,пенсионер\n")
+        result = import_csv(self.company, 'passengers', filename, self.rejected, batch_size=2)
+        self.assertEqual((result.imported, result.rejected), (3, 3))
+
+        self.assertEqual([p.id for p in self.company.passengers], [1, 2, 3, 4, 5, 6])
+        self.assertEqual(self.company.get_passenger(5).category, "студент")
+        self.assertEqual(self.company.get_passenger(6).discount, 100)
+        self.assertEqual(self.company.get_passenger(4).category, "взрослый")
+
+        rows = self.read_rejected()
+        self.assertEqual(rows[0], ["name", "phone", "email", "discount", "category", "line", "error"])
+        self.assertEqual([(row[0], row[5]) for row in rows[1:]], [("", "3"), ("Зайцев Петр", "5"), ("Белова Ольга", "6")])
+        self.assertEqual(rows[1][6], "Имя не может быть пустым")
+        self.assertEqual(rows[2][6], "Скидка должна быть от 0 до 100")
+
+    def test_fleet_and_trips(self):
+        """Тест 2: Транспорт и рейсы попадают в индексы, ссылки рейсов проверяются"""
+        filename = self.write("transports.csv",
+                              "type,brand,model,year,capacity,status,route_number,line_number\n"
+                              "bus,ПАЗ,3205,2015,40,,21,\n"
+                              "tram,71-931,Витязь,2019,250,В ремонте,,5\n"
+                              "ship,Волга,1,2015,40,,,\n"
+                              "bus,ЛиАЗ,5292,1850,100,,,\n"
+                              "bus,ЛиАЗ,5292,2020,100,Угнан,,\n")
+        result = import_csv(self.company, 'transports', filename, self.rejected)
+        self.assertEqual((result.imported, result.rejected), (2, 3))
+        self.assertEqual(self.company.get_transport(5).line_number, "5")
+        self.assertEqual([t.id for t in self.company.get_active_transports()], [1, 2, 3, 4])
+        self.assertEqual([row[-1] for row in self.read_rejected()[1:]],
+                         ["Неизвестный тип транспорта: ship", "Некорректный год выпуска", "Неизвестный статус: Угнан"])
+
+        filename = self.write("trips.csv",
+                              "route_id,transport_id,driver_id,departure_time,arrival_time,fare\n"
+                              "1,4,1,2030-02-01T09:00,2030-02-01T10:00,40\n"
+                              "7,4,1,2030-02-01T11:00,2030-02-01T12:00,40\n"
+                              "2,5,2,2030-02-01T12:00,2030-02-01T11:00,40\n"
+                              "2,5,2,2030-02-01 06:30,2030-02-01 07:00,35.5\n")
+        result = import_csv(self.company, 'trips', filename, self.rejected)
+        self.assertEqual((result.imported, result.rejected), (2, 2))
+        self.assertEqual([t.id for t in self.company.get_trips_by_date(datetime(2030, 2, 1).date())], [6, 5])
+        self.assertEqual(self.company.get_trip(6).fare, 35.5)
+        self.assertEqual([row[-1] for row in self.read_rejected()[1:]],
+                         ["Маршрут с ID 7 не найден", "Время отправления должно быть раньше времени прибытия"])
+
+        self.company.get_transport(4).status = Transport.STATUS_REPAIR
+        self.assertEqual([t.id for t in self.company.get_active_transports()], [1, 2, 3])
+
+    def test_file_errors(self):
+        """Тест 3: Файл без нужных столбцов или недоступный файл - ошибка до импорта"""
+        filename = self.write("employees.csv", "name;phone;position;salary\nИванов;+7999;Водитель;1\n")
+        with self.assertRaises(InvalidDataException):
+            import_csv(self.company, 'employees', filename)
+        result = import_csv(self.company, 'employees', filename, delimiter=';')
+        self.assertEqual((result.imported, self.company.employees[-1].id), (1, 4))
+
+        with self.assertRaises(InvalidDataException):
+            import_csv(self.company, 'tickets', filename)
+        with self.assertRaises(FileOperationException):
+            import_csv(self.company, 'employees', self.path("missing.csv"))
+
+
+if __name__ == '__main__':
+    unittest.main()
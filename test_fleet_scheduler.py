@@ -0,0 +1,109 @@
+"""
+Unit-тесты для назначения транспорта и водителей
+"""
+
+import unittest
+from datetime import datetime, timedelta
+from fleet_scheduler import FleetScheduler
+from transport_company import TransportCompany
+from models import Transport, Bus, Employee, Passenger, Route, Trip
+
+
+class TestFleetScheduler(unittest.TestCase):
+    """Тесты FleetScheduler"""
+
+    def setUp(self):
+        """Подготовка перед каждым тестом: автобусы на 30, 50, 50 и 100 мест и автобус в ремонте"""
+        self.company = TransportCompany("Тестовый автопарк")
+        for capacity in (30, 50, 50, 100, 200):
+            self.company.add_transport(Bus(0, "ЛиАЗ", "5292", 2020, capacity, "1"))
+        self.company.get_transport(5).status = Transport.STATUS_REPAIR
+        for i in range(3):
+            self.company.add_employee(Employee(0, f"Водитель {i}", f"+7999000000{i}", "Водитель", 60000))
+        self.company.add_employee(Employee(0, "Диспетчер", "+79990000009", "Диспетчер", 50000))
+        self.company.add_route(Route(0, "1", "Вокзал", "Депо", 10))
+        self.day = datetime(2030, 3, 1)
+
+    def add_trips(self, *times):
+        """Рейсы с интервалами "ЧЧ:ММ-ЧЧ:ММ", изначально на первом автобусе и водителе"""
+        trips = []
+        for interval in times:
+            start, end = (self.day + timedelta(hours=int(t[:2]), minutes=int(t[3:])) for t in interval.split('-'))
+            trips.append(Trip(0, self.company.get_route(1), self.company.get_transport(1),
+                              self.company.get_employee(1), start, end, 30))
+        self.company.add_trips(trips)
+        return trips
+
+    def test_vehicles(self):
+        """Тест 1: Наименьшее число машин с учетом оборота и вместимости"""
+        trips = self.add_trips("08:00-09:00", "08:30-09:30", "09:05-10:00")
+        plan = FleetScheduler(self.company, turnaround=timedelta(minutes=10)).plan(trips)
+        self.assertEqual((plan.vehicle_count, plan.unassigned), (3, []))
+
+        plan = FleetScheduler(self.company, turnaround=timedelta(minutes=5)).plan(trips, min_seats=40)
+        self.assertEqual([plan.vehicles[t.id].id for t in trips], [2, 3, 2])
+
+        # Только автобус на 100 мест: перекрывающийся рейс остается без машины
+        plan = FleetScheduler(self.company, turnaround=timedelta(minutes=5)).plan(trips, min_seats=60)
+        self.assertEqual([plan.vehicles[t.id].id for t in (trips[0], trips[2])], [4, 4])
+        self.assertEqual(plan.unassigned, [trips[1]])
+        self.assertNotIn(trips[1].id, plan.drivers)
+
+    def test_driver_shifts(self):
+        """Тест 2: Водители с ограничением длины смены"""
+        trips = self.add_trips("06:00-07:00", "07:10-08:10", "08:20-09:20", "09:30-10:30",
+                               "10:40-11:40", "11:50-12:50", "13:00-14:00")
+        plan = FleetScheduler(self.company).plan(trips)
+        self.assertEqual((plan.vehicle_count, plan.driver_count), (1, 1))
+
+        plan = FleetScheduler(self.company, max_shift=timedelta(hours=2, minutes=30)).plan(trips)
+        self.assertEqual([plan.drivers[t.id].id for t in trips[:6]], [1, 1, 2, 2, 3, 3])
+        self.assertEqual(plan.unassigned, [trips[6]])
+
+    def test_apply(self):
+        """Тест 3: Назначение записывается в рейсы и индексы накладок"""
+        trips = self.add_trips("08:00-09:00", "08:30-09:30", "09:05-10:00", "09:40-10:30")
+        self.assertEqual(len(self.company.schedule_conflicts()), 6)
+
+        scheduler = FleetScheduler(self.company, turnaround=timedelta(minutes=5))
+        scheduler.apply(scheduler.plan(trips))
+        self.assertEqual([(t.transport.id, t.driver.id) for t in trips], [(1, 1), (2, 2), (1, 1), (2, 2)])
+        self.assertEqual(self.company.schedule_conflicts(), [])
+        self.assertEqual(self.company.find_trip_conflicts(trips[0]), [])
+
+    def test_unassigned_trip_keeps_driver_free(self):
+        """Тест 4: Рейс без машины не занимает водителя"""
+        company = TransportCompany("Маленький автопарк")
+        company.add_transports([Bus(0, "ЛиАЗ", "5292", 2020, 50, "1"), Bus(0, "ГАЗ", "Газель", 2020, 5, "1")])
+        company.add_employees([Employee(0, f"Водитель {i}", f"+7999000000{i}", "Водитель", 60000) for i in range(2)])
+        company.add_passengers([Passenger(0, f"Пассажир {i}", f"+7998000{i:04d}") for i in range(10)])
+        company.add_route(Route(0, "1", "Вокзал", "Депо", 10))
+        trips = []
+        for start, end, riders in ((8, 10, 10), (8, 10, 10), (9, 11, 0)):
+            trip = Trip(0, company.get_route(1), company.get_transport(1), company.get_employee(1),
+                        self.day + timedelta(hours=start), self.day + timedelta(hours=end), 30)
+            trip.add_passengers(company.passengers[:riders])
+            trips.append(trip)
+        company.add_trips(trips)
+
+        plan = FleetScheduler(company).plan(trips)
+        self.assertEqual([t.id for t in plan.unassigned], [2])
+        self.assertEqual((plan.vehicles[3].id, plan.drivers[3].id), (2, 2))
+
+    def test_trips_outside_plan(self):
+        """Тест 5: Рейс вне плана (ночной рейс прошлого дня) оставляет свои машину и водителя занятыми"""
+        night = Trip(0, self.company.get_route(1), self.company.get_transport(1), self.company.get_employee(1),
+                     self.day - timedelta(minutes=30), self.day + timedelta(minutes=30), 30)
+        self.company.add_trip(night)
+        trips = self.add_trips("00:20-01:00", "02:00-03:00")
+
+        scheduler = FleetScheduler(self.company)
+        plan = scheduler.plan(trips)
+        self.assertEqual([(plan.vehicles[t.id].id, plan.drivers[t.id].id) for t in trips], [(2, 2), (2, 2)])
+        scheduler.apply(plan)
+        self.assertEqual(self.company.schedule_conflicts(), [])
+        self.assertEqual((night.transport.id, night.driver.id), (1, 1))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,119 @@
+"""
+Unit-тесты для HTTP-сервиса
+"""
+
+import unittest
+import asyncio
+import json
+from unittest import mock
+from http_service import TransportService
+from load_generator import encode_request, read_response
+from test_transport_company import make_company
+
+
+class TestTransportService(unittest.IsolatedAsyncioTestCase):
+    """Тесты HTTP-сервиса"""
+
+    async def asyncSetUp(self):
+        """Запуск сервиса на свободном порту"""
+        self.company = make_company()
+        self.server = await TransportService(self.company, max_concurrency=2).start('127.0.0.1', 0)
+        port = self.server.sockets[0].getsockname()[1]
+        self.reader, self.writer = await asyncio.open_connection('127.0.0.1', port)
+
+    async def asyncTearDown(self):
+        self.writer.close()
+        self.server.close()
+        await self.server.wait_closed()
+
+    async def read_json(self):
+        """Код и JSON следующего ответа"""
+        head = await self.reader.readuntil(b'\r\n\r\n')
+        lines = head.decode('latin-1').split('\r\n')
+        headers = dict(line.split(': ', 1) for line in lines[1:] if line)
+        body = await self.reader.readexactly(int(headers['Content-Length']))
+        return int(lines[0].split(' ')[1]), json.loads(body)
+
+    async def test_pipelined_requests(self):
+        """Тест 1: Конвейерные запросы в одном соединении - ответы по порядку"""
+        self.writer.write(b''.join([
+            encode_request('GET', '/trips/1', b'', 'localhost'),
+            encode_request('POST', '/trips/1/tickets', b'{"passenger_id": 2}', 'localhost'),
+            encode_request('GET', '/trips/1', b'', 'localhost'),
+            encode_request('GET', '/trips?from=2030-01-15T09:00:00&to=2030-01-15T18:00:00&route_id=2', b'',
+                           'localhost'),
+        ]))
+        status, trip = await self.read_json()
+        self.assertEqual((status, trip['id'], trip['free_seats']), (200, 1, 100))
+        self.assertEqual(await self.read_json(), (201, {'trip_id': 1, 'passenger_id': 2, 'price': 25.0}))
+        status, trip = await self.read_json()
+        self.assertEqual(trip['free_seats'], 99)
+        status, trips = await self.read_json()
+        self.assertEqual([t['id'] for t in trips], [2, 4])
+
+        # Соединение остается открытым для следующих запросов
+        self.writer.write(encode_request('GET', '/routes?number=3', b'', 'localhost'))
+        status, routes = await self.read_json()
+        self.assertEqual([r['end_point'] for r in routes], ["Депо"])
+        self.assertEqual(self.company.get_trip(1).get_passenger_ids(), [2])
+
+    async def test_errors(self):
+        """Тест 2: Ошибки запросов"""
+        cases = [
+            (('GET', '/trips/100', b''), 404),
+            (('GET', '/trips/abc', b''), 400),
+            (('POST', '/trips/1/tickets', b'not json'), 400),
+            (('POST', '/trips/1/tickets', b'{"passenger_id": 999}'), 404),
+            (('DELETE', '/trips/1/tickets/1', b''), 404),
+            (('PUT', '/transports/1', b''), 405),
+            (('GET', '/unknown', b''), 404),
+            (('GET', '/transports?limit=-1', b''), 400),
+            (('GET', '/routes?offset=-5', b''), 400),
+        ]
+        self.writer.write(b''.join(encode_request(*request, 'localhost') for request, _ in cases))
+        for request, expected in cases:
+            with self.subTest(request=request[:2]):
+                status, payload = await self.read_json()
+                self.assertEqual(status, expected)
+                self.assertIn('error', payload)
+
+        self.company.book_ticket(1, 1)
+        self.writer.write(encode_request('POST', '/trips/1/tickets', b'{"passenger_id": 1}', 'localhost'))
+        self.assertEqual((await self.read_json())[0], 409)
+
+    async def test_connection_close(self):
+        """Тест 3: Connection: close закрывает соединение после ответа"""
+        self.writer.write(b"GET /company HTTP/1.1\r\nConnection: close\r\n\r\n")
+        status = await read_response(self.reader)
+        self.assertEqual(status, 200)
+        self.assertEqual(await self.reader.read(), b'')
+
+    async def test_idle_connections(self):
+        """Тест 4: Простаивающие соединения не занимают места max_concurrency и закрываются по idle_timeout"""
+        server = await TransportService(self.company, max_concurrency=2, idle_timeout=0.3).start('127.0.0.1', 0)
+        self.addCleanup(server.close)
+        port = server.sockets[0].getsockname()[1]
+        idle = [await asyncio.open_connection('127.0.0.1', port) for _ in range(3)]
+        for _, writer in idle:
+            self.addCleanup(writer.close)
+
+        reader, writer = await asyncio.open_connection('127.0.0.1', port)
+        self.addCleanup(writer.close)
+        writer.write(encode_request('GET', '/company', b'', 'localhost'))
+        self.assertEqual(await asyncio.wait_for(read_response(reader), 5), 200)
+
+        for idle_reader, _ in idle:
+            self.assertEqual(await asyncio.wait_for(idle_reader.read(), 5), b'')
+
+    async def test_internal_error(self):
+        """Тест 5: Внутренняя ошибка записывается в журнал сервера, клиенту - общее сообщение"""
+        with mock.patch.object(self.company, 'get_trip', side_effect=RuntimeError("секретные подробности")):
+            with self.assertLogs('http_service', 'ERROR') as logs:
+                self.writer.write(encode_request('GET', '/trips/1', b'', 'localhost'))
+                status, payload = await self.read_json()
+        self.assertEqual((status, payload), (500, {'error': "Внутренняя ошибка сервера"}))
+        self.assertIn("секретные подробности", logs.output[0])
+
+
+if __name__ == '__main__':
+    unittest.main()
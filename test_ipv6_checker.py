@@ -130,6 +130,28 @@ class TestIPv6Checker(unittest.TestCase):
             # Проверяем, что результат сокращен
             self.assertLessEqual(len(normalized), len(original))
 
+    def test_is_valid_many(self):
+        """Тест 7: Пакетная проверка совпадает с поэлементной"""
+        candidates = [
+            "2001:db8::1", "fe80::1%eth0", "::1", "abcd", "abcde", "192.168.1.1",
+            "gggg:db8::1", "  2001:db8::1  ", "", "   ", None, 42, "not an ip",
+            "2001:0db8:85a3:0000:0000:8a2e:0370:7334", "::ffff:192.0.2.128",
+            "ab%eth0", "1:2:3:4:5:6:7:8:9:10:11:12:13:14:15:16:17:18:19:20:21:22:23:24",
+            "2001:db8::1\u3000", "фыв", "fe80::1%", "2001:db8:::1",
+            # Не-ASCII символы: пробелы по краям, буквы зоны, буквы вне зоны
+            "\xa0abc\xa0", "\u3000ab.c", "fe80::1%\u212a", "::1ф", "Иванов Иван", "ф1",
+        ]
+
+        expected = [self.checker.is_valid_ipv6(item) for item in candidates]
+        self.assertEqual(list(self.checker.is_valid_many(candidates)), expected)
+        self.assertEqual(list(self.checker.is_valid_many(iter(candidates))), expected)
+        self.assertEqual(len(self.checker.is_valid_many([])), 0)
+
+        # Строки с '\0' внутри и пустые строки в конце
+        tricky = ["::1\0", "::1", "", "abcd", ""]
+        expected = [self.checker.is_valid_ipv6(item) for item in tricky]
+        self.assertEqual(list(self.checker.is_valid_many(tricky)), expected)
+
 
 def run_tests():
     """Функция для запуска тестов"""
@@ -0,0 +1,156 @@
+"""
+Unit-тесты для журнала изменений
+"""
+
+import unittest
+import tempfile
+import os
+import time
+from datetime import datetime, timedelta
+import journal
+from transport_company import TransportCompany
+from models import Transport, Bus, Passenger, Trip
+from exceptions import InvalidDataException
+from test_transport_company import make_company, fill_company
+
+
+class TestJournal(unittest.TestCase):
+    """Тесты журнала изменений"""
+
+    def setUp(self):
+        """Подготовка перед каждым тестом"""
+        self.tmp = tempfile.TemporaryDirectory()
+        self.snapshot = os.path.join(self.tmp.name, "company.snap")
+        self.journal = os.path.join(self.tmp.name, "company.journal")
+
+    def tearDown(self):
+        """Очистка после каждого теста"""
+        self.tmp.cleanup()
+
+    def recover(self, **options):
+        company = TransportCompany("")
+        j = journal.recover(company, self.snapshot, self.journal, **options)
+        self.addCleanup(j.close)
+        return company, j
+
+    def assertSameState(self, restored, original):
+        self.assertEqual(restored.name, original.name)
+        self.assertEqual(restored._next_id, original._next_id)
+        self.assertEqual([t.id for t in restored.transports], [t.id for t in original.transports])
+        self.assertEqual([t.status for t in restored.transports], [t.status for t in original.transports])
+        self.assertEqual([p.id for p in restored.passengers], [p.id for p in original.passengers])
+        self.assertEqual([t.get_passenger_ids() for t in restored.trips],
+                         [t.get_passenger_ids() for t in original.trips])
+        self.assertEqual([(t.transport.id, t.driver.id) for t in restored.trips],
+                         [(t.transport.id, t.driver.id) for t in original.trips])
+        self.assertEqual(restored.ledger.revenue_by_route(), original.ledger.revenue_by_route())
+
+    def mutate(self, company):
+        """Изменения всех видов, которые записываются в журнал"""
+        company.add_passenger(Passenger(0, "Новиков Илья", "+79994444444", "", 50, "студент"))
+        departure = datetime(2030, 1, 16, 9, 0)
+        company.add_trip(Trip(0, company.get_route(1), company.get_transport(3), company.get_employee(1),
+                              departure, departure + timedelta(hours=1), 60))
+        company.book_ticket(1, 1)
+        company.book_ticket(1, 2)
+        company.book_ticket(5, 4)
+        company.cancel_ticket(1, 1)
+        company.reassign_trip(2, 1, 1)
+        company.get_transport(2).status = Transport.STATUS_REPAIR
+        company.add_transport(Bus(0, "ПАЗ", "3205", 2015, 40, "21"))
+        company.remove_transport(4)
+
+    def test_group_commit(self):
+        """Тест 1: Записи попадают в файл группами или по истечении flush_interval"""
+        with journal.Journal(self.journal, group_size=3, flush_interval=60) as j:
+            j.append(('book', 1, 1))
+            j.append(('book', 1, 2))
+            self.assertEqual(j.pending, 2)
+            self.assertEqual(list(journal.read_journal(self.journal)[1]), [])
+
+            j.append(('cancel', 1, 1))
+            self.assertEqual(j.pending, 0)
+            self.assertEqual(len(list(journal.read_journal(self.journal)[1])), 3)
+            j.append(('book', 2, 1))
+
+        # При закрытии оставшиеся записи дописываются
+        self.assertEqual(list(journal.read_journal(self.journal)[1])[-1], ['book', 2, 1])
+
+        # Одиночная запись фиксируется по таймеру, не дожидаясь следующих
+        with journal.Journal(self.journal, group_size=256, flush_interval=0.05) as j:
+            j.append(('book', 3, 1))
+            for _ in range(100):
+                if not j.pending:
+                    break
+                time.sleep(0.02)
+            self.assertEqual(j.pending, 0)
+            self.assertEqual(list(journal.read_journal(self.journal)[1])[-1], ['book', 3, 1])
+
+    def test_recover_replays_journal(self):
+        """Тест 2: Восстановление - снапшот и повторение журнала"""
+        original = make_company()
+        original.save_to_snapshot(self.snapshot)
+        # Снапшот без журнала: журнал начинается после него
+        company, j = self.recover()
+        self.mutate(company)
+        j.close()
+
+        self.mutate(original)
+        restored, _ = self.recover()
+        self.assertSameState(restored, original)
+
+        # После восстановления ID продолжаются с того же места
+        restored.add_passenger(Passenger(0, "Орлова Вера", "+79995555555"))
+        self.assertEqual(restored.passengers[-1].id, 5)
+
+    def test_torn_tail(self):
+        """Тест 3: Запись, прерванная сбоем, отрезается, поврежденная середина - ошибка"""
+        company, j = self.recover()
+        company.add_passenger(Passenger(0, "Смирнов Олег", "+79991111111"))
+        j.close()
+        with open(self.journal, 'a', encoding='utf-8') as f:
+            f.write('["add","passengers",{"id":2,"na')
+
+        restored, j = self.recover()
+        self.assertEqual([p.id for p in restored.passengers], [1])
+        # Новые записи не склеиваются с обрывком
+        restored.add_passenger(Passenger(0, "Кузнецова Мария", "+79992222222"))
+        j.close()
+        restored, j = self.recover()
+        self.assertEqual([p.name for p in restored.passengers], ["Смирнов Олег", "Кузнецова Мария"])
+        j.close()
+
+        with open(self.journal, 'a', encoding='utf-8') as f:
+            f.write('\n["book",1,1]\n')
+        with self.assertRaises(InvalidDataException):
+            self.recover()
+
+    def test_compact(self):
+        """Тест 4: Сжатие переносит изменения в снапшот и очищает журнал"""
+        company, j = self.recover()
+        fill_company(company)
+        company.get_transport(1).status = Transport.STATUS_REPAIR
+        j.flush()
+        with open(self.journal, encoding='utf-8') as f:
+            old_journal = f.read()
+
+        journal.compact(company, self.snapshot, j)
+        self.assertEqual(list(journal.read_journal(self.journal)[1]), [])
+        company.get_transport(2).status = Transport.STATUS_RETIRED
+        j.close()
+
+        restored, j = self.recover()
+        self.assertEqual([t.status for t in restored.transports], [t.status for t in company.transports])
+        self.assertEqual(len(restored.trips), 4)
+        j.close()
+
+        # Сбой между записью снапшота и очисткой журнала: старый журнал уже учтен в снапшоте
+        with open(self.journal, 'w', encoding='utf-8') as f:
+            f.write(old_journal)
+        restored, _ = self.recover()
+        self.assertEqual(len(restored.trips), 4)
+        self.assertEqual(restored.get_transport(1).status, Transport.STATUS_REPAIR)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,81 @@
+"""
+Unit-тесты для планировщика поездок
+"""
+
+import unittest
+from datetime import datetime, timedelta
+from journey_planner import JourneyPlanner
+from models import Bus, Route, Trip
+from test_transport_company import make_company
+
+
+class TestJourneyPlanner(unittest.TestCase):
+    """Тесты JourneyPlanner"""
+
+    def setUp(self):
+        """Подготовка перед каждым тестом: сеть A - B - C - D и медленный прямой рейс A - C"""
+        self.company = make_company()
+        self.company.add_transport(Bus(0, "ПАЗ", "3205", 2015, 1, "21"))
+        for number, start, end in (("AB", "A", "B"), ("BC", "B", "C"), ("AC", "A", "C"), ("CD", "C", "D")):
+            self.company.add_route(Route(0, number, start, end, 5))
+
+        self.day = datetime(2030, 3, 1)
+        self.ids = {}
+        for name, number, departure, minutes, transport_id in (
+                ("A-B 8:00", "AB", "08:00", 20, 1),
+                ("B-C 8:22", "BC", "08:22", 20, 1),
+                ("B-C 8:30", "BC", "08:30", 20, 4),
+                ("B-C 8:40", "BC", "08:40", 20, 1),
+                ("A-C 8:05", "AC", "08:05", 60, 1),
+                ("C-D 9:05", "CD", "09:05", 10, 1),
+                ("C-D 9:30", "CD", "09:30", 10, 1)):
+            self.add_trip(name, number, departure, minutes, transport_id)
+
+    def add_trip(self, name, number, departure, minutes, transport_id):
+        hours, mins = map(int, departure.split(':'))
+        start = self.day.replace(hour=hours, minute=mins)
+        trip = Trip(0, self.company.get_route_by_number(number), self.company.get_transport(transport_id),
+                    self.company.get_employee(1), start, start + timedelta(minutes=minutes), 30)
+        self.company.add_trip(trip)
+        self.ids[trip.id] = name
+
+    def names(self, journey):
+        return None if journey is None else [self.ids[t.id] for t in journey]
+
+    def test_earliest_arrival_with_transfers(self):
+        """Тест 1: Самое раннее прибытие с учетом времени на пересадку"""
+        planner = JourneyPlanner(self.company, min_transfer=timedelta(minutes=5))
+        # 8:22 не успеть (пересадка 5 минут), 8:30 - на рейс с одним местом
+        self.assertEqual(self.names(planner.plan("A", "D", self.day.replace(hour=7))),
+                         ["A-B 8:00", "B-C 8:30", "C-D 9:05"])
+
+        planner = JourneyPlanner(self.company, min_transfer=timedelta(minutes=1))
+        self.assertEqual(self.names(planner.plan("A", "C", self.day.replace(hour=7))), ["A-B 8:00", "B-C 8:22"])
+        self.assertEqual(planner.plan("A", "A", self.day), [])
+        self.assertIsNone(planner.plan("D", "A", self.day))
+        self.assertIsNone(planner.plan("A", "Нет такой", self.day))
+        self.assertIsNone(planner.plan("A", "D", self.day.replace(hour=9)))
+
+    def test_max_transfers(self):
+        """Тест 2: Ограничение числа пересадок"""
+        planner = JourneyPlanner(self.company, min_transfer=timedelta(minutes=1))
+        self.assertEqual(self.names(planner.plan("A", "C", self.day, max_transfers=0)), ["A-C 8:05"])
+        self.assertEqual(self.names(planner.plan("A", "D", self.day, max_transfers=1)), ["A-C 8:05", "C-D 9:30"])
+        self.assertEqual(self.names(planner.plan("A", "D", self.day, max_transfers=2)),
+                         ["A-B 8:00", "B-C 8:22", "C-D 9:05"])
+        self.assertIsNone(planner.plan("A", "D", self.day, max_transfers=0))
+
+    def test_free_seats(self):
+        """Тест 3: Рейсы без свободных мест пропускаются"""
+        planner = JourneyPlanner(self.company, min_transfer=timedelta(minutes=5))
+        full_trip = next(i for i, name in self.ids.items() if name == "B-C 8:30")
+        self.company.book_ticket(full_trip, 1)
+
+        self.assertEqual(self.names(planner.plan("A", "D", self.day)), ["A-B 8:00", "B-C 8:40", "C-D 9:05"])
+        self.assertEqual(self.names(planner.plan("A", "D", self.day, min_free_seats=0)),
+                         ["A-B 8:00", "B-C 8:30", "C-D 9:05"])
+        self.assertIsNone(planner.plan("A", "D", self.day, min_free_seats=101))
+
+
+if __name__ == '__main__':
+    unittest.main()
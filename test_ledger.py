@@ -0,0 +1,96 @@
+"""
+Unit-тесты для журнала билетов
+"""
+
+import unittest
+import random
+from datetime import date
+import ledger
+from models import Passenger
+from test_transport_company import make_company
+
+
+class TestTicketLedger(unittest.TestCase):
+    """Класс с тестами"""
+
+    def setUp(self):
+        """Подготовка перед каждым тестом: случайные покупки и возвраты билетов"""
+        self.company = make_company()
+        categories = ["взрослый", "студент", "пенсионер", "ребенок"]
+        for i in range(40):
+            self.company.add_passenger(Passenger(0, f"Пассажир {i}", f"+7900{i:07d}", "",
+                                                 [0, 25, 50, 100][i % 4], categories[i % 4]))
+
+        rnd = random.Random(7)
+        for _ in range(300):
+            trip = rnd.choice(self.company.trips)
+            passenger = rnd.choice(self.company.passengers)
+            if trip.has_passenger(passenger.id):
+                self.company.cancel_ticket(trip.id, passenger.id)
+            else:
+                self.company.book_ticket(trip.id, passenger.id)
+
+    def assertReportsMatchTrips(self):
+        """Отчеты журнала совпадают с пересчетом по рейсам"""
+        company = self.company
+        by_route, by_day, by_category, tickets, discounts = {}, {}, {}, {}, {}
+        for trip in company.trips:
+            for p in trip.passengers:
+                price = trip.ticket_price(p)
+                day = trip.departure_time.date()
+                by_route[trip.route.id] = by_route.get(trip.route.id, 0) + price
+                by_day[day] = by_day.get(day, 0) + price
+                by_category[p.category] = by_category.get(p.category, 0) + price
+                tickets[p.category] = tickets.get(p.category, 0) + 1
+                discounts[round(p.discount)] = discounts.get(round(p.discount), 0) + 1
+
+        self.assertEqual(len(company.ledger), sum(t.get_passenger_count() for t in company.trips))
+        for actual, expected in ((company.ledger.revenue_by_route(), by_route),
+                                 (company.ledger.revenue_by_day(), by_day),
+                                 (company.ledger.revenue_by_category(), by_category)):
+            self.assertEqual(actual.keys(), expected.keys())
+            for key in expected:
+                self.assertAlmostEqual(actual[key], expected[key], places=6)
+        self.assertEqual(company.ledger.tickets_by_category(), tickets)
+        self.assertEqual(company.ledger.discount_distribution(), discounts)
+
+    def test_reports(self):
+        """Тест 1: Отчеты совпадают с рейсами"""
+        self.assertReportsMatchTrips()
+        self.assertEqual(list(self.company.ledger.revenue_by_day()), [date(2030, 1, 15)])
+
+    def test_reports_without_numpy(self):
+        """Тест 2: Отчеты без NumPy"""
+        saved_np = ledger.np
+        ledger.np = None
+        try:
+            self.assertReportsMatchTrips()
+        finally:
+            ledger.np = saved_np
+
+    def test_rebuild(self):
+        """Тест 3: Перестроение журнала по рейсам"""
+        self.company.ledger.rebuild(self.company.trips)
+        self.assertReportsMatchTrips()
+
+        self.company.ledger.clear()
+        self.assertEqual(len(self.company.ledger), 0)
+        self.assertEqual(self.company.ledger.revenue_by_route(), {})
+
+    def test_lazy_rebuild(self):
+        """Тест 4: Отложенное построение журнала учитывает билеты, проданные после rebuild"""
+        self.company.ledger.rebuild(self.company.trips, lazy=True)
+        trip = self.company.trips[3]
+        for passenger in self.company.passengers:
+            if trip.has_passenger(passenger.id):
+                self.company.cancel_ticket(trip.id, passenger.id)
+                break
+        for passenger in self.company.passengers:
+            if not trip.has_passenger(passenger.id):
+                self.company.book_ticket(trip.id, passenger.id)
+                break
+        self.assertReportsMatchTrips()
+
+
+if __name__ == '__main__':
+    unittest.main()
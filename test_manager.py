@@ -0,0 +1,64 @@
+"""
+Unit-тесты для отображения рейсов в интерактивном менеджере
+"""
+
+import unittest
+from unittest import mock
+from datetime import datetime, timedelta
+from manager import TransportManager
+from models import Trip
+from test_transport_company import make_company
+
+
+class TestTripListing(unittest.TestCase):
+    """Тесты постраничного списка рейсов"""
+
+    def setUp(self):
+        """Подготовка перед каждым тестом: рейсы 15 января и 2 февраля"""
+        self.company = make_company()
+        departure = datetime(2030, 2, 2, 8, 0)
+        self.company.add_trip(Trip(0, self.company.get_route(1), self.company.get_transport(3),
+                                   self.company.get_employee(1), departure, departure + timedelta(hours=1), 40))
+        self.manager = TransportManager(self.company)
+        self.manager.TRIPS_PAGE_SIZE = 3
+
+    def test_pages_in_date_order(self):
+        """Тест 1: Страницы идут по времени отправления, даты - по календарю"""
+        first = self.manager._render_trips_page(0, 2)
+        second = self.manager._render_trips_page(1, 2)
+        self.assertIn("страница 1 из 2", first)
+        self.assertEqual([line for line in first.splitlines() if "РЕЙС #" in line][0], "🚌 РЕЙС #1 | Маршрут 12")
+        self.assertEqual(first.count("📅"), 1)
+        self.assertLess(second.index("📅 15.01.2030"), second.index("📅 02.02.2030"))
+        self.assertIn("РЕЙС #4", second)
+        self.assertLess(second.index("РЕЙС #4"), second.index("РЕЙС #5"))
+
+    def test_cached_blocks(self):
+        """Тест 2: Текст рейса берется из кэша до посадки пассажира"""
+        manager = self.manager
+        manager._render_trips_page(0, 2)
+        block = manager._trip_blocks[1][1]
+        self.assertIn("Пассажиров нет", block)
+        manager._render_trips_page(0, 2)
+        self.assertIs(manager._trip_blocks[1][1], block)
+
+        self.company.book_ticket(1, 2)
+        page = manager._render_trips_page(0, 2)
+        self.assertIn("Кузнецова Мария (скидка 50%)", page)
+        self.assertIn("Места: 1/100 занято", manager._trip_blocks[1][1])
+
+        trips = manager._bookable_trips("", "", datetime(2030, 1, 15, 8, 0), 3)
+        self.assertEqual([t.id for t in trips], [2, 3, 4])
+
+    def test_page_input(self):
+        """Тест 3: Номер страницы 0 ("00") не принимается, номер больше числа страниц - последняя"""
+        pages = []
+        with mock.patch.object(self.manager, '_render_trips_page', side_effect=lambda page, total: pages.append(page)), \
+                mock.patch('builtins.input', side_effect=["00", "9", "п", "2030-02-02", "0"]), \
+                mock.patch('builtins.print'):
+            self.manager._show_all_trips()
+        self.assertEqual(pages, [0, 0, 1, 0, 1])
+
+
+if __name__ == '__main__':
+    unittest.main()
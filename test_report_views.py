@@ -0,0 +1,98 @@
+"""
+Unit-тесты для материализованных отчетов
+"""
+
+import unittest
+import tempfile
+import os
+from datetime import date, datetime, timedelta
+from booking import BookingEngine
+from report_views import ReportViews
+from models import Bus, Passenger, Trip
+from test_transport_company import make_company
+
+
+class TestReportViews(unittest.TestCase):
+    """Тесты ReportViews"""
+
+    def setUp(self):
+        """Подготовка перед каждым тестом"""
+        self.company = make_company()
+        self.views = ReportViews(self.company)
+
+    def test_incremental_updates(self):
+        """Тест 1: Отчеты обновляются при продаже, возврате, новых рейсах и смене транспорта"""
+        company, views = self.company, self.views
+        day = date(2030, 1, 15)
+        company.book_ticket(1, 1)
+        company.book_many([(1, 2), (2, 1), (2, 3)])
+        self.assertEqual(views.revenue_by_route_day, {(1, day): 75.0, (2, day): 50.0})
+        self.assertEqual(views.riders_by_category, {"взрослый": 2, "студент": 1, "пенсионер": 1})
+        self.assertEqual(views.seats_by_transport, {1: [2, 200], 2: [2, 500]})
+        self.assertEqual(views.load_factor(2), 0.004)
+        self.assertIsNone(views.load_factor(3))
+
+        engine = BookingEngine(company)
+        engine.cancel(1, 2)
+        company.cancel_ticket(2, 3)
+        self.assertEqual(views.revenue_by_route_day, {(1, day): 50.0, (2, day): 50.0})
+        self.assertEqual(views.revenue_by_category, {"взрослый": 100.0})
+        self.assertEqual(views.tickets_by_route_day, {(1, day): 1, (2, day): 1})
+
+        # Рейс с уже посаженными пассажирами (как при повторении журнала)
+        company.add_transport(Bus(0, "ПАЗ", "3205", 2015, 20, "21"))
+        departure = datetime(2030, 1, 16, 9, 0)
+        trip = Trip(0, company.get_route(1), company.get_transport(4), company.get_employee(1),
+                    departure, departure + timedelta(hours=1), 40)
+        trip.add_passengers([company.get_passenger(2), company.get_passenger(3)])
+        company.add_trip(trip)
+        self.assertEqual(views.revenue_by_route_day[(1, date(2030, 1, 16))], 20.0)
+        # Билеты пассажиров добавленного рейса попадают и в журнал билетов
+        self.assertEqual(company.ledger.tickets_by_category(), views.riders_by_category)
+        self.assertEqual(company.ledger.revenue_by_route(), {1: 70.0, 2: 50.0})
+
+        company.reassign_trip(2, 3, 2)
+        self.assertEqual(views.seats_by_transport[2], [0, 250])
+        self.assertEqual(views.seats_by_transport[3], [1, 85])
+        self.assertEqual(views.verify(), [])
+
+    def test_verify_and_rebuild(self):
+        """Тест 2: Проверка находит расхождения, пересчет их исправляет"""
+        company, views = self.company, self.views
+        company.book_ticket(1, 2)
+        snapshot = views.snapshot()
+        company.book_ticket(3, 2)
+        self.assertEqual(snapshot['tickets_by_route_day'], {(1, date(2030, 1, 15)): 1})
+        self.assertEqual(snapshot['seats_by_transport'][1], [1, 200])
+
+        # Изменение в обход компании отчеты не видят
+        company.get_trip(3).add_passenger(company.get_passenger(1))
+        self.assertEqual(views.verify(), ["revenue_by_route_day[(1, datetime.date(2030, 1, 15))]: 50.0 вместо 100.0",
+                                          "tickets_by_route_day[(1, datetime.date(2030, 1, 15))]: 2 вместо 3",
+                                          "riders_by_category['взрослый']: None вместо 1",
+                                          "revenue_by_category['взрослый']: None вместо 50.0",
+                                          "seats_by_transport[1]: [2, 200] вместо [3, 200]"])
+        views.rebuild()
+        self.assertEqual(views.verify(), [])
+
+    def test_load_and_detach(self):
+        """Тест 3: После загрузки данных отчеты пересчитываются, после отключения не обновляются"""
+        company, views = self.company, self.views
+        company.book_ticket(1, 1)
+        with tempfile.TemporaryDirectory() as tmp:
+            filename = os.path.join(tmp, "company.ndjson")
+            company.save_to_ndjson(filename)
+            company.book_ticket(2, 1)
+            company.load_from_ndjson(filename)
+        self.assertEqual(views.tickets_by_route_day, {(1, date(2030, 1, 15)): 1})
+        self.assertEqual(views.verify(), [])
+
+        views.detach()
+        self.assertIsNone(company.views)
+        company.add_passenger(Passenger(0, "Новиков Илья", "+79994444444"))
+        company.book_ticket(1, 4)
+        self.assertEqual(views.riders_by_category, {"взрослый": 1})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,131 @@
+"""
+Unit-тесты для компании, разделенной между процессами
+"""
+
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from sharded_company import ShardedCompany
+from models import Bus, Employee, Passenger, Route, Trip
+from exceptions import TransportException, NotFoundException, ScheduleConflictException
+
+
+class TestShardedCompany(unittest.TestCase):
+    """Тесты ShardedCompany"""
+
+    def setUp(self):
+        """Подготовка перед каждым тестом: два шарда, маршруты 1 и 3 в шарде 1, маршрут 2 в шарде 0"""
+        self.company = ShardedCompany("Тестовый автопарк", shards=2)
+        self.addCleanup(self.company.close)
+        self.company.add_transports([Bus(0, "ПАЗ", "3205", 2015, 2, "21"), Bus(0, "ЛиАЗ", "5292", 2020, 50, "5")])
+        self.company.add_employees([Employee(0, f"Водитель {i}", f"+7999000000{i}", "Водитель", 60000)
+                                    for i in range(2)])
+        self.company.add_passengers([Passenger(0, "Иванов Иван", "+79991111111"),
+                                     Passenger(0, "Петрова Анна", "+79992222222", "", 50, "студент"),
+                                     Passenger(0, "Сидоров Олег", "+79993333333", "", 100, "пенсионер")])
+        self.routes = [Route(0, "21", "Вокзал", "Центр", 10), Route(0, "5", "Центр", "Парк", 8),
+                       Route(0, "21к", "Вокзал", "Центр", 12)]
+        self.company.add_routes(self.routes)
+        self.day = datetime(2030, 1, 15)
+
+    def make_trip(self, route, hour, transport=1, driver=1):
+        """Рейс маршрута route на час с отправлением в hour"""
+        return Trip(0, self.routes[route - 1], Bus(transport, "ПАЗ", "3205", 2015, 2, ""),
+                    Employee(driver, "Водитель", "+79990000000", "Водитель", 60000),
+                    self.day + timedelta(hours=hour), self.day + timedelta(hours=hour + 1), 100)
+
+    def test_routing(self):
+        """Тест 1: Рейсы хранятся в шарде маршрута, билеты продаются в шарде рейса"""
+        company = self.company
+        self.assertEqual([company.shard_of_route(r.id) for r in self.routes], [1, 0, 1])
+        company.add_trip(self.make_trip(1, 9))
+        company.add_trips([self.make_trip(2, 9, 2, 2), self.make_trip(3, 8, 2, 2)])
+        rejected = self.make_trip(3, 9, 1, 2)
+        with self.assertRaises(ScheduleConflictException):
+            company.add_trip(rejected, allow_conflicts=False)
+        self.assertEqual(rejected.id, 0)
+        # Накладка с рейсом другого шарда не обнаруживается; ID отклоненного рейса выдан снова
+        trip = self.make_trip(1, 9, 2, 2)
+        company.add_trip(trip, allow_conflicts=False)
+        self.assertEqual(trip.id, 4)
+        self.assertEqual(company.counts(), {'routes': 3, 'trips': 4, 'tickets': 0})
+
+        self.assertEqual(company.book_ticket(1, 2), 50.0)
+        self.assertEqual(company.book_ticket(2, 3), 0.0)
+        company.book_ticket(1, 1)
+        with self.assertRaises(TransportException):
+            company.book_ticket(1, 3)
+        with self.assertRaises(NotFoundException):
+            company.book_ticket(99, 1)
+        self.assertEqual(company.get_trip(1)['passengers'], [2, 1])
+
+        company.cancel_ticket(1, 2)
+        with self.assertRaises(NotFoundException):
+            company.cancel_ticket(1, 2)
+        self.assertEqual(company.get_trip(1)['passengers'], [1])
+        self.assertIsNone(company.get_trip(99))
+
+    def test_book_many(self):
+        """Тест 2: Группа билетов на рейсы разных шардов"""
+        company = self.company
+        company.add_trips([self.make_trip(1, 9), self.make_trip(2, 9, 2, 2)])
+        self.assertEqual(company.book_many([(2, 1), (1, 2), (2, 3)]), [100.0, 50.0, 0.0])
+
+        # Ошибка в одном шарде отменяет билеты, проданные в другом
+        with self.assertRaises(TransportException):
+            company.book_many([(2, 2), (1, 2)])
+        self.assertEqual(company.get_trip(2)['passengers'], [1, 3])
+
+        results = company.book_many([(2, 2), (1, 2), (7, 1), (1, 1), (1, 3)], atomic=False)
+        self.assertEqual(results[0], 50.0)
+        self.assertIsInstance(results[1], TransportException)
+        self.assertIsInstance(results[2], NotFoundException)
+        self.assertEqual(results[3], 100.0)
+        self.assertIsInstance(results[4], TransportException)
+        self.assertEqual(company.counts()['tickets'], 5)
+
+    def test_scatter_gather(self):
+        """Тест 3: Поиск и отчеты объединяют ответы всех шардов"""
+        company = self.company
+        company.add_trips([self.make_trip(1, 10), self.make_trip(3, 8), self.make_trip(2, 9, 2, 2),
+                           self.make_trip(3, 12, 2, 2)])
+        company.book_many([(1, 1), (2, 2), (3, 1), (3, 3)])
+
+        found = company.search_trips("Вокзал", "Центр", self.day)
+        self.assertEqual([t['id'] for t in found], [2, 1, 4])
+        self.assertEqual([t['id'] for t in company.search_trips("Вокзал", "Центр", self.day, limit=2)], [2, 1])
+        self.assertEqual([t['id'] for t in company.search_trips("Вокзал", "Центр", self.day, min_free_seats=2)],
+                         [4])
+        self.assertEqual([t['id'] for t in company.trips_between(self.day, self.day + timedelta(hours=11))],
+                         [2, 3, 1])
+        self.assertEqual([t['id'] for t in company.trips_between(self.day, self.day + timedelta(days=1), 3)],
+                         [2, 4])
+
+        self.assertEqual(company.revenue_by_route(), {1: 100.0, 2: 100.0, 3: 50.0})
+        self.assertEqual(company.revenue_by_day(), {self.day.date(): 250.0})
+        self.assertEqual(company.tickets_by_category(), {"взрослый": 2, "студент": 1, "пенсионер": 1})
+        self.assertEqual(company.revenue_by_category(), {"взрослый": 200.0, "студент": 50.0, "пенсионер": 0.0})
+
+    def test_concurrent_ids(self):
+        """Тест 4: Параллельные запросы из разных потоков получают разные ID"""
+        company = self.company
+        trips = [self.make_trip(1 + i % 3, i) for i in range(40)]
+        with ThreadPoolExecutor(8) as pool:
+            list(pool.map(company.add_trip, trips))
+        self.assertEqual(sorted(t.id for t in trips), list(range(1, 41)))
+        self.assertEqual(company.counts()['trips'], 40)
+        self.assertEqual(company.get_trip(40)['id'], 40)
+
+        # Шард 1 не принимает рейс с неизвестным транспортом: его ID возвращается счетчику
+        trips = [self.make_trip(2, 50), self.make_trip(1, 50, transport=9)]
+        with self.assertRaises(NotFoundException):
+            company.add_trips(trips)
+        self.assertEqual([t.id for t in trips], [41, 0])
+        trip = self.make_trip(1, 51)
+        company.add_trip(trip)
+        self.assertEqual(trip.id, 42)
+        self.assertEqual(company.counts()['trips'], 42)
+
+
+if __name__ == '__main__':
+    unittest.main()
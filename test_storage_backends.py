@@ -0,0 +1,177 @@
+"""
+Общие тесты для хранилищ транспортной компании: в памяти и в SQLite
+"""
+
+import unittest
+import tempfile
+import os
+from datetime import datetime, timedelta
+from transport_company import TransportCompany
+from sqlite_storage import SqliteTransportCompany
+from models import Transport, Bus, Tram, Passenger, Trip
+from exceptions import TransportException, NotFoundException
+from test_transport_company import fill_company
+
+
+class BackendContract:
+    """Тесты публичных методов, одинаковые для всех хранилищ"""
+
+    def create_company(self, name):
+        raise NotImplementedError
+
+    def setUp(self):
+        """Подготовка перед каждым тестом"""
+        self.company = fill_company(self.create_company("Тестовый автопарк"))
+
+    def test_lookup_by_id(self):
+        """Тест 1: Поиск объектов по ID и номеру маршрута"""
+        company = self.company
+        self.assertIsInstance(company.get_transport(2), Tram)
+        self.assertEqual(company.get_transport(2).line_number, "3")
+        self.assertEqual(company.get_employee(3).position, "Диспетчер")
+        self.assertEqual(company.get_passenger(2).category, "студент")
+        self.assertEqual(company.get_route(2).end_point, "Депо")
+        self.assertEqual(company.get_route_by_number("12").id, 1)
+        self.assertEqual(company.get_trip(4).route.id, 2)
+        self.assertEqual(company.get_trip(4).departure_time, datetime(2030, 1, 15, 17, 0))
+        self.assertIsNone(company.get_transport(100))
+        self.assertIsNone(company.get_trip(100))
+        self.assertIsNone(company.get_route_by_number("999"))
+
+    def test_transports(self):
+        """Тест 2: Статусы и удаление транспорта"""
+        company = self.company
+        company.add_transport(Bus(0, "ПАЗ", "3205", 2015, 40, "21"))
+        self.assertEqual([t.id for t in company.get_active_transports()], [1, 2, 3, 4])
+
+        company.get_transport(1).status = Transport.STATUS_REPAIR
+        company.remove_transport(3)
+        self.assertEqual([t.id for t in company.get_active_transports()], [2, 4])
+        self.assertIsNone(company.get_transport(3))
+        with self.assertRaises(NotFoundException):
+            company.remove_transport(3)
+        self.assertEqual([e.id for e in company.get_drivers()], [1, 2])
+
+    def test_remove_transport_with_trips(self):
+        """Тест 3: Транспорт, назначенный на рейсы, не удаляется"""
+        company = self.company
+        with self.assertRaises(TransportException):
+            company.remove_transport(1)
+        self.assertEqual(company.get_transport(1).brand, "ЛиАЗ")
+        self.assertEqual(company.get_trip(1).transport.id, 1)
+        self.assertEqual([t.id for t in company.get_trips_by_route(1)], [1, 3])
+
+    def test_trips_by_time(self):
+        """Тест 4: Поиск рейсов по дате, маршруту и времени отправления"""
+        company = self.company
+        departure = datetime(2030, 1, 14, 23, 30)
+        company.add_trip(Trip(0, company.get_route(1), company.get_transport(1), company.get_employee(1),
+                              departure, departure + timedelta(hours=1), 40))
+
+        self.assertEqual([t.id for t in company.get_trips_by_date(datetime(2030, 1, 15).date())], [1, 2, 3, 4])
+        self.assertEqual([t.id for t in company.get_trips_by_date(datetime(2030, 1, 14).date())], [5])
+        self.assertEqual([t.id for t in company.get_trips_by_route(1)], [5, 1, 3])
+        self.assertEqual(company.get_trips_by_route(100), [])
+        self.assertEqual([t.id for t in company.trips_between(datetime(2030, 1, 15, 8, 0),
+                                                               datetime(2030, 1, 15, 14, 1), route_id=1)], [1, 3])
+        self.assertEqual([t.id for t in company.upcoming_trips(datetime(2030, 1, 15, 8, 0), limit=2)], [2, 3])
+        self.assertEqual(company.upcoming_trips(datetime(2031, 1, 1)), [])
+
+    def test_tickets(self):
+        """Тест 5: Продажа и возврат билетов"""
+        company = self.company
+        self.assertEqual(company.book_ticket(1, 1), 50)
+        self.assertEqual(company.book_ticket(1, 2), 25)
+        self.assertEqual(company.book_ticket(1, 3), 0)
+        with self.assertRaises(TransportException):
+            company.book_ticket(1, 2)
+        with self.assertRaises(NotFoundException):
+            company.book_ticket(100, 1)
+
+        trip = company.get_trip(1)
+        self.assertEqual(trip.get_passenger_ids(), [1, 2, 3])
+        self.assertEqual(trip.get_total_revenue(), 75)
+
+        company.cancel_ticket(1, 2)
+        self.assertEqual(company.get_trip(1).get_passenger_ids(), [1, 3])
+        with self.assertRaises(NotFoundException):
+            company.cancel_ticket(1, 2)
+
+    def test_full_trip(self):
+        """Тест 6: На заполненный рейс билет не продается"""
+        company = self.company
+        company.add_transport(Bus(0, "ПАЗ", "3205", 2015, 2, "21"))
+        departure = datetime(2030, 2, 1, 9, 0)
+        company.add_trip(Trip(0, company.get_route(1), company.get_transport(4), company.get_employee(1),
+                              departure, departure + timedelta(hours=1), 30))
+        company.book_ticket(5, 1)
+        company.book_ticket(5, 2)
+        with self.assertRaises(TransportException):
+            company.book_ticket(5, 3)
+        self.assertEqual(company.get_trip(5).get_free_seats(), 0)
+
+    def test_add_trips(self):
+        """Тест 7: Добавление многих рейсов сразу"""
+        company = self.company
+        day = datetime(2030, 1, 15)
+        trips = [Trip(0, company.get_route(i % 2 + 1), company.get_transport(3), company.get_employee(2),
+                      day + timedelta(hours=hour), day + timedelta(hours=hour, minutes=30), 20)
+                 for i, hour in enumerate((19, 6, 12))]
+        company.add_trips(trips)
+
+        self.assertEqual([t.id for t in trips], [5, 6, 7])
+        self.assertEqual(company.get_trip(6).departure_time, datetime(2030, 1, 15, 6, 0))
+        self.assertEqual([t.id for t in company.get_trips_by_date(day.date())], [6, 1, 2, 7, 3, 4, 5])
+        self.assertEqual([t.id for t in company.get_trips_by_route(2)], [6, 2, 4])
+        self.assertEqual([t.id for t in company.upcoming_trips(day + timedelta(hours=16))], [4, 5])
+
+
+class TestMemoryBackend(BackendContract, unittest.TestCase):
+    """Хранилище в памяти"""
+
+    def create_company(self, name):
+        return TransportCompany(name)
+
+
+class TestSqliteBackend(BackendContract, unittest.TestCase):
+    """Хранилище в SQLite"""
+
+    def create_company(self, name):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        company = SqliteTransportCompany(name, os.path.join(self.tmp.name, "company.db"))
+        self.addCleanup(company.close)
+        return company
+
+    def test_reopen(self):
+        """Тест 8: Данные сохраняются в файле базы"""
+        self.company.book_ticket(2, 2)
+        self.company.get_transport(3).status = Transport.STATUS_RETIRED
+        self.company.get_transport(1).capacity = 120
+        self.company.close()
+
+        with SqliteTransportCompany("Другое название", os.path.join(self.tmp.name, "company.db")) as company:
+            self.assertEqual(company.name, "Тестовый автопарк")
+            self.assertEqual([t.id for t in company.get_active_transports()], [1, 2])
+            self.assertEqual(company.get_trip(2).get_passenger_ids(), [2])
+            self.assertEqual(company.get_transport(1).capacity, 120)
+
+    def test_batch(self):
+        """Тест 9: Изменения внутри batch фиксируются вместе или отменяются вместе"""
+        company = self.company
+        with company.batch():
+            for i in range(100):
+                company.add_passenger(Passenger(0, f"Пассажир {i}", f"+7900{i:07d}"))
+        self.assertEqual(company.get_passenger(103).name, "Пассажир 99")
+
+        with self.assertRaises(NotFoundException):
+            with company.batch():
+                company.add_passenger(Passenger(0, "Отмененный", "+79000000000"))
+                company.book_ticket(1, 104)
+                company.book_ticket(100, 1)
+        self.assertIsNone(company.get_passenger(104))
+        self.assertEqual(company.get_trip(1).get_passenger_ids(), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,78 @@
+"""
+Unit-тесты для генерации расписания
+"""
+
+import unittest
+from datetime import date, datetime, time, timedelta
+from timetable import TravelTimeProfile, ServiceCalendar, Timetable
+from models import Route
+from exceptions import InvalidDataException
+from test_transport_company import make_company
+
+
+class TestTimetable(unittest.TestCase):
+    """Тесты Timetable"""
+
+    def setUp(self):
+        """Подготовка перед каждым тестом"""
+        self.company = make_company()
+        self.route = Route(0, "7к", "Вокзал", "Депо", 10)
+        self.company.add_route(self.route)
+        # Неделя с понедельника 2030-03-04; 8 марта - выходной, суббота 9 марта - рабочая
+        self.calendar = ServiceCalendar(date(2030, 3, 4), date(2030, 3, 10), ServiceCalendar.WEEKDAYS,
+                                        excluded=[date(2030, 3, 8)], added=[date(2030, 3, 9)])
+
+    def test_calendar_and_profile(self):
+        """Тест 1: Дни движения и время в пути по времени суток"""
+        self.assertEqual([d.day for d in self.calendar.dates()], [4, 5, 6, 7, 9])
+
+        profile = TravelTimeProfile.from_speed(10, periods=[(time(7, 0), time(9, 30), 20)])
+        self.assertEqual(profile.travel_time(time(6, 59)), timedelta(minutes=15))
+        self.assertEqual(profile.travel_time(time(7, 0)), timedelta(minutes=30))
+        self.assertEqual(profile.travel_time(time(9, 30)), timedelta(minutes=15))
+
+        with self.assertRaises(InvalidDataException):
+            ServiceCalendar(date(2030, 3, 10), date(2030, 3, 4))
+        with self.assertRaises(InvalidDataException):
+            Timetable(self.route, self.calendar, time(5, 30), time(23, 0), timedelta(0), 40)
+
+    def test_day_schedule(self):
+        """Тест 2: Рейсы дня по интервалу движения, в том числе после полуночи"""
+        profile = TravelTimeProfile.from_speed(10, periods=[(time(7, 0), time(9, 30), 20)])
+        timetable = Timetable(self.route, self.calendar, time(5, 30), time(23, 0), timedelta(minutes=7), 40, profile)
+        schedule = timetable.day_schedule()
+        self.assertEqual(len(schedule), 151)
+        self.assertEqual(schedule[0], (timedelta(hours=5, minutes=30), timedelta(hours=5, minutes=45)))
+        self.assertEqual(schedule[13], (timedelta(hours=7, minutes=1), timedelta(hours=7, minutes=31)))
+        self.assertEqual(schedule[-1][0], timedelta(hours=23, minutes=0))
+
+        night = Timetable(self.route, self.calendar, time(23, 0), time(1, 0), timedelta(minutes=30), 60)
+        self.assertEqual([d for d, _ in night.day_schedule()],
+                         [timedelta(hours=h) for h in (23, 23.5, 24, 24.5, 25)])
+
+    def test_generate(self):
+        """Тест 3: Рейсы на все дни календаря добавляются в компанию одним вызовом"""
+        company = self.company
+        timetable = Timetable(self.route, self.calendar, time(5, 30), time(23, 0), timedelta(minutes=7), 40)
+        vehicles, drivers = company.transports, company.get_drivers()
+        trips = timetable.generate(vehicles, drivers)
+        self.assertEqual(len(trips), 151 * 5)
+        self.assertEqual([t.transport.id for t in trips[:4]], [1, 2, 3, 1])
+        self.assertEqual([t.driver.id for t in trips[:3]], [1, 2, 1])
+
+        company.add_trips(trips)
+        self.assertEqual((trips[0].id, trips[-1].id), (5, 4 + 151 * 5))
+        self.assertEqual(len(company.get_trips_by_route(self.route.id)), 151 * 5)
+        morning = company.trips_between(datetime(2030, 3, 9, 5, 0), datetime(2030, 3, 9, 6, 0), self.route.id)
+        self.assertEqual([t.departure_time.strftime("%H:%M") for t in morning],
+                         ["05:30", "05:37", "05:44", "05:51", "05:58"])
+        self.assertEqual(len(company.search_trips("Вокзал", "Депо", datetime(2030, 3, 8), datetime(2030, 3, 9))), 0)
+
+        # Три машины при обороте 15 минут и интервале 7 минут - без накладок, одна - с накладками
+        self.assertEqual([c for c in company.schedule_conflicts() if c[0] == 'transport'], [])
+        company.add_trips(timetable.generate(vehicles[:1], drivers))
+        self.assertTrue(any(name == 'transport' for name, _, _ in company.schedule_conflicts()))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,680 @@
+"""
+Unit-тесты для транспортной компании
+"""
+
+import unittest
+import tempfile
+import os
+import json
+import random
+from datetime import datetime, timedelta
+from transport_company import TransportCompany
+from models import Transport, Bus, Tram, Trolleybus, Employee, Passenger, Route, Trip
+from exceptions import (TransportException, NotFoundException, InvalidDataException, FileOperationException,
+                        ScheduleConflictException)
+
+
+def make_company():
+    """Небольшая компания с транспортом, сотрудниками, пассажирами и рейсами"""
+    return fill_company(TransportCompany("Тестовый автопарк"))
+
+
+def fill_company(company):
+    """Заполнение пустой компании (любого хранилища) тестовыми данными"""
+    company.add_transport(Bus(0, "ЛиАЗ", "5292", 2018, 100, "12"))
+    company.add_transport(Tram(0, "71-931", "Витязь", 2020, 250, "3"))
+    company.add_transport(Bus(0, "КАМАЗ", "Электробус 6282", 2021, 85, "7"))
+
+    company.add_employee(Employee(0, "Иванов Иван", "+79990000001", "Водитель", 60000))
+    company.add_employee(Employee(0, "Петров Петр", "+79990000002", "Водитель трамвая", 65000))
+    company.add_employee(Employee(0, "Сидорова Анна", "+79990000003", "Диспетчер", 50000))
+
+    company.add_passenger(Passenger(0, "Смирнов Олег", "+79991111111"))
+    company.add_passenger(Passenger(0, "Кузнецова Мария", "+79992222222", "", 50, "студент"))
+    company.add_passenger(Passenger(0, "Попов Николай", "+79993333333", "", 100, "пенсионер"))
+
+    company.add_route(Route(0, "12", "Вокзал", "Аэропорт", 20))
+    company.add_route(Route(0, "3", "Центр", "Депо", 8))
+
+    start = datetime(2030, 1, 15, 8, 0)
+    for i in range(4):
+        departure = start + timedelta(hours=i * 3)
+        company.add_trip(Trip(0, company.get_route(i % 2 + 1), company.get_transport(i % 2 + 1),
+                              company.get_employee(i % 2 + 1), departure, departure + timedelta(minutes=40), 50))
+    return company
+
+
+class TestTransportCompany(unittest.TestCase):
+    """Класс с тестами"""
+
+    def setUp(self):
+        """Подготовка перед каждым тестом"""
+        self.company = make_company()
+
+    def assertIndexesConsistent(self, company):
+        """Индексы по ID совпадают со списками компании"""
+        self.assertEqual(company._transports_by_id, {t.id: t for t in company.transports})
+        self.assertEqual(company._employees_by_id, {e.id: e for e in company.employees})
+        self.assertEqual(company._passengers_by_id, {p.id: p for p in company.passengers})
+        self.assertEqual(company._routes_by_id, {r.id: r for r in company.routes})
+        self.assertEqual(company._trips_by_id, {t.id: t for t in company.trips})
+        for r in company.routes:
+            self.assertIs(company.get_route_by_number(r.number), r)
+
+    def test_lookup_by_id(self):
+        """Тест 1: Поиск объектов по ID"""
+        self.assertIndexesConsistent(self.company)
+        self.assertIs(self.company.get_transport(2), self.company.transports[1])
+        self.assertIs(self.company.get_employee(3), self.company.employees[2])
+        self.assertIs(self.company.get_passenger(1), self.company.passengers[0])
+        self.assertIs(self.company.get_route(2), self.company.routes[1])
+        self.assertIs(self.company.get_route_by_number("12"), self.company.routes[0])
+        self.assertIs(self.company.get_trip(4), self.company.trips[3])
+        self.assertIsNone(self.company.get_transport(100))
+        self.assertIsNone(self.company.get_trip(100))
+        self.assertIsNone(self.company.get_route_by_number("999"))
+
+    def test_remove_transport(self):
+        """Тест 2: Удаление транспорта обновляет индекс"""
+        self.company.remove_transport(3)
+        self.assertIsNone(self.company.get_transport(3))
+        self.assertIndexesConsistent(self.company)
+        with self.assertRaises(NotFoundException):
+            self.company.remove_transport(3)
+
+    def test_indexes_after_load(self):
+        """Тест 3: Индексы после загрузки из JSON"""
+        self.company.trips[0].add_passenger(self.company.passengers[1])
+
+        with tempfile.TemporaryDirectory() as tmp:
+            filename = os.path.join(tmp, "company.json")
+            self.company.save_to_json(filename)
+            loaded = TransportCompany("Пустая")
+            loaded.add_passenger(Passenger(0, "Лишний", "+70000000000"))
+            loaded.load_from_json(filename)
+
+        self.assertIndexesConsistent(loaded)
+        self.assertEqual(len(loaded.passengers), 3)
+        self.assertEqual(loaded.get_trip(1).get_passenger_count(), 1)
+        self.assertEqual(loaded.get_passenger(2).name, "Кузнецова Мария")
+
+    def test_query_transports(self):
+        """Тест 4: Поиск транспорта через вторичные индексы"""
+        company = self.company
+        self.assertEqual([t.id for t in company.query(Transport, capacity__gte=100)], [1, 2])
+        self.assertEqual([t.id for t in company.query(Transport, capacity__lt=100, year__gte=2021)], [3])
+        self.assertEqual([t.id for t in company.query(Bus)], [1, 3])
+        self.assertEqual([t.id for t in company.query(Tram, year=2020)], [2])
+        self.assertEqual([t.id for t in company.query(Transport, year__in=[2018, 2021])], [1, 3])
+        self.assertEqual([t.id for t in company.query(Transport, brand="ЛиАЗ")], [1])
+        self.assertEqual(company.query(Bus, capacity__gt=200), [])
+        with self.assertRaises(InvalidDataException):
+            company.query(Transport, capacity__between=(1, 2))
+
+    def test_status_change_updates_index(self):
+        """Тест 5: Смена статуса, года выпуска и вместимости транспорта обновляет индексы"""
+        company = self.company
+        company.get_transport(1).status = Transport.STATUS_REPAIR
+        self.assertEqual([t.id for t in company.get_active_transports()], [2, 3])
+        self.assertEqual([t.id for t in company.query(Transport, status=Transport.STATUS_REPAIR)], [1])
+
+        company.get_transport(1).status = Transport.STATUS_ACTIVE
+        company.remove_transport(3)
+        self.assertEqual([t.id for t in company.get_active_transports()], [1, 2])
+        self.assertEqual([t.id for t in company.query(Bus)], [1])
+
+        # Год выпуска и вместимость тоже отслеживаются индексами
+        company.get_transport(2).capacity = 90
+        company.get_transport(1).year = 2022
+        self.assertEqual([t.id for t in company.query(Transport, capacity__gte=100)], [1])
+        self.assertEqual([t.id for t in company.query(Transport, capacity__lt=100, year__lte=2020)], [2])
+        self.assertEqual([t.id for t in company.query(Transport, year=2022)], [1])
+
+        # Без индексированных условий результат тоже упорядочен по ID
+        company.add_transport(Bus(10, "ПАЗ", "3205", 2015, 40, "21"))
+        company.add_transport(Bus(5, "ПАЗ", "3205", 2015, 40, "21"))
+        self.assertEqual([t.id for t in company.query(Transport, brand="ПАЗ")], [5, 10])
+        self.assertEqual([t.id for t in company.query(Transport)], [1, 2, 5, 10])
+
+    def test_drivers_and_positions(self):
+        """Тест 6: Водители и поиск по должности"""
+        company = self.company
+        self.assertEqual([e.id for e in company.get_drivers()], [1, 2])
+        self.assertEqual([e.id for e in company.query(Employee, position="Диспетчер")], [3])
+        self.assertEqual([e.id for e in company.query(Employee, salary__gte=60000)], [1, 2])
+        self.assertEqual([p.id for p in company.query(Passenger, discount__gt=0)], [2, 3])
+
+    def test_trips_by_time(self):
+        """Тест 7: Поиск рейсов по времени отправления"""
+        company = self.company
+        # Рейс на другую дату, добавленный не по порядку
+        departure = datetime(2030, 1, 14, 23, 30)
+        company.add_trip(Trip(0, company.routes[0], company.transports[0], company.employees[0],
+                              departure, departure + timedelta(hours=1), 40))
+
+        self.assertEqual([t.id for t in company.get_trips_by_date(datetime(2030, 1, 15).date())], [1, 2, 3, 4])
+        self.assertEqual([t.id for t in company.get_trips_by_date(datetime(2030, 1, 14).date())], [5])
+        self.assertEqual([t.id for t in company.get_trips_by_route(1)], [5, 1, 3])
+        self.assertEqual(company.get_trips_by_route(100), [])
+
+        self.assertEqual([t.id for t in company.trips_between(datetime(2030, 1, 15, 8, 0),
+                                                               datetime(2030, 1, 15, 14, 0))], [1, 2])
+        self.assertEqual([t.id for t in company.trips_between(datetime(2030, 1, 15, 8, 0),
+                                                               datetime(2030, 1, 15, 14, 1), route_id=1)], [1, 3])
+
+        self.assertEqual([t.id for t in company.upcoming_trips(datetime(2030, 1, 15, 8, 0), limit=2)], [2, 3])
+        self.assertEqual([t.id for t in company.upcoming_trips(datetime(2030, 1, 1))], [5, 1, 2, 3, 4])
+        self.assertEqual(company.upcoming_trips(datetime(2031, 1, 1)), [])
+
+        self.assertEqual([t.id for t in company.trips_page(1, 3)], [1, 2, 3])
+        self.assertEqual([t.id for t in company.trips_page(4, 3)], [4])
+        self.assertEqual(company.count_trips_before(datetime(2030, 1, 15, 11, 0)), 2)
+        self.assertEqual(company.count_trips_before(datetime(2031, 1, 1)), 5)
+
+    def test_compact_models(self):
+        """Тест 8: Модели без __dict__, повторяющиеся строки интернированы"""
+        for obj in (self.company.passengers[0], self.company.employees[0], self.company.transports[0],
+                    self.company.transports[1], self.company.routes[0], self.company.trips[0]):
+            with self.subTest(model=type(obj).__name__):
+                self.assertFalse(hasattr(obj, '__dict__'))
+
+        category = "".join(["сту", "дент"])
+        passenger = Passenger(0, "Новиков Илья", "+79994444444", "", 50, category)
+        self.assertIs(passenger.category, self.company.passengers[1].category)
+
+    def test_search_trips(self):
+        """Тест 9: Поиск рейсов по начальной и конечной точке, времени и свободным местам"""
+        company = self.company
+        company.add_route(Route(0, "12к", "Вокзал", "Аэропорт", 25))
+        departure = datetime(2030, 1, 15, 10, 0)
+        company.add_trip(Trip(0, company.get_route(3), company.get_transport(3), company.get_employee(1),
+                              departure, departure + timedelta(hours=1), 60))
+        day = datetime(2030, 1, 15)
+
+        for rebuilt in (False, True):
+            if rebuilt:
+                company._rebuild_indexes()
+            with self.subTest(rebuilt=rebuilt):
+                self.assertEqual([t.id for t in company.search_trips("Вокзал", "Аэропорт", day)], [1, 5, 3])
+                self.assertEqual([t.id for t in company.search_trips("Вокзал", "Аэропорт", day,
+                                                                     day + timedelta(hours=14))], [1, 5])
+                self.assertEqual([t.id for t in company.search_trips("Вокзал", "Аэропорт", day,
+                                                                     min_free_seats=90)], [1, 3])
+                self.assertEqual([t.id for t in company.search_trips("Вокзал", "Аэропорт", day, limit=1)], [1])
+                self.assertEqual(company.search_trips("Аэропорт", "Вокзал", day), [])
+
+        company.book_ticket(1, 1)
+        self.assertEqual([t.id for t in company.search_trips("Вокзал", "Аэропорт", day, min_free_seats=100)], [3])
+
+    def test_schedule_conflicts(self):
+        """Тест 10: Накладки рейсов одного транспорта или водителя"""
+        company = self.company
+        route, day = company.get_route(1), datetime(2030, 1, 15)
+
+        def trip(transport_id, driver_id, start, end):
+            return Trip(0, route, company.get_transport(transport_id), company.get_employee(driver_id),
+                        day + start, day + end, 50)
+
+        # Транспорт 1 занят на рейсе 1 с 8:00 до 8:40
+        overlapping = trip(1, 3, timedelta(hours=8, minutes=30), timedelta(hours=9))
+        self.assertEqual([t.id for t in company.find_trip_conflicts(overlapping)], [1])
+        with self.assertRaises(ScheduleConflictException):
+            company.add_trip(overlapping, allow_conflicts=False)
+        self.assertEqual((len(company.trips), overlapping.id), (4, 0))
+
+        # Рейс сразу после прибытия - не накладка
+        company.add_trip(trip(1, 1, timedelta(hours=8, minutes=40), timedelta(hours=9)), allow_conflicts=False)
+        # По умолчанию накладки допускаются и находятся аудитом
+        company.add_trip(trip(3, 1, timedelta(hours=7), timedelta(hours=15)))
+
+        probe = trip(3, 2, timedelta(hours=11, minutes=20), timedelta(hours=12))
+        for rebuilt in (False, True):
+            if rebuilt:
+                company._rebuild_indexes()
+            with self.subTest(rebuilt=rebuilt):
+                self.assertEqual([t.id for t in company.find_trip_conflicts(probe)], [6, 2])
+                self.assertEqual([t.id for t in company.find_trip_conflicts(company.get_trip(6))], [1, 5, 3])
+                self.assertCountEqual([(name, a.id, b.id) for name, a, b in company.schedule_conflicts()],
+                                      [('driver', 6, 1), ('driver', 6, 5), ('driver', 6, 3)])
+
+
+class TestPersistence(unittest.TestCase):
+    """Тесты сохранения и загрузки"""
+
+    def setUp(self):
+        """Подготовка перед каждым тестом"""
+        self.company = make_company()
+        self.company.add_transport(Trolleybus(0, "Тролза", "Мегаполис", 2016, 90, "5"))
+        self.company.book_ticket(1, 2)
+        self.company.book_ticket(1, 3)
+        self.company.book_ticket(2, 1)
+        self.tmp = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        """Очистка после каждого теста"""
+        self.tmp.cleanup()
+
+    def path(self, name):
+        return os.path.join(self.tmp.name, name)
+
+    def test_ndjson_sections(self):
+        """Тест 1: NDJSON - заголовок и по строке на запись в каждой секции"""
+        filename = self.path("company.ndjson")
+        self.company.save_to_ndjson(filename)
+
+        with open(filename, encoding='utf-8') as f:
+            lines = [json.loads(line) for line in f]
+
+        header = lines[0]
+        self.assertEqual(header['company_name'], self.company.name)
+        self.assertEqual(header['next_id'], self.company._next_id)
+
+        sections = {}
+        current = None
+        for record in lines[1:]:
+            if 'section' in record:
+                current = sections.setdefault(record['section'], [])
+            else:
+                current.append(record)
+
+        self.assertEqual(list(sections), ['transports', 'employees', 'passengers', 'routes', 'trips'])
+        self.assertEqual([r['type'] for r in sections['transports']], ['bus', 'tram', 'bus', 'trolleybus'])
+        self.assertEqual(len(sections['passengers']), 3)
+        self.assertEqual(sections['passengers'][1]['category'], "студент")
+        self.assertEqual(sections['trips'][0]['passengers'], [2, 3])
+        self.assertFalse([name for name in os.listdir(self.tmp.name) if name != "company.ndjson"])
+
+    def test_json_without_indent(self):
+        """Тест 2: Компактный JSON загружается так же, как форматированный"""
+        compact, pretty = self.path("compact.json"), self.path("pretty.json")
+        self.company.save_to_json(compact, indent=None)
+        self.company.save_to_json(pretty)
+        self.assertLess(os.path.getsize(compact), os.path.getsize(pretty))
+
+        loaded = TransportCompany("")
+        loaded.load_from_json(compact)
+        self.assertIsInstance(loaded.get_transport(4), Trolleybus)
+        self.assertEqual(loaded.get_passenger(2).category, "студент")
+        self.assertEqual(loaded.get_trip(1).get_passenger_ids(), [2, 3])
+
+    def test_failed_save_keeps_file(self):
+        """Тест 3: Ошибка при сохранении не портит существующий файл"""
+        filename = self.path("company.ndjson")
+        self.company.save_to_ndjson(filename)
+        with open(filename, encoding='utf-8') as f:
+            saved = f.read()
+
+        self.company.transports[0].brand = object()
+        with self.assertRaises(FileOperationException):
+            self.company.save_to_ndjson(filename)
+
+        with open(filename, encoding='utf-8') as f:
+            self.assertEqual(f.read(), saved)
+        self.assertEqual(os.listdir(self.tmp.name), ["company.ndjson"])
+
+    def test_ndjson_round_trip(self):
+        """Тест 4: Сохранение и загрузка NDJSON"""
+        filename = self.path("company.ndjson")
+        self.company.get_transport(2).status = Transport.STATUS_REPAIR
+        self.company.save_to_ndjson(filename)
+
+        loaded = TransportCompany("")
+        loaded.load_from_ndjson(filename)
+
+        self.assertEqual(loaded.name, self.company.name)
+        self.assertEqual(loaded._next_id, self.company._next_id)
+        self.assertEqual([type(t) for t in loaded.transports], [type(t) for t in self.company.transports])
+        self.assertEqual([t.id for t in loaded.get_active_transports()], [1, 3, 4])
+        self.assertEqual([e.id for e in loaded.get_drivers()], [1, 2])
+        for original, restored in zip(self.company.trips, loaded.trips):
+            self.assertEqual(restored.get_passenger_ids(), original.get_passenger_ids())
+            self.assertEqual(restored.departure_time, original.departure_time)
+            self.assertAlmostEqual(restored.get_total_revenue(), original.get_total_revenue())
+            self.assertEqual(restored.get_category_counts(), original.get_category_counts())
+        self.assertEqual(loaded.ledger.revenue_by_route(), self.company.ledger.revenue_by_route())
+
+        # Загруженная компания продолжает работать как обычно
+        loaded.get_transport(2).status = Transport.STATUS_ACTIVE
+        self.assertEqual(len(loaded.get_active_transports()), 4)
+        loaded.book_ticket(3, 1)
+        self.assertEqual(loaded.get_trip(3).get_passenger_ids(), [1])
+
+    def test_load_checks_data(self):
+        """Тест 5: Загрузка проверяет данные и ссылки"""
+        filename = self.path("company.json")
+        self.company.save_to_json(filename)
+        with open(filename, encoding='utf-8') as f:
+            data = json.load(f)
+
+        broken_cases = [
+            ('trips', 0, 'driver_id', 999),
+            ('trips', 0, 'passengers', [1, 999]),
+            ('transports', 0, 'year', 1800),
+            ('passengers', 0, 'discount', 150),
+            ('routes', 0, 'distance', 0),
+        ]
+        for section, pos, field, value in broken_cases:
+            with self.subTest(section=section, field=field):
+                broken = json.loads(json.dumps(data))
+                broken[section][pos][field] = value
+                with open(filename, 'w', encoding='utf-8') as f:
+                    json.dump(broken, f)
+
+                loaded = make_company()
+                with self.assertRaises(InvalidDataException):
+                    loaded.load_from_json(filename)
+                # При ошибке прежние данные компании сохраняются
+                self.assertEqual(len(loaded.trips), 4)
+
+    def test_xml_round_trip(self):
+        """Тест 6: Сохранение и загрузка XML"""
+        filename = self.path("company.xml")
+        self.company.get_transport(3).status = Transport.STATUS_RETIRED
+        self.company.save_to_xml(filename)
+
+        loaded = TransportCompany("")
+        loaded.load_from_xml(filename)
+
+        self.assertEqual(loaded.name, self.company.name)
+        self.assertEqual(loaded._next_id, self.company._next_id)
+        self.assertEqual([type(t) for t in loaded.transports], [type(t) for t in self.company.transports])
+        self.assertEqual([t.id for t in loaded.get_active_transports()], [1, 2, 4])
+        self.assertEqual(loaded.get_transport(2).line_number, "3")
+        self.assertEqual(loaded.get_passenger(3).category, "пенсионер")
+        self.assertEqual(loaded.get_route_by_number("3").end_point, "Депо")
+        self.assertEqual([t.get_passenger_ids() for t in loaded.trips],
+                         [t.get_passenger_ids() for t in self.company.trips])
+        self.assertEqual(loaded.get_trip(2).departure_time, self.company.get_trip(2).departure_time)
+
+    def test_xml_errors(self):
+        """Тест 7: Ошибки загрузки XML"""
+        filename = self.path("broken.xml")
+        with open(filename, 'w', encoding='utf-8') as f:
+            f.write('<TransportCompany name="x"><Transports><Transport id="1"')
+        with self.assertRaises(FileOperationException):
+            TransportCompany("").load_from_xml(filename)
+
+        with open(filename, 'w', encoding='utf-8') as f:
+            f.write('<Other/>')
+        with self.assertRaises(InvalidDataException):
+            TransportCompany("").load_from_xml(filename)
+
+
+    def test_snapshot_round_trip(self):
+        """Тест 8: Сохранение и загрузка двоичного снапшота"""
+        filename = self.path("company.snap")
+        self.company.get_transport(2).status = Transport.STATUS_REPAIR
+        self.company.save_to_snapshot(filename)
+
+        loaded = TransportCompany("")
+        loaded.load_from_snapshot(filename)
+
+        self.assertEqual(loaded.name, self.company.name)
+        self.assertEqual(loaded._next_id, self.company._next_id)
+        self.assertEqual([type(t) for t in loaded.transports], [type(t) for t in self.company.transports])
+        self.assertEqual([t.id for t in loaded.get_active_transports()], [1, 3, 4])
+        self.assertEqual(loaded.get_transport(2).line_number, "3")
+        self.assertEqual(loaded.get_transport(4).route_number, "5")
+        self.assertEqual(loaded.get_passenger(2).category, "студент")
+        self.assertEqual(loaded.get_employee(1).salary, self.company.get_employee(1).salary)
+        self.assertEqual(loaded.get_route_by_number("3").end_point, "Депо")
+        for original, restored in zip(self.company.trips, loaded.trips):
+            self.assertEqual(restored.get_passenger_ids(), original.get_passenger_ids())
+            self.assertEqual(restored.departure_time, original.departure_time)
+            self.assertEqual(restored.arrival_time, original.arrival_time)
+            self.assertAlmostEqual(restored.get_total_revenue(), original.get_total_revenue())
+        self.assertEqual(loaded.ledger.revenue_by_route(), self.company.ledger.revenue_by_route())
+
+        loaded.book_ticket(3, 1)
+        self.assertEqual(loaded.get_trip(3).get_passenger_ids(), [1])
+
+    def test_snapshot_errors(self):
+        """Тест 9: Снапшот с другой сигнатурой, версией или контрольной суммой не загружается"""
+        filename = self.path("company.snap")
+        self.company.save_to_snapshot(filename)
+        with open(filename, 'rb') as f:
+            data = f.read()
+
+        broken_cases = {
+            'сигнатура': b'NOTSNAP!' + data[8:],
+            'версия': data[:8] + (99).to_bytes(2, 'little') + data[10:],
+            'контрольная сумма': data[:-1] + bytes([data[-1] ^ 0xFF]),
+            'обрезанный файл': data[:len(data) // 2],
+        }
+        for case, content in broken_cases.items():
+            with self.subTest(case=case):
+                with open(filename, 'wb') as f:
+                    f.write(content)
+                loaded = make_company()
+                with self.assertRaises(InvalidDataException):
+                    loaded.load_from_snapshot(filename)
+                self.assertEqual(len(loaded.trips), 4)
+
+        with open(filename, 'wb'):
+            pass
+        with self.assertRaises(FileOperationException):
+            TransportCompany("").load_from_snapshot(filename)
+
+    @unittest.skipUnless(os.name == 'posix', "права файлов POSIX")
+    def test_file_mode(self):
+        """Тест 10: Новый файл получает права по umask, перезаписанный сохраняет свои"""
+        umask = os.umask(0o022)
+        try:
+            for save, name in ((self.company.save_to_json, "company.json"),
+                               (self.company.save_to_ndjson, "company.ndjson"),
+                               (self.company.save_to_xml, "company.xml"),
+                               (self.company.save_to_snapshot, "company.snap")):
+                with self.subTest(name=name):
+                    filename = self.path(name)
+                    save(filename)
+                    self.assertEqual(os.stat(filename).st_mode & 0o777, 0o644)
+                    os.chmod(filename, 0o640)
+                    save(filename)
+                    self.assertEqual(os.stat(filename).st_mode & 0o777, 0o640)
+        finally:
+            os.umask(umask)
+
+    def test_xml_old_layout(self):
+        """Тест 11: XML прежнего формата (без Category, со Status у транспорта) загружается со значениями по умолчанию"""
+        filename = self.path("old.xml")
+        with open(filename, 'w', encoding='utf-8') as f:
+            f.write('''<?xml version="1.0" ?>
+<TransportCompany name="Старый автопарк">
+  <Transports>
+    <Transport id="1" type="bus">
+      <Brand>ПАЗ</Brand>
+      <Model>3205</Model>
+      <Year>2015</Year>
+      <Capacity>40</Capacity>
+      <Status>Активен</Status>
+      <RouteNumber>21</RouteNumber>
+    </Transport>
+  </Transports>
+  <Employees>
+    <Employee id="1">
+      <Name>Иванов Иван</Name>
+      <Phone>+79990000001</Phone>
+      <Position>Водитель</Position>
+      <Salary>60000.0</Salary>
+    </Employee>
+  </Employees>
+  <Passengers>
+    <Passenger id="1">
+      <Name>Петрова Анна</Name>
+      <Phone>+79992222222</Phone>
+      <Email/>
+      <Discount>50.0</Discount>
+    </Passenger>
+  </Passengers>
+  <Routes>
+    <Route id="1">
+      <Number>21</Number>
+      <StartPoint>Вокзал</StartPoint>
+      <EndPoint>Центр</EndPoint>
+      <Distance>10.0</Distance>
+    </Route>
+  </Routes>
+  <Trips>
+    <Trip id="1">
+      <RouteId>1</RouteId>
+      <TransportId>1</TransportId>
+      <DriverId>1</DriverId>
+      <DepartureTime>2030-01-15T09:00:00</DepartureTime>
+      <ArrivalTime>2030-01-15T10:00:00</ArrivalTime>
+      <Fare>100</Fare>
+      <PassengerIds>
+        <PassengerId>1</PassengerId>
+      </PassengerIds>
+    </Trip>
+  </Trips>
+  <NextId>
+    <transport>2</transport>
+    <employee>2</employee>
+    <passenger>2</passenger>
+    <route>2</route>
+    <trip>2</trip>
+  </NextId>
+</TransportCompany>
+''')
+        loaded = TransportCompany("")
+        loaded.load_from_xml(filename)
+        passenger = loaded.get_passenger(1)
+        self.assertEqual((passenger.category, passenger.email, passenger.discount), ("взрослый", "", 50.0))
+        self.assertEqual(loaded.get_transport(1).route_number, "21")
+        self.assertEqual(loaded.get_trip(1).get_total_revenue(), 50.0)
+
+        # Обязательное поле не заменяется значением по умолчанию
+        with open(filename, encoding='utf-8') as f:
+            text = f.read()
+        with open(filename, 'w', encoding='utf-8') as f:
+            f.write(text.replace("<Name>Петрова Анна</Name>", ""))
+        with self.assertRaises(InvalidDataException):
+            TransportCompany("").load_from_xml(filename)
+
+
+class TestBookMany(unittest.TestCase):
+    """Тесты покупки группы билетов"""
+
+    def setUp(self):
+        """Подготовка перед каждым тестом: автобус на 3 места и рейс на нем"""
+        self.company = make_company()
+        self.company.add_transport(Bus(0, "ПАЗ", "3205", 2015, 3, "21"))
+        departure = datetime(2030, 2, 1, 9, 0)
+        self.company.add_trip(Trip(0, self.company.get_route(1), self.company.get_transport(4),
+                                   self.company.get_employee(1), departure, departure + timedelta(hours=1), 40))
+        self.company.add_passenger(Passenger(0, "Новиков Илья", "+79994444444", "", 25, "школьник"))
+
+    def test_atomic(self):
+        """Тест 1: Все билеты со стоимостью по льготам"""
+        prices = self.company.book_many([(1, 1), (1, 2), (1, 3), (2, 4), (5, 4)])
+        self.assertEqual(prices, [50, 25, 0, 37.5, 30])
+        self.assertEqual(self.company.get_trip(1).get_passenger_ids(), [1, 2, 3])
+        self.assertEqual(self.company.get_trip(1).get_total_revenue(), 75)
+        self.assertEqual(len(self.company.ledger), 5)
+
+    def test_atomic_rejects_whole_group(self):
+        """Тест 2: При любой ошибке не продается ни один билет"""
+        cases = [
+            ([(1, 1), (100, 1)], NotFoundException),
+            ([(1, 1), (1, 100)], NotFoundException),
+            ([(1, 1), (2, 2), (1, 1)], TransportException),
+            ([(5, 1), (5, 2), (5, 3), (5, 4)], TransportException),
+        ]
+        for bookings, error in cases:
+            with self.subTest(bookings=bookings):
+                with self.assertRaises(error):
+                    self.company.book_many(bookings)
+                self.assertEqual(sum(t.get_passenger_count() for t in self.company.trips), 0)
+                self.assertEqual(len(self.company.ledger), 0)
+
+    def test_partial(self):
+        """Тест 3: Без atomic продаются все возможные билеты, для остальных - причина"""
+        self.company.book_ticket(5, 4)
+        results = self.company.book_many([(5, 1), (5, 4), (100, 1), (5, 2), (5, 3), (1, 3)], atomic=False)
+
+        self.assertEqual(results[0], 40)
+        self.assertIsInstance(results[1], TransportException)
+        self.assertIsInstance(results[2], NotFoundException)
+        self.assertEqual(results[3], 20)
+        self.assertIsInstance(results[4], TransportException)
+        self.assertEqual(results[5], 0)
+        self.assertEqual(self.company.get_trip(5).get_passenger_ids(), [4, 1, 2])
+        self.assertEqual(len(self.company.ledger), 4)
+
+
+class TestTripAggregates(unittest.TestCase):
+    """Тесты агрегатов рейса"""
+
+    def setUp(self):
+        """Подготовка перед каждым тестом"""
+        self.company = make_company()
+        categories = ["взрослый", "студент", "пенсионер", "ребенок"]
+        for i in range(60):
+            self.company.add_passenger(Passenger(0, f"Пассажир {i}", f"+7900{i:07d}", "",
+                                                 [0, 25, 50, 100][i % 4], categories[i % 4]))
+        self.trip = self.company.trips[0]
+
+    def assertAggregatesMatch(self, trip):
+        """Агрегаты совпадают с полным пересчетом"""
+        passengers = trip.passengers
+        expected_revenue = sum(0 if p.discount == 100 else trip.fare * (1 - p.discount / 100)
+                               for p in passengers)
+        expected_counts = {}
+        for p in passengers:
+            expected_counts[p.category] = expected_counts.get(p.category, 0) + 1
+
+        self.assertAlmostEqual(trip.get_total_revenue(), expected_revenue, places=6)
+        self.assertEqual(trip.get_category_counts(), expected_counts)
+        self.assertEqual(trip.get_passenger_count(), len(passengers))
+        self.assertEqual(trip.get_free_seats(), trip.transport.capacity - len(passengers))
+        self.assertAlmostEqual(trip.get_occupancy(), len(passengers) / trip.transport.capacity)
+
+    def test_random_bookings(self):
+        """Тест 1: Случайные посадки и высадки"""
+        rnd = random.Random(42)
+        for _ in range(500):
+            passenger = rnd.choice(self.company.passengers)
+            if self.trip.has_passenger(passenger.id):
+                self.trip.remove_passenger(passenger.id)
+            else:
+                self.trip.add_passenger(passenger)
+        self.assertAggregatesMatch(self.trip)
+
+        for p in self.trip.passengers:
+            self.trip.remove_passenger(p.id)
+        self.assertAggregatesMatch(self.trip)
+        self.assertEqual(self.trip.get_total_revenue(), 0)
+
+    def test_booking_errors(self):
+        """Тест 2: Повторная посадка, переполнение и высадка отсутствующего пассажира"""
+        passenger = self.company.passengers[0]
+        self.trip.add_passenger(passenger)
+        with self.assertRaises(TransportException):
+            self.trip.add_passenger(passenger)
+
+        self.trip.remove_passenger(999)
+        self.assertEqual(self.trip.get_passenger_count(), 1)
+
+        small = Trip(0, self.company.routes[0], Bus(0, "ПАЗ", "3205", 2015, 2), self.company.employees[0],
+                     datetime(2030, 1, 1, 8, 0), datetime(2030, 1, 1, 9, 0), 30)
+        small.add_passenger(self.company.passengers[0])
+        small.add_passenger(self.company.passengers[1])
+        with self.assertRaises(TransportException):
+            small.add_passenger(self.company.passengers[2])
+        self.assertAggregatesMatch(small)
+
+    def test_immutable_inputs(self):
+        """Тест 3: Стоимость проезда, скидка и категория, от которых зависят агрегаты, не меняются"""
+        passenger = self.company.passengers[5]
+        self.trip.add_passenger(passenger)
+        with self.assertRaises(AttributeError):
+            self.trip.fare = 1000
+        with self.assertRaises(AttributeError):
+            passenger.discount = 0
+        with self.assertRaises(AttributeError):
+            passenger.category = "взрослый"
+        self.assertAggregatesMatch(self.trip)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,151 @@
+"""
+Генерация расписания рейсов по интервалу движения
+
+Timetable описывает движение по маршруту: первый и последний рейс дня, интервал
+между рейсами, дни работы (ServiceCalendar) и время в пути по времени суток
+(TravelTimeProfile). generate создает все рейсы сразу; добавлять их в компанию
+следует одним вызовом TransportCompany.add_trips.
+"""
+
+from datetime import date, datetime, time, timedelta
+from typing import Iterable, Iterator, List, Optional, Sequence, Tuple
+from models import Transport, Employee, Route, Trip
+from exceptions import InvalidDataException
+
+MINUTES_PER_DAY = 24 * 60
+AVERAGE_SPEED = 40  # км/ч, как при создании рейса из меню
+
+
+def _minute_of_day(value: time) -> int:
+    return value.hour * 60 + value.minute
+
+
+class TravelTimeProfile:
+    """
+    Время в пути в зависимости от времени отправления
+
+    Заранее рассчитывается на каждую минуту суток, поэтому получение времени
+    для рейса - одно обращение к списку.
+    """
+
+    def __init__(self, default: timedelta, periods: Iterable[Tuple[time, time, timedelta]] = ()):
+        """
+        Args:
+            default: время в пути вне указанных периодов
+            periods: (начало, конец, время в пути) для отправлений в [начало, конец)
+        """
+        if default <= timedelta(0):
+            raise InvalidDataException("Время в пути должно быть положительным")
+        self._by_minute = [default] * MINUTES_PER_DAY
+        for start, end, duration in periods:
+            if duration <= timedelta(0):
+                raise InvalidDataException("Время в пути должно быть положительным")
+            for minute in range(_minute_of_day(start), _minute_of_day(end)):
+                self._by_minute[minute] = duration
+
+    @classmethod
+    def from_speed(cls, distance: float, speed: float = AVERAGE_SPEED,
+                   periods: Iterable[Tuple[time, time, float]] = ()) -> 'TravelTimeProfile':
+        """Профиль по длине маршрута (км) и средней скорости (км/ч), в периоды - своя скорость"""
+        return cls(timedelta(hours=distance / speed),
+                   [(start, end, timedelta(hours=distance / period_speed)) for start, end, period_speed in periods])
+
+    def travel_time(self, departure: time) -> timedelta:
+        """Время в пути для отправления в заданное время суток"""
+        return self._by_minute[_minute_of_day(departure)]
+
+
+class ServiceCalendar:
+    """Дни работы расписания: период, дни недели и исключения"""
+
+    WEEKDAYS = (0, 1, 2, 3, 4)
+    WEEKEND = (5, 6)
+
+    def __init__(self, start_date: date, end_date: date, weekdays: Iterable[int] = range(7),
+                 excluded: Iterable[date] = (), added: Iterable[date] = ()):
+        """
+        Args:
+            start_date: первый день периода
+            end_date: последний день периода (включительно)
+            weekdays: дни недели работы (0 - понедельник)
+            excluded: дни без движения (например, праздники)
+            added: дополнительные дни движения вне дней недели
+        """
+        if start_date > end_date:
+            raise InvalidDataException("Начало периода должно быть не позже конца")
+        self.start_date = start_date
+        self.end_date = end_date
+        self.weekdays = frozenset(weekdays)
+        self.excluded = frozenset(excluded)
+        self.added = frozenset(added)
+
+    def dates(self) -> Iterator[date]:
+        """Дни движения по порядку"""
+        day = self.start_date
+        while day <= self.end_date:
+            if day not in self.excluded and (day.weekday() in self.weekdays or day in self.added):
+                yield day
+            day += timedelta(days=1)
+
+
+class Timetable:
+    """Расписание маршрута с постоянным интервалом движения"""
+
+    def __init__(self, route: Route, calendar: ServiceCalendar, first_departure: time, last_departure: time,
+                 headway: timedelta, fare: float, profile: Optional[TravelTimeProfile] = None):
+        """
+        Args:
+            route: маршрут
+            calendar: дни движения
+            first_departure: отправление первого рейса дня
+            last_departure: последнее возможное отправление (раньше первого - следующие сутки)
+            headway: интервал между отправлениями
+            fare: стоимость проезда
+            profile: время в пути (по умолчанию - по длине маршрута и средней скорости)
+        """
+        if headway <= timedelta(0):
+            raise InvalidDataException("Интервал движения должен быть положительным")
+        if fare < 0:
+            raise InvalidDataException("Стоимость проезда не может быть отрицательной")
+        self.route = route
+        self.calendar = calendar
+        self.first_departure = first_departure
+        self.last_departure = last_departure
+        self.headway = headway
+        self.fare = fare
+        self.profile = profile or TravelTimeProfile.from_speed(route.distance)
+
+    def day_schedule(self) -> List[Tuple[timedelta, timedelta]]:
+        """(отправление, прибытие) рейсов одного дня относительно полуночи"""
+        first = timedelta(minutes=_minute_of_day(self.first_departure))
+        last = timedelta(minutes=_minute_of_day(self.last_departure))
+        if last < first:
+            last += timedelta(days=1)
+        schedule = []
+        departure = first
+        while departure <= last:
+            travel_time = self.profile.travel_time((datetime.min + departure).time())
+            schedule.append((departure, departure + travel_time))
+            departure += self.headway
+        return schedule
+
+    def generate(self, vehicles: Sequence[Transport], drivers: Sequence[Employee]) -> List[Trip]:
+        """
+        Рейсы на все дни календаря; транспорт и водители назначаются по кругу
+
+        Пул должен покрывать оборот маршрута (время в пути / интервал), иначе
+        рейсы одного транспорта пересекутся (см. TransportCompany.schedule_conflicts).
+        """
+        if not vehicles or not drivers:
+            raise InvalidDataException("Нужны транспорт и водители для рейсов")
+        schedule = self.day_schedule()
+        route, fare = self.route, self.fare
+        trips = []
+        number = 0
+        for day in self.calendar.dates():
+            midnight = datetime.combine(day, time())
+            for departure, arrival in schedule:
+                trips.append(Trip(0, route, vehicles[number % len(vehicles)], drivers[number % len(drivers)],
+                                  midnight + departure, midnight + arrival, fare))
+                number += 1
+        return trips
@@ -1,10 +1,21 @@
-from typing import List, Optional, Dict
-from datetime import datetime
-from models import Transport, Bus, Tram, Employee, Passenger, Route, Trip
-from exceptions import NotFoundException, InvalidDataException
+from typing import List, Optional, Dict, Tuple
+from datetime import datetime, time, timedelta
+from itertools import islice
+from models import Transport, Employee, Passenger, Route, Trip
+from exceptions import (TransportException, NotFoundException, InvalidDataException, FileOperationException,
+                        ScheduleConflictException)
+from indexes import HashIndex, SortedIndex, IntervalIndex
+from ledger import TicketLedger
+from storage import (SECTIONS, NDJSON_FORMAT, NDJSON_VERSION, RECORD_BUILDERS, BulkLoader, transport_type,
+                     iter_section, read_ndjson, atomic_write, paused_gc)
 import json
+import struct
 import xml.etree.ElementTree as ET
-from xml.dom import minidom
+from xml_storage import write_xml, XmlReader
+from snapshot import write_snapshot, read_snapshot
+
+# Суффиксы условий в query(): capacity__gte=80, status__in=[...]
+QUERY_LOOKUPS = ('exact', 'gte', 'gt', 'lte', 'lt', 'in')
 
 
 class TransportCompany:
@@ -18,6 +29,45 @@ class TransportCompany:
         self.routes: List[Route] = []
         self.trips: List[Trip] = []
 
+        # Индексы по первичному ключу (и по номеру маршрута)
+        self._transports_by_id: Dict[int, Transport] = {}
+        self._employees_by_id: Dict[int, Employee] = {}
+        self._passengers_by_id: Dict[int, Passenger] = {}
+        self._routes_by_id: Dict[int, Route] = {}
+        self._routes_by_number: Dict[str, Route] = {}
+        self._trips_by_id: Dict[int, Trip] = {}
+
+        # Вторичные индексы по атрибутам
+        self._transport_indexes = {
+            'status': HashIndex(lambda t: t.status),
+            'type': HashIndex(transport_type),
+            'year': SortedIndex(lambda t: t.year),
+            'capacity': SortedIndex(lambda t: t.capacity),
+        }
+        self._employee_indexes = {
+            'position': HashIndex(lambda e: e.position),
+        }
+
+        # Рейсы, упорядоченные по времени отправления: общий индекс и по маршрутам
+        self._trip_time_index = SortedIndex(lambda t: t.departure_time)
+        self._trip_time_by_route: Dict[int, SortedIndex] = {}
+        # ... и по паре (начальная точка, конечная точка) маршрута
+        self._trip_time_by_stops: Dict[Tuple[str, str], SortedIndex] = {}
+
+        # Интервалы [отправление, прибытие) рейсов по транспорту и по водителю для поиска накладок
+        self._trip_intervals = {
+            'transport': IntervalIndex(lambda t: t.transport.id, lambda t: t.departure_time, lambda t: t.arrival_time),
+            'driver': IntervalIndex(lambda t: t.driver.id, lambda t: t.departure_time, lambda t: t.arrival_time),
+        }
+
+        # Журнал проданных билетов для отчетов
+        self.ledger = TicketLedger()
+
+        # Журнал изменений (journal.Journal), если подключен
+        self.journal = None
+        # Материализованные отчеты (report_views.ReportViews), если подключены
+        self.views = None
+
         self._next_id = {
             'transport': 1,
             'employee': 1,
@@ -32,30 +82,216 @@ class TransportCompany:
         self._next_id[entity_type] = current + 1
         return current
 
+    def _reserve_ids(self, entity_type: str, count: int) -> range:
+        """Резервирование блока из count последовательных ID для сущности"""
+        first = self._next_id.get(entity_type, 1)
+        self._next_id[entity_type] = first + count
+        return range(first, first + count)
+
+    def _assign_ids(self, entity_type: str, objects: list):
+        """Назначение ID новым объектам (id == 0) из одного зарезервированного блока"""
+        new_objects = [obj for obj in objects if obj.id == 0]
+        for obj, obj_id in zip(new_objects, self._reserve_ids(entity_type, len(new_objects))):
+            obj.id = obj_id
+
+    def _log(self, *record):
+        """Запись изменения в журнал, если он подключен"""
+        if self.journal is not None:
+            self.journal.append(record)
+
+    def _log_added(self, section: str, obj):
+        """Запись о добавлении объекта (запись объекта создается, только если журнал подключен)"""
+        if self.journal is not None:
+            self.journal.append(('add', section, RECORD_BUILDERS[section](obj)))
+
+    def _notify(self, event: str, *args):
+        """Передача события подключенным отчетам"""
+        if self.views is not None:
+            getattr(self.views, event)(*args)
+
+    def _rebuild_indexes(self):
+        """Перестроение индексов по текущим спискам"""
+        self._transports_by_id = {t.id: t for t in self.transports}
+        self._employees_by_id = {e.id: e for e in self.employees}
+        self._passengers_by_id = {p.id: p for p in self.passengers}
+        self._routes_by_id = {r.id: r for r in self.routes}
+        self._routes_by_number = {}
+        for r in self.routes:
+            self._routes_by_number.setdefault(r.number, r)
+        self._trips_by_id = {t.id: t for t in self.trips}
+
+        for index in self._transport_indexes.values():
+            index.rebuild(self.transports)
+        for index in self._employee_indexes.values():
+            index.rebuild(self.employees)
+        for t in self.transports:
+            t._listener = self._on_transport_changed
+
+        self._trip_time_index.rebuild(self.trips)
+        self._trip_time_by_route = self._group_trip_time_index(lambda t: t.route.id)
+        self._trip_time_by_stops = self._group_trip_time_index(self._trip_stops)
+        for index in self._trip_intervals.values():
+            index.rebuild(self.trips)
+
+    def _group_trip_time_index(self, group_key) -> Dict:
+        """Индексы времени отправления по группам рейсов"""
+        groups: Dict = {}
+        for t in self.trips:
+            groups.setdefault(group_key(t), []).append(t)
+        indexes = {}
+        for key, trips in groups.items():
+            indexes[key] = SortedIndex(self._trip_time_index.key)
+            indexes[key].rebuild(trips)
+        return indexes
+
+    @staticmethod
+    def _trip_stops(trip: Trip) -> Tuple[str, str]:
+        return trip.route.start_point, trip.route.end_point
+
+    def _on_transport_changed(self, transport: Transport, field: str, old_value):
+        """Обновление индекса поля при изменении статуса, года выпуска или вместимости транспорта"""
+        index = self._transport_indexes[field]
+        index.remove(transport, old_value)
+        index.add(transport)
+        if field == 'status':
+            self._log('status', transport.id, transport.status)
+
+    @staticmethod
+    def _objects_by_ids(objects_by_id: Dict[int, object], ids) -> list:
+        """Объекты по множеству ID в порядке возрастания ID"""
+        return [objects_by_id[i] for i in sorted(ids)]
+
+    def _entity_storage(self, model: type):
+        """Индекс по ID и вторичные индексы для класса модели"""
+        if issubclass(model, Transport):
+            return self._transports_by_id, self._transport_indexes
+        if issubclass(model, Employee):
+            return self._employees_by_id, self._employee_indexes
+        if issubclass(model, Passenger):
+            return self._passengers_by_id, {}
+        if issubclass(model, Route):
+            return self._routes_by_id, {}
+        if issubclass(model, Trip):
+            return self._trips_by_id, {}
+        raise InvalidDataException(f"Поиск по {model.__name__} не поддерживается")
+
+    @staticmethod
+    def _index_lookup(index, lookup: str, value):
+        """Множество ID по условию через индекс (None, если индекс условие не поддерживает)"""
+        if lookup == 'exact':
+            return set(index.get(value))
+        if lookup == 'in':
+            return set().union(*(index.get(v) for v in value))
+        if not isinstance(index, SortedIndex):
+            return None
+        if lookup == 'gte':
+            return set(index.range(low=value))
+        if lookup == 'gt':
+            return set(index.range(low=value, include_low=False))
+        if lookup == 'lte':
+            return set(index.range(high=value))
+        return set(index.range(high=value, include_high=False))
+
+    @staticmethod
+    def _matches(obj, field: str, lookup: str, value) -> bool:
+        """Проверка условия без индекса"""
+        actual = getattr(obj, field)
+        if lookup == 'exact':
+            return actual == value
+        if lookup == 'in':
+            return actual in value
+        if lookup == 'gte':
+            return actual >= value
+        if lookup == 'gt':
+            return actual > value
+        if lookup == 'lte':
+            return actual <= value
+        return actual < value
+
+    def query(self, model: type, **filters) -> list:
+        """
+        Поиск объектов по атрибутам
+
+        Пример: company.query(Transport, status=Transport.STATUS_ACTIVE, capacity__gte=80)
+
+        Условия по индексированным полям вычисляются пересечением множеств ID,
+        остальные проверяются только для отобранных кандидатов.
+        Результат упорядочен по ID.
+        Для подклассов транспорта (Bus, Tram, Trolleybus) тип добавляется автоматически.
+        """
+        objects_by_id, indexes = self._entity_storage(model)
+        if issubclass(model, Transport) and model is not Transport:
+            filters.setdefault('type', model.__name__.lower())
+
+        id_sets = []
+        residual = []
+        for name, value in filters.items():
+            field, _, lookup = name.partition('__')
+            lookup = lookup or 'exact'
+            if lookup not in QUERY_LOOKUPS:
+                raise InvalidDataException(f"Неизвестное условие поиска: {name}")
+
+            index = indexes.get(field)
+            ids = self._index_lookup(index, lookup, value) if index else None
+            if ids is None:
+                residual.append((field, lookup, value))
+            else:
+                id_sets.append(ids)
+
+        if id_sets:
+            id_sets.sort(key=len)
+            candidates = self._objects_by_ids(objects_by_id, set.intersection(*id_sets))
+        else:
+            candidates = self._objects_by_ids(objects_by_id, objects_by_id.keys())
+
+        return [obj for obj in candidates
+                if all(self._matches(obj, field, lookup, value) for field, lookup, value in residual)]
+
     # Транспорт
     def add_transport(self, transport: Transport):
         """Добавление транспорта"""
         if transport.id == 0:
             transport.id = self._get_next_id('transport')
         self.transports.append(transport)
+        self._transports_by_id[transport.id] = transport
+        for index in self._transport_indexes.values():
+            index.add(transport)
+        transport._listener = self._on_transport_changed
+        self._log_added('transports', transport)
+
+    def add_transports(self, transports: List[Transport]):
+        """Добавление многих транспортных средств: ID одним блоком, индексы одним проходом"""
+        transports = list(transports)
+        self._assign_ids('transport', transports)
+        self.transports.extend(transports)
+        self._transports_by_id.update((t.id, t) for t in transports)
+        for index in self._transport_indexes.values():
+            index.add_many(transports)
+        for transport in transports:
+            transport._listener = self._on_transport_changed
+            self._log_added('transports', transport)
 
     def get_transport(self, transport_id: int) -> Optional[Transport]:
         """Получение транспорта по ID"""
-        for t in self.transports:
-            if t.id == transport_id:
-                return t
-        return None
+        return self._transports_by_id.get(transport_id)
 
     def remove_transport(self, transport_id: int):
-        """Удаление транспорта"""
-        transport = self.get_transport(transport_id)
+        """Удаление транспорта (транспорт, назначенный на рейсы, удалить нельзя)"""
+        transport = self._transports_by_id.get(transport_id)
         if not transport:
             raise NotFoundException(f"Транспорт с ID {transport_id} не найден")
+        if transport_id in self._trip_intervals['transport'].keys():
+            raise TransportException(f"Транспорт с ID {transport_id} назначен на рейсы")
+        del self._transports_by_id[transport_id]
         self.transports.remove(transport)
+        for index in self._transport_indexes.values():
+            index.remove(transport)
+        transport._listener = None
+        self._log('remove_transport', transport_id)
 
     def get_active_transports(self) -> List[Transport]:
         """Получение активного транспорта"""
-        return [t for t in self.transports if t.status == Transport.STATUS_ACTIVE]
+        return self.query(Transport, status=Transport.STATUS_ACTIVE)
 
     # Сотрудники
     def add_employee(self, employee: Employee):
@@ -63,17 +299,34 @@ class TransportCompany:
         if employee.id == 0:
             employee.id = self._get_next_id('employee')
         self.employees.append(employee)
+        self._employees_by_id[employee.id] = employee
+        for index in self._employee_indexes.values():
+            index.add(employee)
+        self._log_added('employees', employee)
+
+    def add_employees(self, employees: List[Employee]):
+        """Добавление многих сотрудников: ID одним блоком, индексы одним проходом"""
+        employees = list(employees)
+        self._assign_ids('employee', employees)
+        self.employees.extend(employees)
+        self._employees_by_id.update((e.id, e) for e in employees)
+        for index in self._employee_indexes.values():
+            index.add_many(employees)
+        for employee in employees:
+            self._log_added('employees', employee)
 
     def get_employee(self, employee_id: int) -> Optional[Employee]:
         """Получение сотрудника по ID"""
-        for e in self.employees:
-            if e.id == employee_id:
-                return e
-        return None
+        return self._employees_by_id.get(employee_id)
 
     def get_drivers(self) -> List[Employee]:
         """Получение водителей"""
-        return [e for e in self.employees if 'водитель' in e.position.lower()]
+        position_index = self._employee_indexes['position']
+        ids = set()
+        for position in position_index.keys():
+            if 'водитель' in position.lower():
+                ids |= position_index.get(position)
+        return self._objects_by_ids(self._employees_by_id, ids)
 
     # Пассажиры
     def add_passenger(self, passenger: Passenger):
@@ -81,13 +334,22 @@ class TransportCompany:
         if passenger.id == 0:
             passenger.id = self._get_next_id('passenger')
         self.passengers.append(passenger)
+        self._passengers_by_id[passenger.id] = passenger
+        self._log_added('passengers', passenger)
+
+    def add_passengers(self, passengers: List[Passenger]):
+        """Добавление многих пассажиров: ID одним блоком"""
+        passengers = list(passengers)
+        self._assign_ids('passenger', passengers)
+        self.passengers.extend(passengers)
+        self._passengers_by_id.update((p.id, p) for p in passengers)
+        if self.journal is not None:
+            for passenger in passengers:
+                self._log_added('passengers', passenger)
 
     def get_passenger(self, passenger_id: int) -> Optional[Passenger]:
         """Получение пассажира по ID"""
-        for p in self.passengers:
-            if p.id == passenger_id:
-                return p
-        return None
+        return self._passengers_by_id.get(passenger_id)
 
     # Маршруты
     def add_route(self, route: Route):
@@ -95,266 +357,419 @@ class TransportCompany:
         if route.id == 0:
             route.id = self._get_next_id('route')
         self.routes.append(route)
+        self._routes_by_id[route.id] = route
+        # При совпадении номеров находится первый добавленный маршрут
+        self._routes_by_number.setdefault(route.number, route)
+        self._log_added('routes', route)
+
+    def add_routes(self, routes: List[Route]):
+        """Добавление многих маршрутов: ID одним блоком"""
+        routes = list(routes)
+        self._assign_ids('route', routes)
+        self.routes.extend(routes)
+        self._routes_by_id.update((r.id, r) for r in routes)
+        for route in routes:
+            self._routes_by_number.setdefault(route.number, route)
+            self._log_added('routes', route)
 
     def get_route(self, route_id: int) -> Optional[Route]:
         """Получение маршрута по ID"""
-        for r in self.routes:
-            if r.id == route_id:
-                return r
-        return None
+        return self._routes_by_id.get(route_id)
 
     def get_route_by_number(self, number: str) -> Optional[Route]:
         """Получение маршрута по номеру"""
-        for r in self.routes:
-            if r.number == number:
-                return r
-        return None
+        return self._routes_by_number.get(number)
 
     # Рейсы
-    def add_trip(self, trip: Trip):
-        """Добавление рейса"""
+    def add_trip(self, trip: Trip, allow_conflicts: bool = True):
+        """
+        Добавление рейса
+
+        При allow_conflicts=False рейс, пересекающийся по времени с другим рейсом
+        того же транспорта или водителя, не добавляется (ScheduleConflictException).
+        """
+        if not allow_conflicts:
+            conflicts = self.find_trip_conflicts(trip)
+            if conflicts:
+                ids = ', '.join(str(t.id) for t in conflicts)
+                raise ScheduleConflictException(f"Транспорт или водитель уже заняты на рейсах: {ids}")
         if trip.id == 0:
             trip.id = self._get_next_id('trip')
         self.trips.append(trip)
+        self._trips_by_id[trip.id] = trip
+        self._trip_time_index.add(trip)
+        for indexes, key in ((self._trip_time_by_route, trip.route.id),
+                             (self._trip_time_by_stops, self._trip_stops(trip))):
+            index = indexes.get(key)
+            if index is None:
+                index = indexes[key] = SortedIndex(self._trip_time_index.key)
+            index.add(trip)
+        for index in self._trip_intervals.values():
+            index.add(trip)
+        self._record_trip_tickets(trip)
+        self._log_added('trips', trip)
+        self._notify('trip_added', trip)
+
+    def add_trips(self, trips: List[Trip]):
+        """
+        Добавление многих рейсов сразу (например, сгенерированных по расписанию)
+
+        ID новым рейсам выдаются одним блоком, индексы обновляются по группам одной
+        сортировкой вместо вставки каждого рейса. Накладки не проверяются
+        (их можно найти через schedule_conflicts).
+        """
+        trips = list(trips)
+        self._assign_ids('trip', trips)
+        self.trips.extend(trips)
+        self._trips_by_id.update((t.id, t) for t in trips)
+        self._trip_time_index.add_many(trips)
+        for indexes, group_key in ((self._trip_time_by_route, lambda t: t.route.id),
+                                   (self._trip_time_by_stops, self._trip_stops)):
+            groups: Dict = {}
+            for t in trips:
+                groups.setdefault(group_key(t), []).append(t)
+            for key, group in groups.items():
+                index = indexes.get(key)
+                if index is None:
+                    index = indexes[key] = SortedIndex(self._trip_time_index.key)
+                index.add_many(group)
+        for index in self._trip_intervals.values():
+            index.add_many(trips)
+        for trip in trips:
+            self._record_trip_tickets(trip)
+            self._log_added('trips', trip)
+            self._notify('trip_added', trip)
+
+    def _record_trip_tickets(self, trip: Trip):
+        """Запись в журнал билетов пассажиров, уже посаженных на добавляемый рейс (например, при повторении журнала)"""
+        if trip.get_passenger_count():
+            passengers = trip.passengers
+            self.ledger.record_many(trip, passengers, [trip.ticket_price(p) for p in passengers])
+
+    def reassign_trip(self, trip_id: int, transport_id: int, driver_id: int):
+        """Смена транспорта и водителя рейса"""
+        trip = self.get_trip(trip_id)
+        if not trip:
+            raise NotFoundException(f"Рейс с ID {trip_id} не найден")
+        transport = self.get_transport(transport_id)
+        if not transport:
+            raise NotFoundException(f"Транспорт с ID {transport_id} не найден")
+        driver = self.get_employee(driver_id)
+        if not driver:
+            raise NotFoundException(f"Сотрудник с ID {driver_id} не найден")
+        if trip.get_passenger_count() > transport.capacity:
+            raise TransportException("Вместимость транспорта меньше числа пассажиров рейса")
+
+        for index in self._trip_intervals.values():
+            index.remove(trip)
+        old_transport = trip.transport
+        trip.transport = transport
+        trip.driver = driver
+        for index in self._trip_intervals.values():
+            index.add(trip)
+        self._log('assign', trip_id, transport_id, driver_id)
+        self._notify('trip_reassigned', trip, old_transport)
+
+    def get_trip(self, trip_id: int) -> Optional[Trip]:
+        """Получение рейса по ID"""
+        return self._trips_by_id.get(trip_id)
+
+    def find_trip_conflicts(self, trip: Trip) -> List[Trip]:
+        """Рейсы того же транспорта или водителя, пересекающиеся по времени с trip, по времени отправления"""
+        ids = set()
+        for index in self._trip_intervals.values():
+            ids.update(index.overlapping(index.group(trip), trip.departure_time, trip.arrival_time))
+        ids.discard(trip.id)
+        return sorted((self._trips_by_id[i] for i in ids), key=lambda t: (t.departure_time, t.id))
+
+    def schedule_conflicts(self) -> List[Tuple[str, Trip, Trip]]:
+        """
+        Все накладки в расписании: ('transport' или 'driver', более ранний рейс, более поздний рейс)
+
+        Пары ищутся проходом по интервалам каждого транспорта и водителя за O(n log n + число пар).
+        """
+        trips = self._trips_by_id
+        return [(name, trips[first], trips[second])
+                for name, index in self._trip_intervals.items()
+                for _, first, second in index.conflicts()]
+
+    def _trip_time_index_for(self, route_id: Optional[int]) -> Optional[SortedIndex]:
+        """Индекс времени отправления: общий или по маршруту"""
+        if route_id is None:
+            return self._trip_time_index
+        return self._trip_time_by_route.get(route_id)
+
+    def trips_between(self, start: datetime, end: datetime, route_id: Optional[int] = None) -> List[Trip]:
+        """Рейсы с отправлением в интервале [start, end), упорядоченные по времени отправления"""
+        index = self._trip_time_index_for(route_id)
+        if index is None:
+            return []
+        ids = index.range(start, end, include_high=False)
+        return [self._trips_by_id[i] for i in ids]
+
+    def upcoming_trips(self, now: datetime, limit: Optional[int] = None,
+                       route_id: Optional[int] = None) -> List[Trip]:
+        """Ближайшие рейсы с отправлением позже now (не более limit)"""
+        index = self._trip_time_index_for(route_id)
+        if index is None:
+            return []
+        ids = islice(index.range(now, include_low=False), limit)
+        return [self._trips_by_id[i] for i in ids]
+
+    def trips_page(self, offset: int, limit: int) -> List[Trip]:
+        """Рейсы с позиции offset (не более limit) в порядке отправления"""
+        return [self._trips_by_id[i] for i in self._trip_time_index.page(offset, limit)]
+
+    def count_trips_before(self, moment: datetime) -> int:
+        """Количество рейсов с отправлением раньше moment (позиция первого рейса не раньше moment)"""
+        return self._trip_time_index.rank(moment)
+
+    def search_trips(self, start_point: str, end_point: str, departure_from: datetime,
+                     departure_to: Optional[datetime] = None, min_free_seats: int = 1,
+                     limit: Optional[int] = None) -> List[Trip]:
+        """
+        Рейсы из start_point в end_point с отправлением в [departure_from, departure_to)
+        и не менее min_free_seats свободными местами, упорядоченные по времени отправления
+
+        Рейсы отбираются по индексу пары точек и времени отправления, свободные места
+        считаются по текущему числу пассажиров рейса.
+        """
+        index = self._trip_time_by_stops.get((start_point, end_point))
+        if index is None:
+            return []
+        trips = (self._trips_by_id[i] for i in index.range(departure_from, departure_to, include_high=False))
+        return list(islice((t for t in trips if t.get_free_seats() >= min_free_seats), limit))
+
+    # Билеты
+    def book_ticket(self, trip_id: int, passenger_id: int) -> float:
+        """Покупка билета: посадка пассажира на рейс и запись в журнал. Возвращает стоимость"""
+        trip = self.get_trip(trip_id)
+        if not trip:
+            raise NotFoundException(f"Рейс с ID {trip_id} не найден")
+        passenger = self.get_passenger(passenger_id)
+        if not passenger:
+            raise NotFoundException(f"Пассажир с ID {passenger_id} не найден")
+
+        trip.add_passenger(passenger)
+        price = trip.ticket_price(passenger)
+        self._ticket_booked(trip, passenger, price)
+        return price
+
+    def book_many(self, bookings: List[Tuple[int, int]], atomic: bool = True) -> list:
+        """
+        Покупка группы билетов
+
+        Args:
+            bookings: пары (ID рейса, ID пассажира)
+            atomic: True - все билеты или ни одного (первая ошибка выбрасывается до изменений),
+                False - продаются все возможные билеты
+
+        Returns:
+            list: для каждой пары стоимость билета, а при atomic=False на месте
+            непроданного билета - исключение с причиной
+        """
+        results: list = [None] * len(bookings)
+        # ID рейса -> {ID пассажира: позиция в bookings} в порядке запроса
+        accepted: Dict[int, Dict[int, int]] = {}
+        trips_by_id, passengers_by_id = self._trips_by_id, self._passengers_by_id
+
+        # Проверка ссылок и повторных покупок, группировка по рейсам
+        for pos, (trip_id, passenger_id) in enumerate(bookings):
+            trip = trips_by_id.get(trip_id)
+            group = accepted.get(trip_id)
+            if trip is None:
+                error = NotFoundException(f"Рейс с ID {trip_id} не найден")
+            elif passenger_id not in passengers_by_id:
+                error = NotFoundException(f"Пассажир с ID {passenger_id} не найден")
+            elif trip.has_passenger(passenger_id) or (group is not None and passenger_id in group):
+                error = TransportException("Пассажир уже зарегистрирован на этот рейс")
+            else:
+                if group is None:
+                    group = accepted[trip_id] = {}
+                group[passenger_id] = pos
+                continue
+            if atomic:
+                raise error
+            results[pos] = error
+
+        # Проверка вместимости: один раз на рейс
+        for trip_id, group in accepted.items():
+            free = trips_by_id[trip_id].get_free_seats()
+            if len(group) > free:
+                if atomic:
+                    raise TransportException(f"На рейсе {trip_id} свободно мест: {free}, запрошено: {len(group)}")
+                for passenger_id in list(group)[free:]:
+                    results[group.pop(passenger_id)] = TransportException(
+                        "Транспорт заполнен, нельзя добавить больше пассажиров")
+
+        for trip_id, group in accepted.items():
+            trip = trips_by_id[trip_id]
+            passengers = [passengers_by_id[passenger_id] for passenger_id in group]
+            trip.add_passengers(passengers)
+            prices = [trip.ticket_price(p) for p in passengers]
+            for pos, price in zip(group.values(), prices):
+                results[pos] = price
+            self.ledger.record_many(trip, passengers, prices)
+            self._notify('tickets_booked', trip, passengers, prices)
+            if self.journal is not None:
+                for p in passengers:
+                    self._log('book', trip_id, p.id)
+        return results
+
+    def cancel_ticket(self, trip_id: int, passenger_id: int):
+        """Возврат билета"""
+        trip = self.get_trip(trip_id)
+        if not trip or not trip.has_passenger(passenger_id):
+            raise NotFoundException(f"Билет пассажира {passenger_id} на рейс {trip_id} не найден")
+        passenger = trip.remove_passenger(passenger_id)
+        self._ticket_cancelled(trip, passenger)
+
+    def _ticket_booked(self, trip: Trip, passenger: Passenger, price: float):
+        """Учет проданного билета в журнале билетов, журнале изменений и отчетах"""
+        self.ledger.record(trip, passenger, price)
+        self._log('book', trip.id, passenger.id)
+        self._notify('ticket_booked', trip, passenger, price)
+
+    def _ticket_cancelled(self, trip: Trip, passenger: Passenger):
+        """Учет возврата билета в журнале билетов, журнале изменений и отчетах"""
+        self.ledger.cancel(trip.id, passenger.id)
+        self._log('cancel', trip.id, passenger.id)
+        self._notify('ticket_cancelled', trip, passenger, trip.ticket_price(passenger))
 
     def get_trips_by_date(self, date: datetime.date) -> List[Trip]:
         """Получение рейсов по дате"""
-        return [t for t in self.trips if t.departure_time.date() == date]
+        start = datetime.combine(date, time.min)
+        return self.trips_between(start, start + timedelta(days=1))
 
     def get_trips_by_route(self, route_id: int) -> List[Trip]:
         """Получение рейсов по маршруту"""
-        return [t for t in self.trips if t.route.id == route_id]
+        index = self._trip_time_by_route.get(route_id)
+        if index is None:
+            return []
+        return [self._trips_by_id[i] for i in index.range()]
 
     # Сохранение/загрузка данных
-    def save_to_json(self, filename: str):
-        """Сохранение данных в JSON"""
-        data = {
+    def save_to_json(self, filename: str, indent: Optional[int] = 2):
+        """Сохранение данных в JSON (indent=None - без форматирования, файл компактнее)"""
+        data = {'company_name': self.name}
+        for section in SECTIONS:
+            data[section] = list(iter_section(self, section))
+        data['next_id'] = self._next_id
+
+        separators = (',', ':') if indent is None else None
+        try:
+            with atomic_write(filename) as f:
+                json.dump(data, f, ensure_ascii=False, indent=indent, separators=separators)
+        except Exception as e:
+            raise FileOperationException(f"Ошибка сохранения в JSON: {e}")
+
+    def save_to_ndjson(self, filename: str, indent: Optional[int] = None):
+        """
+        Потоковое сохранение в NDJSON: по одной записи на строку, секциями по типам объектов
+
+        Первая строка - заголовок с названием компании и счетчиками ID,
+        перед записями каждой секции идет строка {"section": ...}.
+        Записи создаются по одной прямо из объектов, поэтому дополнительная память не растет
+        с размером компании. indent форматирует каждую запись отдельно (для отладки).
+        """
+        separators = (',', ':') if indent is None else None
+        encode = json.JSONEncoder(ensure_ascii=False, indent=indent, separators=separators).encode
+        header = {
+            'format': NDJSON_FORMAT,
+            'version': NDJSON_VERSION,
             'company_name': self.name,
-            'transports': [
-                {
-                    'id': t.id,
-                    'type': 'bus' if isinstance(t, Bus) else 'tram',
-                    'brand': t.brand,
-                    'model': t.model,
-                    'year': t.year,
-                    'capacity': t.capacity,
-                    'status': t.status,
-                    'route_number': getattr(t, 'route_number', ''),
-                    'line_number': getattr(t, 'line_number', '')
-                } for t in self.transports
-            ],
-            'employees': [
-                {
-                    'id': e.id,
-                    'name': e.name,
-                    'phone': e.phone,
-                    'position': e.position,
-                    'salary': e.salary
-                } for e in self.employees
-            ],
-            'passengers': [
-                {
-                    'id': p.id,
-                    'name': p.name,
-                    'phone': p.phone,
-                    'email': p.email,
-                    'discount': p.discount
-                } for p in self.passengers
-            ],
-            'routes': [
-                {
-                    'id': r.id,
-                    'number': r.number,
-                    'start_point': r.start_point,
-                    'end_point': r.end_point,
-                    'distance': r.distance
-                } for r in self.routes
-            ],
-            'trips': [
-                {
-                    'id': t.id,
-                    'route_id': t.route.id,
-                    'transport_id': t.transport.id,
-                    'driver_id': t.driver.id,
-                    'departure_time': t.departure_time.isoformat(),
-                    'arrival_time': t.arrival_time.isoformat(),
-                    'fare': t.fare,
-                    'passengers': [p.id for p in t.passengers]
-                } for t in self.trips
-            ],
             'next_id': self._next_id
         }
 
         try:
-            with open(filename, 'w', encoding='utf-8') as f:
-                json.dump(data, f, ensure_ascii=False, indent=2)
+            with atomic_write(filename) as f:
+                f.write(encode(header) + '\n')
+                for section in SECTIONS:
+                    f.write(encode({'section': section}) + '\n')
+                    f.writelines(encode(record) + '\n' for record in iter_section(self, section))
         except Exception as e:
-            raise FileOperationException(f"Ошибка сохранения в JSON: {e}")
+            raise FileOperationException(f"Ошибка сохранения в NDJSON: {e}")
+
+    def _replace_contents(self, name: str, transports: List[Transport], employees: List[Employee],
+                          passengers: List[Passenger], routes: List[Route], trips: List[Trip],
+                          next_id: Dict[str, int]):
+        """Замена всех данных компании с перестроением индексов и журнала билетов"""
+        self.name = name
+        self.transports = transports
+        self.employees = employees
+        self.passengers = passengers
+        self.routes = routes
+        self.trips = trips
+        self._next_id = dict(next_id)
+        self._rebuild_indexes()
+        self.ledger.rebuild(self.trips, lazy=True)
+        if self.views is not None:
+            self.views.rebuild()
 
     def load_from_json(self, filename: str):
         """Загрузка данных из JSON"""
-        try:
-            with open(filename, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-        except Exception as e:
-            raise FileOperationException(f"Ошибка загрузки из JSON: {e}")
-
-        self.name = data['company_name']
-
-        # Очистка текущих данных
-        self.transports.clear()
-        self.employees.clear()
-        self.passengers.clear()
-        self.routes.clear()
-        self.trips.clear()
-
-        # Загрузка транспорта
-        transport_map = {}
-        for t_data in data['transports']:
-            if t_data['type'] == 'bus':
-                transport = Bus(
-                    t_data['id'], t_data['brand'], t_data['model'],
-                    t_data['year'], t_data['capacity'], t_data['route_number']
-                )
-            else:
-                transport = Tram(
-                    t_data['id'], t_data['brand'], t_data['model'],
-                    t_data['year'], t_data['capacity'], t_data['line_number']
-                )
-            transport.status = t_data['status']
-            self.transports.append(transport)
-            transport_map[t_data['id']] = transport
-
-        # Загрузка сотрудников
-        employee_map = {}
-        for e_data in data['employees']:
-            employee = Employee(
-                e_data['id'], e_data['name'], e_data['phone'],
-                e_data['position'], e_data['salary']
-            )
-            self.employees.append(employee)
-            employee_map[e_data['id']] = employee
-
-        # Загрузка пассажиров
-        passenger_map = {}
-        for p_data in data['passengers']:
-            passenger = Passenger(
-                p_data['id'], p_data['name'], p_data['phone'],
-                p_data['email'], p_data['discount']
-            )
-            self.passengers.append(passenger)
-            passenger_map[p_data['id']] = passenger
-
-        # Загрузка маршрутов
-        route_map = {}
-        for r_data in data['routes']:
-            route = Route(
-                r_data['id'], r_data['number'],
-                r_data['start_point'], r_data['end_point'],
-                r_data['distance']
-            )
-            self.routes.append(route)
-            route_map[r_data['id']] = route
-
-        # Загрузка рейсов
-        for t_data in data['trips']:
-            trip = Trip(
-                t_data['id'],
-                route_map[t_data['route_id']],
-                transport_map[t_data['transport_id']],
-                employee_map[t_data['driver_id']],
-                datetime.fromisoformat(t_data['departure_time']),
-                datetime.fromisoformat(t_data['arrival_time']),
-                t_data['fare']
-            )
-            # Добавление пассажиров
-            for p_id in t_data['passengers']:
-                if p_id in passenger_map:
-                    trip.add_passenger(passenger_map[p_id])
-            self.trips.append(trip)
-
-        self._next_id = data['next_id']
+        with paused_gc():
+            try:
+                with open(filename, 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+            except Exception as e:
+                raise FileOperationException(f"Ошибка загрузки из JSON: {e}")
+
+            loader = BulkLoader()
+            for section in SECTIONS:
+                loader.load_section(section, data[section])
+            loader.install(self, data['company_name'], data['next_id'])
+
+    def load_from_ndjson(self, filename: str):
+        """Потоковая загрузка данных из NDJSON (записи разбираются по одной строке)"""
+        with paused_gc():
+            try:
+                with open(filename, 'r', encoding='utf-8') as f:
+                    header, sections = read_ndjson(f)
+                    loader = BulkLoader()
+                    for section, records in sections:
+                        loader.load_section(section, records)
+            except (OSError, ValueError) as e:
+                raise FileOperationException(f"Ошибка загрузки из NDJSON: {e}")
+
+            loader.install(self, header['company_name'], header['next_id'])
 
     def save_to_xml(self, filename: str):
-        """Сохранение данных в XML"""
-        root = ET.Element("TransportCompany")
-        root.set("name", self.name)
-
-        # Транспорт
-        transports_elem = ET.SubElement(root, "Transports")
-        for t in self.transports:
-            t_elem = ET.SubElement(transports_elem, "Transport")
-            t_elem.set("id", str(t.id))
-            t_elem.set("type", "bus" if isinstance(t, Bus) else "tram")
-            ET.SubElement(t_elem, "Brand").text = t.brand
-            ET.SubElement(t_elem, "Model").text = t.model
-            ET.SubElement(t_elem, "Year").text = str(t.year)
-            ET.SubElement(t_elem, "Capacity").text = str(t.capacity)
-            ET.SubElement(t_elem, "Status").text = t.status
-            if isinstance(t, Bus):
-                ET.SubElement(t_elem, "RouteNumber").text = t.route_number
-            elif isinstance(t, Tram):
-                ET.SubElement(t_elem, "LineNumber").text = t.line_number
-
-        # Сотрудники
-        employees_elem = ET.SubElement(root, "Employees")
-        for e in self.employees:
-            e_elem = ET.SubElement(employees_elem, "Employee")
-            e_elem.set("id", str(e.id))
-            ET.SubElement(e_elem, "Name").text = e.name
-            ET.SubElement(e_elem, "Phone").text = e.phone
-            ET.SubElement(e_elem, "Position").text = e.position
-            ET.SubElement(e_elem, "Salary").text = str(e.salary)
-
-        # Пассажиры
-        passengers_elem = ET.SubElement(root, "Passengers")
-        for p in self.passengers:
-            p_elem = ET.SubElement(passengers_elem, "Passenger")
-            p_elem.set("id", str(p.id))
-            ET.SubElement(p_elem, "Name").text = p.name
-            ET.SubElement(p_elem, "Phone").text = p.phone
-            ET.SubElement(p_elem, "Email").text = p.email
-            ET.SubElement(p_elem, "Discount").text = str(p.discount)
-
-        # Маршруты
-        routes_elem = ET.SubElement(root, "Routes")
-        for r in self.routes:
-            r_elem = ET.SubElement(routes_elem, "Route")
-            r_elem.set("id", str(r.id))
-            ET.SubElement(r_elem, "Number").text = r.number
-            ET.SubElement(r_elem, "StartPoint").text = r.start_point
-            ET.SubElement(r_elem, "EndPoint").text = r.end_point
-            ET.SubElement(r_elem, "Distance").text = str(r.distance)
-
-        # Рейсы
-        trips_elem = ET.SubElement(root, "Trips")
-        for t in self.trips:
-            t_elem = ET.SubElement(trips_elem, "Trip")
-            t_elem.set("id", str(t.id))
-            ET.SubElement(t_elem, "RouteId").text = str(t.route.id)
-            ET.SubElement(t_elem, "TransportId").text = str(t.transport.id)
-            ET.SubElement(t_elem, "DriverId").text = str(t.driver.id)
-            ET.SubElement(t_elem, "DepartureTime").text = t.departure_time.isoformat()
-            ET.SubElement(t_elem, "ArrivalTime").text = t.arrival_time.isoformat()
-            ET.SubElement(t_elem, "Fare").text = str(t.fare)
-
-            passengers_refs = ET.SubElement(t_elem, "PassengerIds")
-            for p in t.passengers:
-                ET.SubElement(passengers_refs, "PassengerId").text = str(p.id)
-
-        # Next ID
-        next_id_elem = ET.SubElement(root, "NextId")
-        for key, value in self._next_id.items():
-            ET.SubElement(next_id_elem, key).text = str(value)
-
-        # Запись в файл с форматированием
+        """Потоковое сохранение данных в XML (элементы записываются по одному)"""
         try:
-            xml_str = minidom.parseString(ET.tostring(root)).toprettyxml(indent="  ")
-            with open(filename, 'w', encoding='utf-8') as f:
-                f.write(xml_str)
+            with atomic_write(filename) as f:
+                write_xml(self, f)
         except Exception as e:
             raise FileOperationException(f"Ошибка сохранения в XML: {e}")
 
+    def load_from_xml(self, filename: str):
+        """Потоковая загрузка данных из XML (обработанные элементы сразу освобождаются)"""
+        with paused_gc():
+            try:
+                with open(filename, 'rb') as f:
+                    reader = XmlReader(f)
+                    loader = BulkLoader()
+                    for section, records in reader.sections():
+                        loader.load_section(section, records)
+            except (OSError, ValueError, ET.ParseError) as e:
+                raise FileOperationException(f"Ошибка загрузки из XML: {e}")
+
+            loader.install(self, reader.company_name, reader.next_id or loader.next_ids())
+
+    def save_to_snapshot(self, filename: str):
+        """Сохранение данных в двоичный снапшот (записи фиксированной длины, см. snapshot.py)"""
+        try:
+            write_snapshot(self, filename)
+        except Exception as e:
+            raise FileOperationException(f"Ошибка сохранения снапшота: {e}")
+
+    def load_from_snapshot(self, filename: str):
+        """Загрузка данных из двоичного снапшота через mmap"""
+        try:
+            read_snapshot(self, filename)
+        except (OSError, ValueError, struct.error) as e:
+            raise FileOperationException(f"Ошибка загрузки снапшота: {e}")
+
     def display_info(self):
         """Вывод информации о компании"""
         print(f"\nТранспортная компания: {self.name}")
@@ -0,0 +1,163 @@
+"""
+Потоковое сохранение и загрузка данных компании в XML
+"""
+
+import xml.etree.ElementTree as ET
+from typing import Dict, Iterator, List, Optional, Tuple
+from xml.sax.saxutils import XMLGenerator
+from xml.sax.xmlreader import AttributesImpl
+from storage import SECTIONS, iter_section, group_sections
+from exceptions import InvalidDataException
+
+INDENT = "  "
+
+# Секция -> (тег секции, тег записи)
+SECTION_TAGS = {
+    'transports': ('Transports', 'Transport'),
+    'employees': ('Employees', 'Employee'),
+    'passengers': ('Passengers', 'Passenger'),
+    'routes': ('Routes', 'Route'),
+    'trips': ('Trips', 'Trip'),
+}
+SECTION_ELEMENTS = {section_tag: section for section, (section_tag, _) in SECTION_TAGS.items()}
+RECORD_SECTIONS = {record_tag: section for section, (_, record_tag) in SECTION_TAGS.items()}
+
+# Поле записи -> (тег, преобразование текста при загрузке)
+FIELD_TAGS = {
+    'transports': [('brand', 'Brand', str), ('model', 'Model', str), ('year', 'Year', int),
+                   ('capacity', 'Capacity', int), ('status', 'Status', str),
+                   ('route_number', 'RouteNumber', str), ('line_number', 'LineNumber', str)],
+    'employees': [('name', 'Name', str), ('phone', 'Phone', str), ('position', 'Position', str),
+                  ('salary', 'Salary', float)],
+    'passengers': [('name', 'Name', str), ('phone', 'Phone', str), ('email', 'Email', str),
+                   ('discount', 'Discount', float), ('category', 'Category', str)],
+    'routes': [('number', 'Number', str), ('start_point', 'StartPoint', str), ('end_point', 'EndPoint', str),
+               ('distance', 'Distance', float)],
+    'trips': [('route_id', 'RouteId', int), ('transport_id', 'TransportId', int), ('driver_id', 'DriverId', int),
+              ('departure_time', 'DepartureTime', str), ('arrival_time', 'ArrivalTime', str),
+              ('fare', 'Fare', float)],
+}
+
+# Поля, которых может не быть в файлах прежних версий: при загрузке применяются значения по умолчанию
+OPTIONAL_FIELDS = {'status', 'route_number', 'line_number', 'email', 'category'}
+
+
+def write_xml(company, f):
+    """
+    Запись компании в XML по одному элементу, без построения дерева документа
+
+    Структура совпадает с прежним форматом save_to_xml: атрибуты id/type,
+    поля - дочерними элементами, пассажиры рейса - в PassengerIds.
+    """
+    xml = XMLGenerator(f, encoding='utf-8', short_empty_elements=True)
+    xml.startDocument()
+
+    def open_tag(level, tag, attrs=None):
+        xml.ignorableWhitespace("\n" + INDENT * level)
+        xml.startElement(tag, AttributesImpl(attrs or {}))
+
+    def close_tag(level, tag):
+        xml.ignorableWhitespace("\n" + INDENT * level)
+        xml.endElement(tag)
+
+    def text_element(level, tag, text):
+        open_tag(level, tag)
+        if text:
+            xml.characters(text)
+        xml.endElement(tag)
+
+    xml.startElement("TransportCompany", AttributesImpl({"name": company.name}))
+    for section in SECTIONS:
+        section_tag, record_tag = SECTION_TAGS[section]
+        fields = FIELD_TAGS[section]
+        open_tag(1, section_tag)
+        for record in iter_section(company, section):
+            attrs = {"id": str(record['id'])}
+            if section == 'transports':
+                attrs["type"] = record['type']
+            open_tag(2, record_tag, attrs)
+            for field, tag, _ in fields:
+                if field == 'line_number' and record['type'] != 'tram':
+                    continue
+                if field == 'route_number' and record['type'] == 'tram':
+                    continue
+                text_element(3, tag, str(record[field]))
+            if section == 'trips':
+                open_tag(3, "PassengerIds")
+                for passenger_id in record['passengers']:
+                    text_element(4, "PassengerId", str(passenger_id))
+                close_tag(3, "PassengerIds")
+            close_tag(2, record_tag)
+        close_tag(1, section_tag)
+
+    open_tag(1, "NextId")
+    for key, value in company._next_id.items():
+        text_element(2, key, str(value))
+    close_tag(1, "NextId")
+    close_tag(0, "TransportCompany")
+    xml.endDocument()
+    f.write("\n")
+
+
+class XmlReader:
+    """
+    Потоковое чтение XML через ET.iterparse
+
+    Каждая запись преобразуется в словарь и сразу удаляется из дерева,
+    поэтому в памяти одновременно находится только текущий элемент.
+    Название компании доступно после вызова sections(), счетчики ID - после чтения всех секций.
+    """
+
+    def __init__(self, f):
+        self._events = ET.iterparse(f, events=('start', 'end'))
+        self.company_name: Optional[str] = None
+        self.next_id: Dict[str, int] = {}
+
+        event, root = next(self._events)
+        if root.tag != "TransportCompany":
+            raise InvalidDataException("Файл не является сохранением транспортной компании")
+        self.company_name = root.get("name", "")
+
+    def sections(self) -> Iterator[Tuple[str, Iterator[Dict]]]:
+        """Пары (секция, итератор записей секции)"""
+        return group_sections(self._tagged_records())
+
+    def _tagged_records(self) -> Iterator[Tuple[str, Dict]]:
+        section_elem = None
+        for event, elem in self._events:
+            if event == 'start':
+                if elem.tag in SECTION_ELEMENTS:
+                    section_elem = elem
+                continue
+
+            section = RECORD_SECTIONS.get(elem.tag)
+            if section is not None and section_elem is not None:
+                yield section, self._record(section, elem)
+                # Обработанная запись удаляется из дерева (в секции всегда не больше одного элемента)
+                section_elem.remove(elem)
+            elif elem.tag == "NextId":
+                self.next_id = {child.tag: int(child.text) for child in elem}
+            elif elem.tag in SECTION_ELEMENTS:
+                section_elem = None
+
+    @staticmethod
+    def _record(section: str, elem) -> Dict:
+        """Элемент записи -> словарь в формате storage"""
+        record = {'id': int(elem.get("id"))}
+        if section == 'transports':
+            record['type'] = elem.get("type", "tram")
+
+        children = {child.tag: child for child in elem}
+        for field, tag, convert in FIELD_TAGS[section]:
+            child = children.get(tag)
+            if child is None:
+                if field in OPTIONAL_FIELDS:
+                    continue
+                raise InvalidDataException(f"В записи {elem.tag} {record['id']} нет элемента {tag}")
+            record[field] = convert(child.text or '')
+
+        if section == 'trips':
+            ids_elem = children.get("PassengerIds")
+            passenger_ids: List[int] = [] if ids_elem is None else [int(p.text) for p in ids_elem]
+            record['passengers'] = passenger_ids
+        return record